@@ -3,18 +3,18 @@
 """
 自动更新模块
 用于检查GitHub仓库的版本并打开发布页面
+
+为了缩短启动时间，网络相关模块（urllib.request会连带导入http.client、ssl等）
+和界面模块只在真正检查更新或显示对话框时才导入。
 """
 
+import json
 import os
+import queue
 import sys
-import json
-import requests
-import webbrowser
-import tkinter as tk
-from tkinter import messagebox, ttk
 import threading
 import time
-from typing import Optional, Dict
+from typing import Optional, Dict, Callable, Tuple
 
 # GitHub仓库信息
 GITHUB_REPO = "eroubue/FFXIV_Logs_GUI_Editor"  # 根据搜索结果更新为正确的仓库地址
@@ -22,30 +22,203 @@ GITHUB_API_BASE = "https://api.github.com"
 RELEASES_URL = f"{GITHUB_API_BASE}/repos/{GITHUB_REPO}/releases/latest"
 GITHUB_RELEASES_PAGE = f"https://github.com/{GITHUB_REPO}/releases"
 
+# 可通过环境变量改用其他API地址（例如在本地HTTP服务器上测试）
+UPDATE_URL_ENV = "FFXIV_LOGS_UPDATE_URL"
+
+# 检查更新的超时时间（秒）
+REQUEST_TIMEOUT = 10
+
+# 检查结果的缓存有效期（秒），有效期内启动不会发起网络请求
+CACHE_TTL = 6 * 3600
+
+# 检查失败后的重试间隔：从BACKOFF_BASE开始每次失败翻倍，最长BACKOFF_MAX（秒）
+BACKOFF_BASE = 60
+BACKOFF_MAX = 24 * 3600
+
+# 缓存文件名与缓存中保留的发布信息字段
+CACHE_FILE_NAME = "update_cache.json"
+_RELEASE_FIELDS = ('name', 'tag_name', 'body', 'published_at')
+
+# 界面线程轮询后台检查结果的间隔（毫秒）
+POLL_INTERVAL_MS = 200
+
+# 主窗口绘制完成后延迟多久开始检查更新（毫秒）
+STARTUP_CHECK_DELAY_MS = 1000
+
+def default_cache_path() -> str:
+    """返回更新检查缓存文件的默认路径（Windows为%APPDATA%，其他系统为~/.cache）"""
+    if sys.platform == 'win32' and os.environ.get('APPDATA'):
+        base = os.environ['APPDATA']
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'FFXIV_Logs_GUI_Editor', CACHE_FILE_NAME)
+
+def backoff_delay(failures: int) -> float:
+    """连续失败failures次后距下次检查的等待时间（秒）"""
+    if failures <= 0:
+        return 0
+    return min(BACKOFF_BASE * 2 ** (failures - 1), BACKOFF_MAX)
+
 class AutoUpdater:
     """自动更新器"""
     
-    def __init__(self, current_version: str):
+    def __init__(self, current_version: str, api_url: Optional[str] = None,
+                 cache_path: Optional[str] = None, ttl: float = CACHE_TTL,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            current_version: 当前版本号
+            api_url: GitHub releases API地址，None表示环境变量或默认地址
+            cache_path: 缓存文件路径，None表示default_cache_path()
+            ttl: 缓存有效期（秒）
+            clock: 返回当前时间（秒）的函数
+        """
         self.current_version = current_version
+        self.api_url = api_url or os.environ.get(UPDATE_URL_ENV) or RELEASES_URL
+        self.cache_path = cache_path or default_cache_path()
+        self.ttl = ttl
+        self.clock = clock
         self.update_window = None
+    
+    def load_cache(self) -> Dict:
+        """读取缓存，文件不存在、损坏或属于其他API地址时返回空字典"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict) or cache.get('api_url') != self.api_url:
+            return {}
+        return cache
+    
+    def save_cache(self, cache: Dict) -> None:
+        """写入缓存（先写临时文件再替换，避免留下写了一半的文件）"""
+        cache['api_url'] = self.api_url
+        temp_path = self.cache_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"保存更新缓存失败: {e}")
+    
+    def cached_result(self) -> Tuple[bool, Optional[Dict]]:
+        """
+        在不访问网络的情况下根据缓存判断更新
+        
+        Returns:
+            (缓存是否仍有效, 更新信息或None)；缓存无效时需要调用check_for_updates
+        """
+        cache = self.load_cache()
+        if self.clock() >= cache.get('next_check_at', 0):
+            return False, None
+        release = cache.get('release')
+        return True, self._update_info(release) if release else None
+    
+    def _fetch_release(self, etag: Optional[str]) -> Tuple[int, Optional[Dict], Optional[str], Dict]:
+        """
+        发起条件请求
+        
+        Returns:
+            (HTTP状态码, 发布信息, ETag, 响应头)；304时发布信息为None
+        
+        Raises:
+            URLError/OSError: 网络错误或非200/304的响应
+        """
+        from urllib.error import HTTPError
+        from urllib.request import Request, urlopen
         
-    def check_for_updates(self) -> Optional[Dict]:
+        headers = {
+            'Accept': 'application/vnd.github+json',
+            'User-Agent': f'FFXIV_Logs_GUI_Editor/{self.current_version}',
+        }
+        if etag:
+            headers['If-None-Match'] = etag
+        try:
+            with urlopen(Request(self.api_url, headers=headers), timeout=REQUEST_TIMEOUT) as response:
+                release_data = json.loads(response.read().decode('utf-8'))
+                return response.status, release_data, response.headers.get('ETag'), dict(response.headers)
+        except HTTPError as e:
+            if e.code == 304:
+                return 304, None, e.headers.get('ETag') or etag, dict(e.headers)
+            raise
+    
+    def _retry_after(self, error: Exception) -> float:
+        """从限流响应（Retry-After或X-RateLimit-Reset）中获取需要等待的秒数"""
+        headers = getattr(error, 'headers', None)
+        if not headers:
+            return 0
+        try:
+            if headers.get('Retry-After'):
+                return float(headers['Retry-After'])
+            if headers.get('X-RateLimit-Remaining') == '0' and headers.get('X-RateLimit-Reset'):
+                return float(headers['X-RateLimit-Reset']) - self.clock()
+        except ValueError:
+            pass
+        return 0
+    
+    def check_for_updates(self, force: bool = False) -> Optional[Dict]:
         """
         检查是否有可用更新
         
+        缓存有效期内直接使用缓存；否则带If-None-Match发起条件请求，
+        失败后按指数退避推迟下次检查，期间继续使用上次成功获取的发布信息。
+        
+        Args:
+            force: 忽略缓存有效期和退避时间，立即请求
+        
         Returns:
             Dict: 更新信息，包含version, body等
             None: 无可用更新或检查失败
         """
+        if not force:
+            fresh, update_info = self.cached_result()
+            if fresh:
+                return update_info
+        
+        from urllib.error import URLError
+        
+        cache = self.load_cache()
+        now = self.clock()
         try:
             print("正在检查更新...")
-            response = requests.get(RELEASES_URL, timeout=10)
-            response.raise_for_status()
-            
-            release_data = response.json()
-            
+            status, release_data, etag, _ = self._fetch_release(cache.get('etag'))
+            if status == 304 and cache.get('release'):
+                release_data = cache['release']
+            elif release_data is None:
+                # 304但本地没有发布信息（缓存被删改），去掉ETag重新请求
+                status, release_data, etag, _ = self._fetch_release(None)
+            cache.update({
+                'etag': etag,
+                'release': {key: release_data.get(key) for key in _RELEASE_FIELDS},
+                'checked_at': now,
+                'failures': 0,
+                'next_check_at': now + self.ttl,
+            })
+            self.save_cache(cache)
+        except (URLError, OSError, ValueError, AttributeError) as e:
+            failures = cache.get('failures', 0) + 1
+            delay = max(backoff_delay(failures), self._retry_after(e))
+            cache.update({'failures': failures, 'next_check_at': now + delay})
+            self.save_cache(cache)
+            print(f"检查更新失败: {e}（{delay:.0f}秒后重试）")
+            release_data = cache.get('release')
+            if not release_data:
+                return None
+        
+        return self._update_info(release_data)
+    
+    def _update_info(self, release_data: Dict) -> Optional[Dict]:
+        """
+        根据发布信息判断是否有新版本
+        
+        Returns:
+            更新信息，没有新版本时返回None
+        """
+        try:
             # 优先使用name字段作为版本号，如果没有则使用tag_name
-            latest_version = release_data.get('name', release_data.get('tag_name', ''))
+            latest_version = release_data.get('name') or release_data.get('tag_name') or ''
             
             # 如果name字段为空或不是版本号格式，尝试从tag_name中提取
             if not latest_version or not latest_version.startswith(('v', 'V')):
@@ -70,10 +243,6 @@ class AutoUpdater:
             else:
                 print("当前已是最新版本")
                 return None
-                
-        except requests.RequestException as e:
-            print(f"检查更新失败: {e}")
-            return None
         except Exception as e:
             print(f"检查更新时出错: {e}")
             return None
@@ -122,6 +291,9 @@ class AutoUpdater:
         Returns:
             bool: 用户是否同意打开下载页面
         """
+        import tkinter as tk
+        from tkinter import ttk
+        
         # 创建更新对话框
         self.update_window = tk.Toplevel()
         self.update_window.title("发现新版本")
@@ -191,6 +363,9 @@ class AutoUpdater:
     
     def open_download_page(self) -> None:
         """打开GitHub下载页面"""
+        import webbrowser
+        from tkinter import messagebox
+        
         try:
             print(f"正在打开下载页面: {GITHUB_RELEASES_PAGE}")
             webbrowser.open(GITHUB_RELEASES_PAGE)
@@ -199,51 +374,104 @@ class AutoUpdater:
             print(f"打开下载页面失败: {e}")
             messagebox.showerror("错误", f"无法打开下载页面: {e}")
     
-    def check_and_update(self) -> None:
-        """
-        检查并执行更新（在后台线程中运行）
-        """
-        def update_thread():
-            try:
-                # 检查更新
-                update_info = self.check_for_updates()
-                if not update_info:
-                    return
-                
-                # 在主线程中显示更新对话框
-                def show_dialog():
-                    if self.show_update_dialog(update_info):
-                        # 用户同意打开下载页面
-                        self.open_download_page()
-                
-                # 确保在主线程中执行GUI操作
-                if threading.current_thread() is not threading.main_thread():
-                    # 使用after方法在主线程中执行
-                    root = tk._default_root
-                    if root:
-                        root.after(0, show_dialog)
-                
-            except Exception as e:
-                print(f"更新检查失败: {e}")
-        
-        # 启动后台线程
-        thread = threading.Thread(target=update_thread, daemon=True)
-        thread.start()
-
-def check_for_updates_on_startup(current_version: str) -> None:
+    def check_and_update(self, root=None) -> None:
+        """
+        检查并执行更新（不阻塞界面线程）
+        
+        缓存有效时直接在界面线程中判断；需要联网时把请求交给共享的后台线程，
+        由界面线程通过root.after轮询结果，对话框始终在界面线程中显示。
+        
+        Args:
+            root: Tk根窗口，None表示默认根窗口
+        """
+        if root is None:
+            import tkinter as tk
+            root = tk._default_root
+        
+        def show_dialog(update_info):
+            if update_info and self.show_update_dialog(update_info):
+                # 用户同意打开下载页面
+                self.open_download_page()
+        
+        fresh, update_info = self.cached_result()
+        if fresh:
+            if update_info and root:
+                root.after(0, show_dialog, update_info)
+            return
+        
+        result = run_in_background(self.check_for_updates, True)
+        if not root:
+            return
+        
+        def poll():
+            if not result['done']:
+                root.after(POLL_INTERVAL_MS, poll)
+            elif result['error'] is not None:
+                print(f"更新检查失败: {result['error']}")
+            else:
+                show_dialog(result['value'])
+        
+        root.after(POLL_INTERVAL_MS, poll)
+
+# 共享的后台任务队列（第一次需要时启动唯一的后台线程，之后复用）
+_task_queue = None
+_task_queue_lock = threading.Lock()
+
+def _task_worker(tasks: queue.Queue) -> None:
+    """后台线程：依次执行队列中的任务并记录结果"""
+    while True:
+        func, args, result = tasks.get()
+        try:
+            result['value'] = func(*args)
+        except Exception as e:
+            result['error'] = e
+        result['done'] = True
+
+def run_in_background(func: Callable, *args) -> Dict:
+    """
+    在共享的后台线程中执行func(*args)
+    
+    Returns:
+        结果字典{'done', 'value', 'error'}，done变为True后value/error可用
+    """
+    global _task_queue
+    with _task_queue_lock:
+        if _task_queue is None:
+            _task_queue = queue.Queue()
+            threading.Thread(target=_task_worker, args=(_task_queue,), daemon=True,
+                             name='update-check').start()
+    result = {'done': False, 'value': None, 'error': None}
+    _task_queue.put((func, args, result))
+    return result
+
+def check_for_updates_on_startup(current_version: str, root=None) -> None:
     """
     在程序启动时检查更新
     
     Args:
         current_version: 当前版本号
+        root: Tk根窗口，None表示默认根窗口
     """
     updater = AutoUpdater(current_version)
-    updater.check_and_update()
+    updater.check_and_update(root)
+
+def check_for_updates_after_startup(root, current_version: str,
+                                    delay_ms: int = STARTUP_CHECK_DELAY_MS) -> None:
+    """
+    在主窗口首次绘制完成后再检查更新，避免网络模块的导入和请求拖慢启动
+    
+    Args:
+        root: Tk根窗口
+        current_version: 当前版本号
+        delay_ms: 窗口绘制完成后的额外延迟（毫秒）
+    """
+    # after_idle在待处理的绘制事件之后执行，此时窗口已经显示出来
+    root.after_idle(lambda: root.after(delay_ms, check_for_updates_on_startup, current_version, root))
 
 if __name__ == "__main__":
-    # 测试更新检查
+    # 测试更新检查（--force忽略缓存立即请求）
     updater = AutoUpdater("v1.0.3")
-    update_info = updater.check_for_updates()
+    update_info = updater.check_for_updates(force="--force" in sys.argv[1:])
     if update_info:
         print(f"发现新版本: {update_info['version']}")
         print(f"更新说明: {update_info['body']}")
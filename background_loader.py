@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台加载模块
+读取线程流式读取并解析日志，解析结果按顺序分批通过root.after交给界面线程，
+界面线程每次轮询只在时间预算内把一部分行加入表
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Optional, Callable
+
+from checksum_calculator import iter_log_file_with_line_numbers
+from combat_table import CombatTable, parse_combat_rows
+from perf_monitor import monitor
+
+# 第一批的行数较小，以便尽快显示部分结果；之后使用较大的批次
+FIRST_BATCH_LINES = 2000
+BATCH_LINES = 50000
+
+# 界面线程轮询间隔（毫秒）与每次轮询最多占用的时间（秒）
+POLL_INTERVAL_MS = 50
+POLL_TIME_BUDGET = 0.03
+
+# 界面线程每次加入表的行数，每加入一段检查一次时间预算
+APPLY_SLICE_ROWS = 2000
+
+# 已解析但尚未加入表的批次上限，界面线程跟不上时读取线程等待
+MAX_QUEUED_BATCHES = 4
+
+class BackgroundLoader:
+    """在后台加载日志文件到CombatTable"""
+
+    def __init__(self, root, file_path: str,
+                 on_batch: Optional[Callable[[CombatTable, int, int], None]] = None,
+                 on_progress: Optional[Callable[[int, int, int], None]] = None,
+                 on_done: Optional[Callable[[CombatTable, Optional[BaseException]], None]] = None,
+                 table: Optional[CombatTable] = None):
+        """
+        Args:
+            root: Tk根窗口，用于root.after调度
+            file_path: 日志文件路径
+            on_batch: 一批行加入表后调用，参数为(表, 起始行ID, 行数)
+            on_progress: 进度回调，参数为(已读字节数, 文件字节数, 已读行数)
+            on_done: 加载结束（完成、取消或出错）后调用，参数为(表, 异常或None)
+            table: 追加到已有的表，None表示新建
+        """
+        self.root = root
+        self.file_path = file_path
+        self.on_batch = on_batch
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.table = table if table is not None else CombatTable()
+
+        self.total_bytes = os.path.getsize(file_path)
+        self.bytes_read = 0
+        self.lines_read = 0
+        self.error = None
+        self._cancel = threading.Event()
+        self._finished = False
+        self._results = queue.Queue(MAX_QUEUED_BATCHES)
+        self._pending = []
+        self._pending_pos = 0
+        self._thread = None
+        self._started_at = None
+
+    def start(self) -> None:
+        """启动后台加载"""
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+        self._thread.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self) -> None:
+        """取消加载（已加入表的行保留）"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._cancel.is_set()
+
+    def _batches(self):
+        """按行数切分读取到的(行, 行号)，第一批较小"""
+        batch = []
+        limit = FIRST_BATCH_LINES
+        for line, line_number, offset in iter_log_file_with_line_numbers(self.file_path):
+            if self._cancel.is_set():
+                return
+            batch.append((line, line_number))
+            if len(batch) >= limit:
+                self.bytes_read = offset
+                self.lines_read += len(batch)
+                yield batch
+                batch = []
+                limit = BATCH_LINES
+        if batch:
+            self.lines_read += len(batch)
+            yield batch
+        self.bytes_read = self.total_bytes
+
+    def _reader(self) -> None:
+        """读取线程：切分批次并解析，按顺序放入结果队列"""
+        # 按目标表接受的行类型解析（例如ABILITY_LINE_PREFIXES时包含22|行）
+        prefixes = self.table.line_prefixes
+        try:
+            for batch in self._batches():
+                self._results.put(parse_combat_rows(batch, prefixes))
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._results.put(None)
+
+    def _poll(self) -> None:
+        """界面线程：在时间预算内把解析结果分段加入表，未加入的部分留到下次轮询"""
+        poll_start = time.perf_counter()
+        deadline = poll_start + POLL_TIME_BUDGET
+        table = self.table
+        first = len(table)
+        while not self._finished:
+            if self._pending_pos >= len(self._pending):
+                try:
+                    rows = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if rows is None:
+                    self._finished = True
+                    break
+                self._pending = rows
+                self._pending_pos = 0
+            if self._cancel.is_set():
+                self._pending = []
+                self._pending_pos = 0
+                continue
+            end = self._pending_pos + APPLY_SLICE_ROWS
+            table.extend_parsed(self._pending[self._pending_pos:end])
+            self._pending_pos = end
+            # 每次轮询至少加入一段，保证时间预算很小时也能推进
+            if time.perf_counter() >= deadline:
+                break
+
+        count = len(table) - first
+        if count:
+            monitor.record('load_batch', time.perf_counter() - poll_start, count)
+            if self.on_batch:
+                self.on_batch(table, first, count)
+
+        if self.on_progress:
+            self.on_progress(self.bytes_read, self.total_bytes, self.lines_read)
+
+        if self._finished:
+            monitor.record('load', time.perf_counter() - self._started_at, self.lines_read)
+            if self.on_done:
+                self.on_done(self.table, self.error)
+        else:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+def load_in_background(root, file_path: str, **kwargs) -> BackgroundLoader:
+    """
+    创建并启动后台加载器
+
+    Args:
+        root: Tk根窗口
+        file_path: 日志文件路径
+        **kwargs: 传给BackgroundLoader的回调与参数
+
+    Returns:
+        已启动的BackgroundLoader，可调用cancel()取消
+    """
+    loader = BackgroundLoader(root, file_path, **kwargs)
+    loader.start()
+    return loader
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV日志编辑器性能测试脚本
+用法: python benchmark.py [日志文件路径]
+      python benchmark.py --suite [--lines 1M] [--save-baseline] [日志文件路径]
+未指定日志文件时，单行解析测试使用内置的示例战斗日志行，完整测试使用log_generator生成的合成日志。
+完整测试依次测量解析、校验、建索引、筛选、伤害倍率和保存的吞吐量以及峰值内存，
+并与保存的基准结果对比，吞吐量下降超过容差时返回非零退出码。
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from typing import List, Optional, Dict, Callable, Tuple
+
+from checksum_calculator import (parse_log_line, parse_combat_line, parse_log_file_with_line_numbers,
+                                 validate_log_file, calculate_checksums_with_line_numbers)
+from combat_table import CombatTable
+from edit_journal import EditJournal
+from filter_index import InvertedIndex
+from log_generator import generate_log, parse_count
+from log_index import LogIndex
+from parse_cache import ParsedLog, cache_path
+from perf_monitor import peak_memory_bytes
+
+# 基准结果文件（与本脚本位于同一目录）
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# 吞吐量低于基准的比例超过该值时视为性能回退
+REGRESSION_TOLERANCE = 0.2
+
+# 完整测试默认生成的行数
+DEFAULT_SUITE_LINES = 1000000
+
+# 示例21|战斗日志行（字段布局取自实际日志，角色名和校验码为虚构，不能通过校验）
+SAMPLE_LINES = [
+    "21|2025-07-26T21:04:33.9250000+08:00|10574A2B|光之战士|9D7A|烈刃|40011B8C|木人|710003|8C1F0000|1B|9D7A8000|0|0|0|0|0|0|0|0|0|0|0|0|7826612|7826612|10000|10000|||100.02|92.49|0.00|-3.14|106712|106712|10000|10000|||100.00|100.00|0.00|0.00|00004A3C|0|1|00||01|9D7A|9D7A|0.100|8A4C|75c2cd4a2a0e3c8f",
+    "21|2025-07-26T21:04:35.0480000+08:00|10574A2B|光之战士|9D7B|强力斩|40011B8C|木人|750003|B3914000|1B|9D7B8000|0|0|0|0|0|0|0|0|0|0|0|0|7815540|7826612|10000|10000|||100.02|92.49|0.00|-3.14|106712|106712|10000|10000|||100.00|100.00|0.00|0.00|00004A3D|0|1|00||01|9D7B|9D7B|0.100|8A4C|0d1f3a6b2e9c4d57",
+    "21|2025-07-26T21:04:36.1730000+08:00|1063F2E0|冒险者|1D5E|醒梦|1063F2E0|冒险者|E0000000|0|0|0|0|0|0|0|0|0|0|0|0|0|0|0|98122|98122|10000|10000|||99.10|106.34|0.00|0.01|98122|98122|10000|10000|||99.10|106.34|0.00|0.01|00004A3E|0|1|00||01|1D5E|1D5E|0.100|8A4C|bb3f61a4c08e2d91",
+]
+
+# 旧版parse_log_line使用的正则表达式
+_LEGACY_PATTERN = r'^21\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|.*\|([^|]*)$'
+_LEGACY_KEYS = ('timestamp', 'source_id', 'source', 'id', 'ability',
+                'target_id', 'target', 'flags', 'damage', 'checksum')
+
+def _parse_log_line_regex(line: str) -> Optional[dict]:
+    """旧版正则实现，仅作为性能对比基准"""
+    if not line.strip():
+        return None
+    match = re.match(_LEGACY_PATTERN, line.strip())
+    if not match:
+        return None
+    return dict(zip(_LEGACY_KEYS, match.groups()))
+
+def load_sample_lines(file_path: Optional[str] = None, limit: int = 100000) -> List[str]:
+    """
+    加载用于测试的战斗日志行
+    
+    Args:
+        file_path: 日志文件路径，None表示使用内置示例行
+        limit: 最多读取的21|行数
+    
+    Returns:
+        日志行列表
+    """
+    if file_path is None:
+        return SAMPLE_LINES * (limit // len(SAMPLE_LINES))
+    
+    lines = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('21|'):
+                lines.append(line.strip())
+                if len(lines) >= limit:
+                    break
+    return lines
+
+def _best_time(func: Callable, lines: List[str], repeat: int) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            func(line)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def bench_parse_log_line(lines: List[str], repeat: int = 5) -> Dict[str, float]:
+    """
+    对比正则解析与无正则快速路径的单行耗时
+    
+    Args:
+        lines: 待解析的日志行
+        repeat: 重复次数
+    
+    Returns:
+        各实现的单行耗时（纳秒）
+    """
+    count = max(len(lines), 1)
+    return {
+        'regex': _best_time(_parse_log_line_regex, lines, repeat) / count * 1e9,
+        'parse_log_line': _best_time(parse_log_line, lines, repeat) / count * 1e9,
+        'parse_combat_line': _best_time(parse_combat_line, lines, repeat) / count * 1e9,
+    }
+
+def run_suite(file_path: str, repeat: int = 3) -> Dict:
+    """
+    对一个日志文件依次测量各阶段的吞吐量
+
+    Args:
+        file_path: 日志文件路径
+        repeat: 每个阶段的运行次数（取最短耗时）
+
+    Returns:
+        测试结果：stages为 阶段名 -> {seconds, items, items_per_second}，另含peak_rss_bytes等环境信息
+    """
+    stages = {}
+
+    def _measure(func: Callable, *args) -> Tuple[float, object]:
+        """多次运行取最短耗时，返回(耗时秒数, 最后一次的返回值)；与timeit相同，计时期间关闭垃圾回收"""
+        best = None
+        for _ in range(repeat):
+            result = None
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                result = func(*args)
+                elapsed = time.perf_counter() - start
+            finally:
+                gc.enable()
+            if best is None or elapsed < best:
+                best = elapsed
+        return best, result
+
+    def record(name: str, seconds: float, items: int) -> None:
+        stages[name] = {
+            'seconds': round(seconds, 4),
+            'items': items,
+            'items_per_second': round(items / seconds, 1) if seconds > 0 else None,
+        }
+        print(f"  {name:<10} {seconds:8.3f} 秒  {items:>10} 项  {items / max(seconds, 1e-9):12,.0f} 项/秒")
+
+    seconds, lines = _measure(parse_log_file_with_line_numbers, file_path)
+    record('parse', seconds, len(lines))
+
+    seconds, report = _measure(validate_log_file, file_path, 1)
+    record('validate', seconds, report['total'])
+
+    # 单独测量SHA256计算校验码的耗时，用于判断校验和保存中哈希所占的比例
+    bodies = [([line.rpartition('|')[0]], line_number) for line, line_number in lines]
+    seconds, _ = _measure(calculate_checksums_with_line_numbers, bodies)
+    record('checksum', seconds, len(bodies))
+    del bodies
+
+    seconds, index = _measure(LogIndex.build, file_path)
+    record('index', seconds, len(index))
+    index.close()
+    index = LogIndex.build(file_path)
+
+    seconds, table = _measure(CombatTable.from_lines, lines)
+    record('table', seconds, len(table))
+
+    # 重新打开：解析缓存有效时直接读回各列（测量后删除本次生成的缓存文件）
+    had_cache = os.path.exists(cache_path(file_path))
+    ParsedLog.open(file_path)
+    try:
+        seconds, (parsed, _) = _measure(ParsedLog.open, file_path)
+        record('reopen', seconds, len(parsed.table))
+        del parsed
+    finally:
+        if not had_cache and os.path.exists(cache_path(file_path)):
+            os.remove(cache_path(file_path))
+    del lines
+
+    # 筛选：每个来源各筛选一次，分别使用列扫描和倒排索引
+    sources = table.unique_values()['sources']
+    seconds, _ = _measure(lambda: [table.filter(source=source) for source in sources])
+    record('filter', seconds, len(table) * len(sources))
+    seconds, inverted = _measure(lambda: _build_and_close(InvertedIndex, table))
+    record('inverted', seconds, len(table))
+    inverted = InvertedIndex(table)
+    seconds, _ = _measure(lambda: [inverted.lookup(source=source) for source in sources])
+    record('lookup', seconds, len(table) * len(sources))
+    inverted.close()
+
+    # 倍率在1.1和1/1.1之间交替，避免多次运行后伤害值不断增大
+    multipliers = iter([1.1, 1 / 1.1] * repeat)
+    seconds, result = _measure(lambda: table.scale_damage(next(multipliers)))
+    record('multiply', seconds, result['matched'])
+
+    # 保存：把倍率修改后的行交给EditJournal写入新文件
+    journal = EditJournal(index)
+    combat_rows = index.rows_of_type(21)
+    if len(combat_rows) == len(table):
+        for row in result['changed']:
+            journal.replace_line(combat_rows[row], table.raw_lines[row])
+    fd, output_path = tempfile.mkstemp(suffix='.log')
+    os.close(fd)
+    try:
+        seconds, _ = _measure(journal.write_to, output_path)
+        record('save', seconds, len(index))
+    finally:
+        index.close()
+        os.remove(output_path)
+
+    return {
+        'lines': len(index),
+        'file_bytes': os.path.getsize(file_path),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'stages': stages,
+        'peak_rss_bytes': peak_memory_bytes(),
+    }
+
+def _build_and_close(index_class, table: CombatTable):
+    """构建观察者索引后立即解除注册，避免重复构建时观察者堆积"""
+    index = index_class(table)
+    index.close()
+    return index
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """
+    与基准结果对比并打印各阶段的吞吐量变化
+
+    Returns:
+        吞吐量下降超过容差的阶段名列表
+    """
+    if baseline.get('lines') != results['lines']:
+        print(f"注意: 基准测试行数 {baseline.get('lines')} 与本次 {results['lines']} 不同，吞吐量仅供参考")
+    regressions = []
+    for name, stage in results['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base or not base.get('items_per_second') or not stage['items_per_second']:
+            continue
+        ratio = stage['items_per_second'] / base['items_per_second']
+        regressed = ratio < 1 - tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"  {'✗' if regressed else '✓'} {name:<10} {ratio:6.2f}x "
+              f"({stage['items_per_second']:,.0f} / 基准 {base['items_per_second']:,.0f} 项/秒)")
+    if results.get('peak_rss_bytes') and baseline.get('peak_rss_bytes'):
+        print(f"  峰值内存 {results['peak_rss_bytes'] / 1048576:.0f} MB "
+              f"(基准 {baseline['peak_rss_bytes'] / 1048576:.0f} MB)")
+    return regressions
+
+def main_suite(args) -> int:
+    """完整性能测试"""
+    generated = None
+    file_path = args.file
+    if file_path is None:
+        fd, generated = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        print(f"生成合成日志: {args.lines} 行（种子 {args.seed}）")
+        generate_log(generated, args.lines, args.seed)
+        file_path = generated
+
+    try:
+        print(f"测试文件: {file_path}")
+        results = run_suite(file_path, args.repeat)
+    finally:
+        if generated:
+            os.remove(generated)
+    if results['peak_rss_bytes']:
+        print(f"峰值内存: {results['peak_rss_bytes'] / 1048576:.0f} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"✓ 已保存基准结果: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("未找到基准结果，可使用 --save-baseline 保存本次结果作为基准")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print("与基准结果对比:")
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"✗ 性能回退: {', '.join(regressions)}")
+        return 1
+    print("✓ 未发现性能回退")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函数"""
+    parser = argparse.ArgumentParser(description='FFXIV日志编辑器性能测试')
+    parser.add_argument('file', nargs='?', help='日志文件路径')
+    parser.add_argument('--suite', action='store_true', help='运行完整性能测试（解析/校验/筛选/倍率/保存）')
+    parser.add_argument('--lines', type=parse_count, default=DEFAULT_SUITE_LINES,
+                        help='未指定日志文件时生成的合成日志行数，支持k/M后缀')
+    parser.add_argument('--seed', type=int, default=0, help='合成日志的随机种子')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基准结果文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基准')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help='允许的吞吐量下降比例')
+    parser.add_argument('--repeat', type=int, default=3, help='完整测试中每个阶段的运行次数（取最短耗时）')
+    parser.add_argument('--output', help='将本次结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        return main_suite(args)
+
+    lines = load_sample_lines(args.file)
+    print(f"测试行数: {len(lines)}")
+    
+    results = bench_parse_log_line(lines)
+    baseline = results['regex']
+    for name, ns in results.items():
+        print(f"  {name:<20} {ns:8.0f} ns/行  ({baseline / ns:.2f}x)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
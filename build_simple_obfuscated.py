@@ -132,8 +132,13 @@ def get_version_from_config():
     except ImportError:
         return "v1.0.4"  # 默认版本号
 
-def build_obfuscated_exe():
-    """构建混淆的exe文件"""
+def build_obfuscated_exe(onedir=False):
+    """
+    构建混淆的exe文件
+    
+    Args:
+        onedir: 是否打包为目录（启动时无需把所有依赖解压到临时目录，冷启动更快）
+    """
     print("开始构建混淆exe文件...")
     
     # 获取版本号
@@ -143,16 +148,12 @@ def build_obfuscated_exe():
     # PyInstaller命令参数（增强混淆）
     cmd = [
         "pyinstaller",
-        "--onefile",                    # 打包成单个exe文件
+        "--onedir" if onedir else "--onefile",  # 打包成目录或单个exe文件
         "--windowed",                   # 不显示控制台窗口
         f"--name={exe_name}",           # 动态设置exe文件名
         "--icon=icon.ico",              # 图标文件（如果存在）
         "--add-data=checksum_calculator.py;.",  # 包含校验码计算模块
-        "--hidden-import=requests",     # 明确包含requests模块
-        "--hidden-import=urllib3",      # requests的依赖
-        "--hidden-import=charset_normalizer",  # requests的依赖
-        "--hidden-import=idna",         # requests的依赖
-        "--hidden-import=certifi",      # requests的依赖
+        "--exclude-module=requests",    # 自动更新已改用标准库urllib，不再打包requests及其依赖
         
         "main_obfuscated.py"           # 混淆后的主程序文件
     ]
@@ -206,8 +207,19 @@ def cleanup_obfuscation():
             os.remove(spec_file)
             print(f"已删除文件: {spec_file}")
 
+def get_exe_path(onedir=False):
+    """返回构建出的exe文件路径"""
+    version = get_version_from_config()
+    exe_name = f"FFXIV_Logs_GUI_Editor{version}"
+    if onedir:
+        return os.path.join("dist", exe_name, f"{exe_name}.exe")
+    return os.path.join("dist", f"{exe_name}.exe")
+
 def main():
     """主函数"""
+    # --onedir: 打包为目录而不是单个exe文件
+    onedir = "--onedir" in sys.argv[1:]
+    
     print("=" * 60)
     print("FFXIV日志编辑器 - 简化混淆打包工具")
     print("作者: Nag0mi")
@@ -228,19 +240,19 @@ def main():
         return
     
     # 构建混淆exe文件
-    if not build_obfuscated_exe():
+    if not build_obfuscated_exe(onedir):
         return
     
     # 检查输出文件
     version = get_version_from_config()
-    exe_name = f"FFXIV_Logs_GUI_Editor{version}.exe"
-    exe_path = os.path.join("dist", exe_name)
+    exe_path = get_exe_path(onedir)
     
     if os.path.exists(exe_path):
         print(f"\n✅ 混淆打包成功！")
         print(f"exe文件位置: {os.path.abspath(exe_path)}")
         print(f"文件大小: {os.path.getsize(exe_path) / 1024 / 1024:.2f} MB")
         print(f"混淆级别: 基础混淆")
+        print(f"打包方式: {'目录' if onedir else '单文件'}")
         print(f"版本: {version}")
         
         # 询问是否清理临时文件
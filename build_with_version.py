@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 FFXIV日志编辑器 - 带版本更新的简化混淆打包脚本
-用法: python build_with_version.py <版本号>
+用法: python build_with_version.py <版本号> [--onedir]
 示例: python build_with_version.py v1.0.2
 """
 
@@ -11,8 +11,8 @@ import sys
 import subprocess
 from update_version import update_version_config, update_main_version, get_current_version
 
-def build_with_version(new_version):
-    """带版本更新的简化混淆打包"""
+def build_with_version(new_version, onedir=False):
+    """带版本更新的简化混淆打包（onedir为True时打包为目录）"""
     print("=" * 60)
     print("FFXIV日志编辑器 - 带版本更新的简化混淆打包工具")
     print(f"当前版本: {get_current_version()}")
@@ -36,6 +36,8 @@ def build_with_version(new_version):
     try:
         # 调用简化混淆打包脚本
         cmd = [sys.executable, "build_simple_obfuscated.py"]
+        if onedir:
+            cmd.append("--onedir")
         subprocess.check_call(cmd)
         print("✓ 简化混淆打包完成")
         return True
@@ -46,7 +48,7 @@ def build_with_version(new_version):
 def main():
     """主函数"""
     if len(sys.argv) < 2:
-        print("用法: python build_with_version.py <新版本号>")
+        print("用法: python build_with_version.py <新版本号> [--onedir]")
         print("示例: python build_with_version.py v1.0.2")
         print(f"\n当前版本: {get_current_version()}")
         return
@@ -61,7 +63,7 @@ def main():
         return
     
     # 执行带版本更新的简化混淆打包
-    if build_with_version(new_version):
+    if build_with_version(new_version, "--onedir" in sys.argv[2:]):
         print("\n✅ 带版本更新的简化混淆打包成功完成!")
         print(f"新版本: {new_version}")
     else:
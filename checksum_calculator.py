@@ -6,8 +6,12 @@ FFXIV日志校验码计算模块
 """
 
 import hashlib
-import re
-from typing import List, Tuple, Optional
+import mmap
+import os
+from collections import namedtuple
+from typing import List, Tuple, Optional, Iterable, Iterator, Dict
+
+from perf_monitor import instrument
 
 # 检查是否可用校验码功能
 try:
@@ -16,18 +20,27 @@ try:
 except ImportError:
     CHECKSUM_AVAILABLE = False
 
+# u_49152使用的查找表（每个元素编码两个字符：低16位为第一个字符，高16位为第二个字符）
+_U49152_LOOKUP = [3145776, 3211312, 3276848, 3342384, 3407920, 3473456, 3538992, 3604528, 3670064, 3735600, 6357040, 6422576, 6488112, 6553648, 6619184, 6684720, 3145777, 3211313, 3276849, 3342385, 3407921, 3473457, 3538993, 3604529, 3670065, 3735601, 6357041, 6422577, 6488113, 6553649, 6619185, 6684721, 3145778, 3211314, 3276850, 3342386, 3407922, 3473458, 3538994, 3604530, 3670066, 3735602, 6357042, 6422578, 6488114, 6553650, 6619186, 6684722, 3145779, 3211315, 3276851, 3342387, 3407923, 3473459, 3538995, 3604531, 3670067, 3735603, 6357043, 6422579, 6488115, 6553651, 6619187, 6684723, 3145780, 3211316, 3276852, 3342388, 3407924, 3473460, 3538996, 3604532, 3670068, 3735604, 6357044, 6422580, 6488116, 6553652, 6619188, 6684724, 3145781, 3211317, 3276853, 3342389, 3407925, 3473461, 3538997, 3604533, 3670069, 3735605, 6357045, 6422581, 6488117, 6553653, 6619189, 6684725, 3145782, 3211318, 3276854, 3342390, 3407926, 3473462, 3538998, 3604534, 3670070, 3735606, 6357046, 6422582, 6488118, 6553654, 6619190, 6684726, 3145783, 3211319, 3276855, 3342391, 3407927, 3473463, 3538999, 3604535, 3670071, 3735607, 6357047, 6422583, 6488119, 6553655, 6619191, 6684727, 3145784, 3211320, 3276856, 3342392, 3407928, 3473464, 3539000, 3604536, 3670072, 3735608, 6357048, 6422584, 6488120, 6553656, 6619192, 6684728, 3145785, 3211321, 3276857, 3342393, 3407929, 3473465, 3539001, 3604537, 3670073, 3735609, 6357049, 6422585, 6488121, 6553657, 6619193, 6684729, 3145825, 3211361, 3276897, 3342433, 3407969, 3473505, 3539041, 3604577, 3670113, 3735649, 6357089, 6422625, 6488161, 6553697, 6619233, 6684769, 3145826, 3211362, 3276898, 3342434, 3407970, 3473506, 3539042, 3604578, 3670114, 3735650, 6357090, 6422626, 6488162, 6553698, 6619234, 6684770, 3145827, 3211363, 3276899, 3342435, 3407971, 3473507, 3539043, 3604579, 3670115, 3735651, 6357091, 6422627, 6488163, 6553699, 6619235, 6684771, 3145828, 3211364, 3276900, 3342436, 3407972, 3473508, 3539044, 3604580, 3670116, 3735652, 6357092, 6422628, 6488164, 6553700, 6619236, 6684772, 3145829, 3211365, 3276901, 3342437, 3407973, 3473509, 3539045, 3604581, 3670117, 3735653, 6357093, 6422629, 6488165, 6553701, 6619237, 6684773, 3145830, 3211366, 3276902, 3342438, 3407974, 3473510, 3539046, 3604582, 3670118, 3735654, 6357094, 6422630, 6488166, 6553702, 6619238, 6684774]
+
+# 预先展开的256项双字符表，避免每次调用时重新构建查找表和逐字节chr()
+_U49152_PAIRS = tuple(chr(num % 128) + chr((num >> 16) % 128) for num in _U49152_LOOKUP)
+
+# 该查找表恰好等价于小写十六进制编码，批量接口据此直接使用bytes.hex()
+_U49152_IS_HEX = all(_U49152_PAIRS[i] == '%02x' % i for i in range(256))
+
 def u_49152(byte_str):
     """Convert SHA256 digest to 16-character checksum using lookup table - exact copy from reference"""
-    lookup = [3145776, 3211312, 3276848, 3342384, 3407920, 3473456, 3538992, 3604528, 3670064, 3735600, 6357040, 6422576, 6488112, 6553648, 6619184, 6684720, 3145777, 3211313, 3276849, 3342385, 3407921, 3473457, 3538993, 3604529, 3670065, 3735601, 6357041, 6422577, 6488113, 6553649, 6619185, 6684721, 3145778, 3211314, 3276850, 3342386, 3407922, 3473458, 3538994, 3604530, 3670066, 3735602, 6357042, 6422578, 6488114, 6553650, 6619186, 6684722, 3145779, 3211315, 3276851, 3342387, 3407923, 3473459, 3538995, 3604531, 3670067, 3735603, 6357043, 6422579, 6488115, 6553651, 6619187, 6684723, 3145780, 3211316, 3276852, 3342388, 3407924, 3473460, 3538996, 3604532, 3670068, 3735604, 6357044, 6422580, 6488116, 6553652, 6619188, 6684724, 3145781, 3211317, 3276853, 3342389, 3407925, 3473461, 3538997, 3604533, 3670069, 3735605, 6357045, 6422581, 6488117, 6553653, 6619189, 6684725, 3145782, 3211318, 3276854, 3342390, 3407926, 3473462, 3538998, 3604534, 3670070, 3735606, 6357046, 6422582, 6488118, 6553654, 6619190, 6684726, 3145783, 3211319, 3276855, 3342391, 3407927, 3473463, 3538999, 3604535, 3670071, 3735607, 6357047, 6422583, 6488119, 6553655, 6619191, 6684727, 3145784, 3211320, 3276856, 3342392, 3407928, 3473464, 3539000, 3604536, 3670072, 3735608, 6357048, 6422584, 6488120, 6553656, 6619192, 6684728, 3145785, 3211321, 3276857, 3342393, 3407929, 3473465, 3539001, 3604537, 3670073, 3735609, 6357049, 6422585, 6488121, 6553657, 6619193, 6684729, 3145825, 3211361, 3276897, 3342433, 3407969, 3473505, 3539041, 3604577, 3670113, 3735649, 6357089, 6422625, 6488161, 6553697, 6619233, 6684769, 3145826, 3211362, 3276898, 3342434, 3407970, 3473506, 3539042, 3604578, 3670114, 3735650, 6357090, 6422626, 6488162, 6553698, 6619234, 6684770, 3145827, 3211363, 3276899, 3342435, 3407971, 3473507, 3539043, 3604579, 3670115, 3735651, 6357091, 6422627, 6488163, 6553699, 6619235, 6684771, 3145828, 3211364, 3276900, 3342436, 3407972, 3473508, 3539044, 3604580, 3670116, 3735652, 6357092, 6422628, 6488164, 6553700, 6619236, 6684772, 3145829, 3211365, 3276901, 3342437, 3407973, 3473509, 3539045, 3604581, 3670117, 3735653, 6357093, 6422629, 6488165, 6553701, 6619237, 6684773, 3145830, 3211366, 3276902, 3342438, 3407974, 3473510, 3539046, 3604582, 3670118, 3735654, 6357094, 6422630, 6488166, 6553702, 6619238, 6684774]
-    res = []
-    for _ in range(16):
-        res.append(None)
-    for i in range(8):
-        num = lookup[byte_str[i]]
-        res[2*i] = chr(num % 128)
-        res[2*i + 1] = chr((num >> 16) % 128)
-    return "".join(res)
+    pairs = _U49152_PAIRS
+    return "".join([pairs[byte_str[i]] for i in range(8)])
 
+def _encode_digest_prefix(digest: bytes) -> str:
+    """将SHA256摘要的前8字节编码为16位校验码（批量接口使用的快速路径）"""
+    if _U49152_IS_HEX:
+        return digest[:8].hex()
+    return u_49152(digest)
+
+@instrument('checksum', detail=True)
 def calculate_checksum_with_line_number(line_parts: List[str], line_number: int) -> str:
     """
     计算FFXIV日志行的校验码（包含行号）- 使用正确的算法
@@ -51,6 +64,35 @@ def calculate_checksum_with_line_number(line_parts: List[str], line_number: int)
     # 使用查找表转换为16字符校验码
     return u_49152(hex_bytes)
 
+def iter_checksums_with_line_numbers(items: Iterable[Tuple[List[str], int]]) -> Iterator[str]:
+    """
+    批量计算校验码（包含行号），逐个产出结果，适合整份日志重新签名
+    
+    Args:
+        items: (日志行各部分, 行号) 元组的可迭代对象，各部分不包含校验码
+    
+    Yields:
+        与calculate_checksum_with_line_number逐字节一致的16位校验码
+    """
+    sha256 = hashlib.sha256
+    encode = _encode_digest_prefix
+    for line_parts, line_number in items:
+        data = ('|'.join(line_parts) + '|' + str(line_number)).encode('utf-8')
+        yield encode(sha256(data).digest())
+
+@instrument('checksum_batch', items=len)
+def calculate_checksums_with_line_numbers(items: Iterable[Tuple[List[str], int]]) -> List[str]:
+    """
+    批量计算校验码（包含行号）
+    
+    Args:
+        items: (日志行各部分, 行号) 元组的可迭代对象，各部分不包含校验码
+    
+    Returns:
+        校验码列表，顺序与输入一致
+    """
+    return list(iter_checksums_with_line_numbers(items))
+
 def encrypt(text, line_num):
     """
     加密函数 - 根据用户提供的正确算法
@@ -107,23 +149,72 @@ def validate_checksum_with_line_numbers(line: str, line_number: int) -> bool:
     """
     return validate_checksum_with_line_number(line, line_number)
 
-def parse_log_file_with_line_numbers(file_path: str) -> List[Tuple[str, int]]:
+# 流式解析时每次读取的字节数
+STREAM_CHUNK_SIZE = 1 << 20
+
+class LogParseError(ValueError):
+    """日志文件中存在无法解析的行"""
+    
+    def __init__(self, message: str, offset: int, line_number: int):
+        super().__init__(f"{message} (字节偏移: {offset}, 行号: {line_number})")
+        self.message = message
+        self.offset = offset
+        self.line_number = line_number
+
+    def __reduce__(self):
+        # 从子进程传回时按原参数重建
+        return type(self), (self.message, self.offset, self.line_number)
+
+def iter_log_file_with_line_numbers(file_path: str, start: int = 0, end: Optional[int] = None,
+                                    chunk_size: int = STREAM_CHUNK_SIZE,
+                                    errors: str = 'strict') -> Iterator[Tuple[str, int, int]]:
     """
-    解析日志文件，返回每行内容及其正确的行号
+    流式解析日志文件，以恒定内存逐行产出内容、行号和字节偏移
+    
+    行号规则与parse_log_file_with_line_numbers一致：空行跳过，01|地图切换行处重置为1。
     
     Args:
         file_path: 日志文件路径
+        start: 起始字节偏移（必须位于行首，该行行号视为1）
+        end: 结束字节偏移，None表示读到文件末尾
+        chunk_size: 每次读取的字节数
+        errors: 解码错误处理方式，'strict'时遇到无法解码的行抛出LogParseError
     
-    Returns:
-        包含(行内容, 行号)元组的列表
+    Yields:
+        (行内容, 行号, 行首字节偏移) 元组
+    
+    Raises:
+        LogParseError: 某行不是有效的UTF-8文本
     """
-    lines_with_numbers = []
     current_line_number = 1
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
+    offset = start
+    pending = b''
+    
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while True:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = f.read(size) if size > 0 else b''
+            if remaining is not None:
+                remaining -= len(chunk)
+            
+            if chunk:
+                pieces = (pending + chunk).split(b'\n')
+                pending = pieces.pop()
+            else:
+                # 文件末尾：最后一行可能没有换行符
+                pieces = [pending] if pending else []
+                pending = b''
+            
+            for raw in pieces:
+                line_offset = offset
+                offset += len(raw) + 1
+                try:
+                    line = raw.decode('utf-8', errors).strip()
+                except UnicodeDecodeError as e:
+                    raise LogParseError(f"无效的UTF-8编码: {e.reason}", line_offset + e.start,
+                                        current_line_number) from e
                 if not line:
                     continue
                 
@@ -131,14 +222,134 @@ def parse_log_file_with_line_numbers(file_path: str) -> List[Tuple[str, int]]:
                 if line.startswith('01|'):
                     current_line_number = 1
                 
-                lines_with_numbers.append((line, current_line_number))
+                yield line, current_line_number, line_offset
                 current_line_number += 1
-                
-    except Exception as e:
+            
+            if not chunk:
+                break
+
+@instrument('parse', items=len)
+def parse_log_file_with_line_numbers(file_path: str) -> List[Tuple[str, int]]:
+    """
+    解析日志文件，返回每行内容及其正确的行号
+    
+    Args:
+        file_path: 日志文件路径
+    
+    Returns:
+        包含(行内容, 行号)元组的列表
+    """
+    lines_with_numbers = []
+    
+    try:
+        for line, line_number, _ in iter_log_file_with_line_numbers(file_path):
+            lines_with_numbers.append((line, line_number))
+    except (OSError, LogParseError) as e:
         print(f"解析日志文件时出错: {e}")
     
     return lines_with_numbers
 
+# 地图切换行在文件中的字节特征（行号在此处重置为1）
+_ZONE_CHANGE_MARKER = b'\n01|'
+
+def _find_zone_chunks(file_path: str, chunk_count: int) -> List[Tuple[int, int]]:
+    """
+    按01|地图切换行把文件划分为若干字节区间，每个区间的首行行号都是1
+    
+    Args:
+        file_path: 日志文件路径
+        chunk_count: 期望的区间数量（实际数量取决于地图切换行的分布）
+    
+    Returns:
+        (起始偏移, 结束偏移) 元组的列表
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return []
+    if chunk_count <= 1:
+        return [(0, size)]
+    
+    target = max(size // chunk_count, 1)
+    bounds = [0]
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = target
+            while pos < size:
+                idx = mm.find(_ZONE_CHANGE_MARKER, pos - 1)
+                if idx < 0:
+                    break
+                bounds.append(idx + 1)
+                pos = idx + 1 + target
+    bounds.append(size)
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i] < bounds[i + 1]]
+
+def _validate_chunk(file_path: str, start: int, end: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    校验文件中的一个字节区间（区间首行行号为1）
+    
+    Args:
+        file_path: 日志文件路径
+        start: 起始字节偏移
+        end: 结束字节偏移
+    
+    Returns:
+        (校验的行数, [(无效行的字节偏移, 行号), ...])
+    """
+    total = 0
+    invalid = []
+    # 无法解码的字节按替换字符处理，使该行作为校验失败的行报告
+    for line, line_number, line_offset in iter_log_file_with_line_numbers(file_path, start, end,
+                                                                          errors='replace'):
+        if not validate_checksum_with_line_number(line, line_number):
+            invalid.append((line_offset, line_number))
+        total += 1
+    
+    return total, invalid
+
+@instrument('validate', items=lambda report: report['total'])
+def validate_log_file(file_path: str, workers: Optional[int] = None) -> Dict:
+    """
+    校验整个日志文件的校验码（包含行号），可使用多进程并行
+    
+    文件在01|地图切换行处切分（行号在此处重置），每个区间可独立编号，
+    因此并行结果与逐行串行校验完全一致。打包为exe时，调用方需要在
+    入口处调用multiprocessing.freeze_support()。
+    
+    Args:
+        file_path: 日志文件路径
+        workers: 进程数，None表示使用CPU核心数，1表示在当前进程串行校验
+    
+    Returns:
+        校验报告字典，包含total（校验行数）和invalid（无效行的(字节偏移, 行号)列表）
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    # 每个进程分配多个区间，避免地图大小不均导致负载倾斜
+    chunks = _find_zone_chunks(file_path, workers * 4 if workers > 1 else 1)
+    
+    total = 0
+    invalid = []
+    if workers <= 1 or len(chunks) <= 1:
+        for start, end in chunks:
+            count, bad = _validate_chunk(file_path, start, end)
+            total += count
+            invalid.extend(bad)
+    else:
+        # 进程池模块导入较慢，只在真正并行校验时导入，避免拖慢程序启动
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            futures = [executor.submit(_validate_chunk, file_path, start, end) for start, end in chunks]
+            for future in futures:
+                count, bad = future.result()
+                total += count
+                invalid.extend(bad)
+    
+    return {
+        'total': total,
+        'invalid': invalid
+    }
+
 # 以下是兼容性函数（旧版本）
 def calculate_checksum(line_parts: List[str]) -> str:
     """
@@ -191,46 +402,88 @@ def validate_checksum(line: str) -> bool:
     
     return actual_checksum == expected_checksum
 
-def parse_log_line(line: str) -> Optional[dict]:
+# 战斗日志行的类型前缀：21|单体技能，22|范围技能（两者字段布局相同）
+COMBAT_LINE_PREFIX = '21|'
+ABILITY_LINE_PREFIXES = ('21|', '22|')
+
+# 21|战斗日志行解析后的字段（按在行中的顺序）
+COMBAT_FIELDS = ('timestamp', 'source_id', 'source', 'id', 'ability',
+                 'target_id', 'target', 'flags', 'damage', 'checksum')
+
+class CombatRecord(namedtuple('CombatRecord', COMBAT_FIELDS)):
+    """21|战斗日志行的解析结果（不可变，无实例字典）"""
+    
+    __slots__ = ()
+    
+    def to_dict(self) -> dict:
+        """转换为parse_log_line返回的字典格式"""
+        return dict(zip(COMBAT_FIELDS, self))
+
+def _split_combat_line(line: str, prefixes=COMBAT_LINE_PREFIX) -> Optional[List[str]]:
     """
-    解析单行日志（旧版本，兼容性）
+    切分21|战斗日志行，返回10个字段值（不使用正则表达式）
+    
+    与原正则 ^21|(9个字段)|.*|(校验码)$ 的匹配结果完全一致：前9个字段用
+    有限次数的split切出，校验码取最后一个|之后的内容。prefixes可传入
+    ABILITY_LINE_PREFIXES以同时接受22|范围技能行。
+    """
+    line = line.strip()
+    if not line.startswith(prefixes):
+        return None
+    
+    parts = line.split('|', 10)
+    if len(parts) < 11:
+        return None
+    
+    rest = parts[10]
+    pos = rest.rfind('|')
+    if pos < 0 or rest.find('\n', 0, pos) >= 0:
+        return None
+    
+    parts[10] = rest[pos + 1:]
+    del parts[0]
+    return parts
+
+def parse_combat_line(line: str) -> Optional[CombatRecord]:
+    """
+    解析21|开头的战斗日志行
     
     Args:
         line: 日志行
     
     Returns:
-        解析后的数据字典，如果解析失败则返回None
+        CombatRecord，如果不是有效的21|战斗日志行则返回None
     """
-    if not line.strip():
+    values = _split_combat_line(line)
+    if values is None:
         return None
     
-    # 匹配21|开头的战斗日志行
-    pattern = r'^21\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|.*\|([^|]*)$'
-    match = re.match(pattern, line.strip())
+    return tuple.__new__(CombatRecord, values)
+
+def parse_log_line(line: str) -> Optional[dict]:
+    """
+    解析单行日志（旧版本，兼容性）
     
-    if not match:
+    Args:
+        line: 日志行
+    
+    Returns:
+        解析后的数据字典，如果解析失败则返回None
+    """
+    values = _split_combat_line(line)
+    if values is None:
         return None
     
-    return {
-        'timestamp': match.group(1),
-        'source_id': match.group(2),
-        'source': match.group(3),
-        'id': match.group(4),
-        'ability': match.group(5),
-        'target_id': match.group(6),
-        'target': match.group(7),
-        'flags': match.group(8),
-        'damage': match.group(9),
-        'checksum': match.group(10)
-    }
+    return dict(zip(COMBAT_FIELDS, values))
 
-def update_log_line(line: str, new_data: dict) -> str:
+def update_log_line(line: str, new_data: dict, line_number: Optional[int] = None) -> str:
     """
     更新日志行（旧版本，兼容性）
     
     Args:
         line: 原始日志行
         new_data: 新的数据字典
+        line_number: 行号，提供时使用包含行号的校验码算法
     
     Returns:
         更新后的日志行
@@ -258,39 +511,54 @@ def update_log_line(line: str, new_data: dict) -> str:
         parts[9] = new_data['damage']
     
     # 重新计算校验码
-    checksum = calculate_checksum(parts[:-1])
+    if line_number is not None:
+        checksum = calculate_checksum_with_line_number(parts[:-1], line_number)
+    else:
+        checksum = calculate_checksum(parts[:-1])
     parts[-1] = checksum
     
     return '|'.join(parts)
 
+def resign_log_line(line: str, line_number: int) -> str:
+    """
+    按行号重新计算日志行的校验码（最后一个字段视为校验码）
+    
+    Args:
+        line: 完整的日志行
+        line_number: 行号
+    
+    Returns:
+        校验码已更新的日志行
+    """
+    parts = line.strip().split('|')
+    parts[-1] = calculate_checksum_with_line_number(parts[:-1], line_number)
+    return '|'.join(parts)
+
 # 测试函数
 def test_checksum():
     """测试校验码计算功能"""
-    # 测试数据
-    test_line = "21|2024-01-15T10:30:15.123|12345678|玩家名称|1001|普通攻击|87654321|敌人A|0000|1500|a1b2c3d4"
+    # 测试数据（按行号1计算出正确的校验码）
+    line_number = 1
+    parts = "21|2024-01-15T10:30:15.1230000+08:00|12345678|玩家名称|1001|普通攻击|87654321|敌人A|0000|5DC0000|1B|10018000".split('|')
+    test_line = '|'.join(parts + [calculate_checksum_with_line_number(parts, line_number)])
     
     print("测试校验码计算:")
     print(f"原始行: {test_line}")
     
-    # 解析并验证
-    parsed = parse_log_line(test_line)
-    if parsed:
+    # 验证校验码并解析
+    if validate_checksum_with_line_number(test_line, line_number):
         print("✓ 校验码验证通过")
-        print(f"解析结果: {parsed}")
     else:
         print("✗ 校验码验证失败")
+    print(f"解析结果: {parse_log_line(test_line)}")
     
-    # 重新计算校验码
-    parts = test_line.split('|')
-    new_checksum = calculate_checksum(parts[:10])
-    print(f"计算的新校验码: {new_checksum}")
-    
-    # 更新行
-    updated_line = update_log_line(
-        parts[1], parts[2], parts[3], parts[4], parts[5],
-        parts[6], parts[7], parts[8], parts[9]
-    )
+    # 修改伤害并重新计算校验码
+    updated_line = update_log_line(test_line, {'damage': '7D00000'}, line_number)
     print(f"更新后的行: {updated_line}")
+    if validate_checksum_with_line_number(updated_line, line_number):
+        print("✓ 更新后的校验码验证通过")
+    else:
+        print("✗ 更新后的校验码验证失败")
 
 if __name__ == "__main__":
     test_checksum() 
\ No newline at end of file
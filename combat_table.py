@@ -0,0 +1,698 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV战斗事件列式存储模块
+将21|战斗日志行按列存放在类型化数组中，名称字段使用字符串驻留编码
+"""
+
+import array
+import datetime
+import itertools
+from typing import List, Tuple, Optional, Iterable, Dict, Sequence
+
+from perf_monitor import instrument, timed
+
+from checksum_calculator import (CombatRecord, COMBAT_LINE_PREFIX, _split_combat_line,
+                                 iter_log_file_with_line_numbers,
+                                 iter_checksums_with_line_numbers)
+
+# 时间戳无法解析时使用的占位值
+INVALID_TIMESTAMP = -(1 << 63)
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+def parse_hex(text: str) -> int:
+    """解析十六进制字段，空值或无效值返回0"""
+    try:
+        value = int(text, 16)
+    except ValueError:
+        return 0
+    return value if 0 <= value <= 0xFFFFFFFF else 0
+
+# 伤害字段的“大数值”标记：第三个字节的高4位为4
+_BIG_DAMAGE_MASK = 0xF000
+_BIG_DAMAGE_FLAG = 0x4000
+
+# 可编码的最大伤害值（第四个字节最大为0xFF）
+MAX_DAMAGE = 0xFF * 0xFFFF + 0xFFFF
+
+def decode_damage_value(raw: int) -> int:
+    """
+    将伤害字段（AABBCCDD）解码为实际伤害值
+
+    CC为0x4X时为大数值：伤害 = AABB - DD + (DD << 16)，否则伤害 = AABB。
+    """
+    damage = raw >> 16
+    if raw & _BIG_DAMAGE_MASK == _BIG_DAMAGE_FLAG:
+        extra = raw & 0xFF
+        damage = damage - extra + (extra << 16)
+    return damage
+
+# 标志字段最低字节（效果类型）中表示造成伤害的取值：普通、格挡、招架
+DAMAGE_EFFECT_TYPES = frozenset((0x03, 0x05, 0x06))
+
+def is_damage_effect(flags: int) -> bool:
+    """标志字段是否表示造成伤害（治疗、闪避、附加状态等返回False）"""
+    return flags & 0xFF in DAMAGE_EFFECT_TYPES
+
+def encode_damage_value(damage: int, raw: int = 0) -> int:
+    """
+    将伤害值编码为伤害字段，保留原字段第三字节中的其他标记位
+
+    Args:
+        damage: 伤害值
+        raw: 原伤害字段的数值
+
+    Returns:
+        新伤害字段的数值
+    """
+    if not 0 <= damage <= MAX_DAMAGE:
+        raise ValueError(f"伤害值超出可编码范围: {damage}")
+
+    other_flags = (raw >> 8) & 0x0F if raw & _BIG_DAMAGE_MASK == _BIG_DAMAGE_FLAG else (raw >> 8) & 0xFF
+    if damage <= 0xFFFF:
+        return (damage << 16) | (other_flags << 8)
+
+    extra = damage >> 16
+    high = (damage & 0xFFFF) + extra
+    if high > 0xFFFF:
+        extra = damage // 0xFFFF
+        high = damage - extra * 0xFFFF
+    return (high << 16) | _BIG_DAMAGE_FLAG | ((other_flags & 0x0F) << 8) | extra
+
+def format_hex_field(value: int, original: str) -> str:
+    """按原字段的宽度格式化为大写十六进制"""
+    return ('%X' % value).zfill(len(original))
+
+# 精确到秒的日期时间部分与时区部分的解析缓存（相邻日志行大多落在同一秒内）
+_SECONDS_CACHE = {}
+_SECONDS_CACHE_LIMIT = 4096
+_TZ_SECONDS_CACHE = {}
+# 格式化时使用的 纪元秒 -> YYYY-MM-DDTHH:MM:SS 缓存
+_LOCAL_TEXT_CACHE = {}
+
+def _local_seconds(text: str) -> int:
+    """将YYYY-MM-DDTHH:MM:SS解析为不含时区修正的纪元秒"""
+    seconds = _SECONDS_CACHE.get(text)
+    if seconds is None:
+        if text[10] != 'T':
+            raise ValueError(f"无效的时间戳: {text}")
+        date = datetime.date(int(text[0:4]), int(text[5:7]), int(text[8:10]))
+        seconds = ((date.toordinal() - _EPOCH_ORDINAL) * 86400 + int(text[11:13]) * 3600
+                   + int(text[14:16]) * 60 + int(text[17:19]))
+        if len(_SECONDS_CACHE) >= _SECONDS_CACHE_LIMIT:
+            _SECONDS_CACHE.clear()
+        _SECONDS_CACHE[text] = seconds
+    return seconds
+
+def _tz_seconds(tz_text: str) -> int:
+    """将+08:00形式的时区解析为相对UTC的秒数"""
+    seconds = _TZ_SECONDS_CACHE.get(tz_text)
+    if seconds is None:
+        if tz_text in ('', 'Z'):
+            seconds = 0
+        elif tz_text[0] in '+-' and len(tz_text) == 6 and tz_text[3] == ':':
+            seconds = int(tz_text[1:3]) * 3600 + int(tz_text[4:6]) * 60
+            if tz_text[0] == '-':
+                seconds = -seconds
+        else:
+            raise ValueError(f"无效的时区: {tz_text}")
+        _TZ_SECONDS_CACHE[tz_text] = seconds
+    return seconds
+
+def parse_timestamp_ns(text: str) -> int:
+    """
+    将ISO格式时间戳解析为UTC纪元纳秒
+
+    支持 2025-07-26T21:04:33.9250000+08:00 以及省略小数或时区的形式。
+
+    Args:
+        text: 时间戳文本
+
+    Returns:
+        纪元纳秒，无法解析时返回INVALID_TIMESTAMP
+    """
+    try:
+        if len(text) < 19:
+            return INVALID_TIMESTAMP
+        seconds = _local_seconds(text[:19])
+
+        # 常见格式：7位小数
+        if len(text) >= 27 and text[19] == '.' and text[20:27].isdigit() and not text[27:28].isdigit():
+            nanos = int(text[20:27]) * 100
+            pos = 27
+        elif len(text) > 19 and text[19] == '.':
+            end = 20
+            while end < len(text) and text[end].isdigit():
+                end += 1
+            digits = text[20:end][:9]
+            nanos = int(digits.ljust(9, '0')) if digits else 0
+            pos = end
+        else:
+            nanos = 0
+            pos = 19
+
+        seconds -= _tz_seconds(text[pos:])
+    except ValueError:
+        return INVALID_TIMESTAMP
+
+    return seconds * 1000000000 + nanos
+
+def _timestamp_layout(template: str) -> Tuple[int, str]:
+    """返回时间戳文本的(小数位数, 时区后缀)"""
+    # ACT日志的常见格式：7位小数 + ±HH:MM
+    if len(template) == 33 and template[19] == '.' and template[27] in '+-':
+        return 7, template[27:]
+    pos = 19
+    if template[pos:pos + 1] == '.':
+        pos += 1
+        while pos < len(template) and template[pos].isdigit():
+            pos += 1
+        return pos - 20, template[pos:]
+    return 0, template[pos:]
+
+def format_timestamp_ns(ns: int, template: str) -> str:
+    """
+    将纪元纳秒格式化为与模板相同格式的时间戳（小数位数和时区后缀保持不变）
+
+    Args:
+        ns: 纪元纳秒
+        template: 原时间戳文本，例如 2025-07-26T21:04:33.9250000+08:00
+
+    Returns:
+        时间戳文本，超出模板精度的部分被截断
+    """
+    digits, tz = _timestamp_layout(template)
+    local_seconds, nanos = divmod(ns + _tz_seconds(tz) * 1000000000, 1000000000)
+    text = _LOCAL_TEXT_CACHE.get(local_seconds)
+    if text is None:
+        days, seconds = divmod(local_seconds, 86400)
+        date = datetime.date.fromordinal(days + _EPOCH_ORDINAL)
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        text = '%04d-%02d-%02dT%02d:%02d:%02d' % (date.year, date.month, date.day, hours, minutes, seconds)
+        if len(_LOCAL_TEXT_CACHE) >= _SECONDS_CACHE_LIMIT:
+            _LOCAL_TEXT_CACHE.clear()
+        _LOCAL_TEXT_CACHE[local_seconds] = text
+    if digits:
+        text += '.' + ('%09d' % nanos)[:digits].ljust(digits, '0')
+    return text + tz
+
+def shift_timestamp(text: str, delta_ns: int) -> str:
+    """
+    将时间戳文本平移delta_ns纳秒，保持原有格式
+
+    Args:
+        text: 时间戳文本
+        delta_ns: 平移量（纳秒，可为负数）
+
+    Returns:
+        平移后的时间戳文本，无法解析时原样返回
+    """
+    ns = parse_timestamp_ns(text)
+    if ns == INVALID_TIMESTAMP:
+        return text
+    return format_timestamp_ns(ns + delta_ns, text)
+
+class StringPool:
+    """字符串驻留表：字符串与整数编码双向映射"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def intern(self, value: str) -> int:
+        """返回字符串的编码，不存在时新增"""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        """返回字符串的编码，不存在时返回None"""
+        return self.codes.get(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+def parse_combat_rows(lines_with_numbers: Iterable[Tuple[str, int]],
+                      line_prefixes=COMBAT_LINE_PREFIX) -> List[tuple]:
+    """
+    将一批(行内容, 行号)解析为CombatTable.extend_parsed可接受的行元组
+
+    在读取线程中运行，结果只包含普通类型，由界面线程通过extend_parsed加入表。
+    不符合行类型前缀的行只保留区段起点（行号为1）的标记。
+
+    Args:
+        lines_with_numbers: (行内容, 行号) 序列
+        line_prefixes: 接受的行类型前缀，应与目标表的line_prefixes一致
+
+    Returns:
+        行元组列表：(原始行, 行号, 时间戳, 来源ID, 技能ID, 目标ID, 标志, 伤害, 来源, 技能, 目标)，
+        区段标记为(None, 1)
+    """
+    rows = []
+    for line, line_number in lines_with_numbers:
+        values = _split_combat_line(line, line_prefixes)
+        if values is None:
+            if line_number == 1:
+                rows.append((None, 1))
+            continue
+        timestamp, source_id, source, ability_id, ability, target_id, target, flags, damage = values[:9]
+        rows.append((line.strip(), line_number, parse_timestamp_ns(timestamp), parse_hex(source_id),
+                     parse_hex(ability_id), parse_hex(target_id), parse_hex(flags), parse_hex(damage),
+                     source, ability, target))
+    return rows
+
+class CombatTable:
+    """21|战斗事件的列式存储"""
+
+    # 可按名称筛选的列：筛选参数名 -> (编码列属性名, 驻留表属性名)
+    NAME_COLUMNS = {
+        'source': ('source_codes', 'sources'),
+        'ability': ('ability_codes', 'abilities'),
+        'target': ('target_codes', 'targets'),
+    }
+
+    def __init__(self, line_prefixes=COMBAT_LINE_PREFIX):
+        # 接受的行类型前缀（ABILITY_LINE_PREFIXES表示同时存储22|范围技能行）
+        self.line_prefixes = line_prefixes
+        self.raw_lines = []
+        self.line_numbers = array.array('I')
+        self.timestamps = array.array('q')
+        self.source_ids = array.array('I')
+        self.ability_ids = array.array('I')
+        self.target_ids = array.array('I')
+        self.flags = array.array('I')
+        self.damage = array.array('I')
+        self.source_codes = array.array('I')
+        self.ability_codes = array.array('I')
+        self.target_codes = array.array('I')
+        self.segment_ids = array.array('I')
+        self.sources = StringPool()
+        self.abilities = StringPool()
+        self.targets = StringPool()
+        # 当前地图区段序号：每遇到行号为1的行（文件开头或01|切换行）加1
+        self.segment_count = 0
+        self.observers = []
+        # 撤销记录（UndoJournal），为None时不记录修改
+        self.journal = None
+
+    @classmethod
+    def from_lines(cls, lines_with_numbers: Iterable[Tuple[str, int]]) -> 'CombatTable':
+        """
+        由(行内容, 行号)序列构建列式表，非21|行被忽略
+
+        Args:
+            lines_with_numbers: parse_log_file_with_line_numbers的输出或同格式的可迭代对象
+
+        Returns:
+            CombatTable实例
+        """
+        table = cls()
+        for line, line_number in lines_with_numbers:
+            table.append(line, line_number)
+        return table
+
+    @classmethod
+    @instrument('table_build', items=len)
+    def from_file(cls, file_path: str) -> 'CombatTable':
+        """流式读取日志文件并构建列式表"""
+        table = cls()
+        for line, line_number, _ in iter_log_file_with_line_numbers(file_path):
+            table.append(line, line_number)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.raw_lines)
+
+    def append(self, line: str, line_number: int) -> Optional[int]:
+        """
+        追加一行战斗日志
+
+        Args:
+            line: 日志行
+            line_number: 行号
+
+        Returns:
+            新行的行ID，不是21|战斗日志行时返回None
+        """
+        if line_number == 1:
+            self.segment_count += 1
+
+        values = _split_combat_line(line, self.line_prefixes)
+        if values is None:
+            return None
+
+        row = len(self.raw_lines)
+        self.raw_lines.append(line.strip())
+        self.line_numbers.append(line_number)
+        self.segment_ids.append(max(self.segment_count - 1, 0))
+        self._append_values(values)
+        for observer in self.observers:
+            observer.row_appended(row)
+        return row
+
+    def extend_parsed(self, rows: Iterable[tuple]) -> int:
+        """
+        追加parse_combat_rows的解析结果
+
+        Args:
+            rows: parse_combat_rows返回的行元组
+
+        Returns:
+            新增的行数
+        """
+        first = len(self.raw_lines)
+        for parsed in rows:
+            if parsed[1] == 1:
+                self.segment_count += 1
+            if parsed[0] is None:
+                continue
+
+            (line, line_number, timestamp, source_id, ability_id, target_id,
+             flags, damage, source, ability, target) = parsed
+            row = len(self.raw_lines)
+            self.raw_lines.append(line)
+            self.line_numbers.append(line_number)
+            self.segment_ids.append(max(self.segment_count - 1, 0))
+            self.timestamps.append(timestamp)
+            self.source_ids.append(source_id)
+            self.ability_ids.append(ability_id)
+            self.target_ids.append(target_id)
+            self.flags.append(flags)
+            self.damage.append(damage)
+            self.source_codes.append(self.sources.intern(source))
+            self.ability_codes.append(self.abilities.intern(ability))
+            self.target_codes.append(self.targets.intern(target))
+            for observer in self.observers:
+                observer.row_appended(row)
+        return len(self.raw_lines) - first
+
+    def _append_values(self, values: Sequence[str]) -> None:
+        """将切分后的字段值写入各列（不含原始行和行号）"""
+        timestamp, source_id, source, ability_id, ability, target_id, target, flags, damage = values[:9]
+        self.timestamps.append(parse_timestamp_ns(timestamp))
+        self.source_ids.append(parse_hex(source_id))
+        self.ability_ids.append(parse_hex(ability_id))
+        self.target_ids.append(parse_hex(target_id))
+        self.flags.append(parse_hex(flags))
+        self.damage.append(parse_hex(damage))
+        self.source_codes.append(self.sources.intern(source))
+        self.ability_codes.append(self.abilities.intern(ability))
+        self.target_codes.append(self.targets.intern(target))
+
+    def add_observer(self, observer) -> None:
+        """
+        注册行变化观察者（例如伤害汇总、倒排索引）
+
+        观察者需要实现row_appended(row)和row_changed(row, old_key)，
+        old_key为修改前的row_key(row)。
+        """
+        self.observers.append(observer)
+
+    def remove_observer(self, observer) -> None:
+        """注销行变化观察者"""
+        self.observers.remove(observer)
+
+    def row_key(self, row: int) -> Tuple[int, int, int, int, int, int]:
+        """返回(区段, 目标编码, 来源编码, 技能编码, 伤害字段, 标志字段)"""
+        return (self.segment_ids[row], self.target_codes[row], self.source_codes[row],
+                self.ability_codes[row], self.damage[row], self.flags[row])
+
+    def set_line(self, row: int, line: str) -> None:
+        """
+        用修改后的日志行替换某行，并更新各列
+
+        Args:
+            row: 行ID
+            line: 新的日志行（必须仍是21|战斗日志行）
+        """
+        values = _split_combat_line(line, self.line_prefixes)
+        if values is None:
+            raise ValueError(f"不是有效的21|战斗日志行: {line}")
+
+        line = line.strip()
+        if self.journal is not None:
+            self.journal.record_lines([row], [self.raw_lines[row]], [line])
+        old_key = self.row_key(row)
+        self.raw_lines[row] = line
+        self._store_values(row, values)
+        for observer in self.observers:
+            observer.row_changed(row, old_key)
+
+    def _store_values(self, row: int, values: Sequence[str]) -> None:
+        """用切分后的字段值覆盖某行的各列（不含原始行和行号）"""
+        timestamp, source_id, source, ability_id, ability, target_id, target, flags, damage = values[:9]
+        self.timestamps[row] = parse_timestamp_ns(timestamp)
+        self.source_ids[row] = parse_hex(source_id)
+        self.ability_ids[row] = parse_hex(ability_id)
+        self.target_ids[row] = parse_hex(target_id)
+        self.flags[row] = parse_hex(flags)
+        self.damage[row] = parse_hex(damage)
+        self.source_codes[row] = self.sources.intern(source)
+        self.ability_codes[row] = self.abilities.intern(ability)
+        self.target_codes[row] = self.targets.intern(target)
+
+    def record(self, row: int) -> CombatRecord:
+        """返回某行的CombatRecord"""
+        return tuple.__new__(CombatRecord, _split_combat_line(self.raw_lines[row], self.line_prefixes))
+
+    def row(self, row: int) -> dict:
+        """
+        将某行具体化为字典（parse_log_line的字段加上line_number和raw_line）
+
+        Args:
+            row: 行ID
+
+        Returns:
+            字段字典
+        """
+        data = self.record(row).to_dict()
+        data['line_number'] = self.line_numbers[row]
+        data['raw_line'] = self.raw_lines[row]
+        return data
+
+    def _code_filter(self, rows: Optional[Sequence[int]], codes: array.array, code: int) -> List[int]:
+        """按编码列筛选行ID"""
+        if rows is None:
+            return list(itertools.compress(range(len(codes)), map(code.__eq__, codes)))
+        return [row for row in rows if codes[row] == code]
+
+    @instrument('filter', items=len)
+    def filter(self, source: Optional[str] = None, ability: Optional[str] = None,
+               target: Optional[str] = None, rows: Optional[Sequence[int]] = None,
+               start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+               segment: Optional[int] = None) -> List[int]:
+        """
+        按来源、技能、目标、时间窗口和地图区段筛选（参数为None表示不限制）
+
+        Args:
+            source: 来源名称
+            ability: 技能名称
+            target: 目标名称
+            rows: 仅在这些行ID中筛选，None表示全部行
+            start_ns: 时间窗口起点（纪元纳秒，包含）
+            end_ns: 时间窗口终点（纪元纳秒，不包含）
+            segment: 地图区段序号（01|切换行之间的一段）
+
+        Returns:
+            按升序排列的行ID列表
+        """
+        if segment is not None:
+            rows = self._code_filter(rows, self.segment_ids, segment)
+
+        criteria = {'source': source, 'ability': ability, 'target': target}
+        for name, value in criteria.items():
+            if value is None:
+                continue
+            column_name, pool_name = self.NAME_COLUMNS[name]
+            code = getattr(self, pool_name).lookup(value)
+            if code is None:
+                return []
+            rows = self._code_filter(rows, getattr(self, column_name), code)
+
+        if start_ns is not None or end_ns is not None:
+            low = INVALID_TIMESTAMP + 1 if start_ns is None else start_ns
+            high = (1 << 63) - 1 if end_ns is None else end_ns
+            timestamps = self.timestamps
+            candidates = range(len(self)) if rows is None else rows
+            rows = [row for row in candidates if low <= timestamps[row] < high]
+
+        if rows is None:
+            return list(range(len(self)))
+        return list(rows)
+
+    def slice(self, start: int, stop: int) -> List[int]:
+        """返回[start, stop)范围内的行ID列表"""
+        return list(range(max(start, 0), min(stop, len(self))))
+
+    def materialize(self, rows: Iterable[int]) -> List[dict]:
+        """将一组行ID具体化为字典列表"""
+        return [self.row(row) for row in rows]
+
+    def unique_values(self, rows: Optional[Sequence[int]] = None) -> Dict[str, List[str]]:
+        """
+        提取来源、技能、目标的唯一值（用于筛选下拉框）
+
+        Args:
+            rows: 仅统计这些行ID，None表示全部行
+
+        Returns:
+            {'sources': [...], 'abilities': [...], 'targets': [...]}，各列表已排序
+        """
+        result = {}
+        for column_name, pool_name in self.NAME_COLUMNS.values():
+            codes = getattr(self, column_name)
+            present = set(codes) if rows is None else {codes[row] for row in rows}
+            values = getattr(self, pool_name).values
+            result[pool_name] = sorted(values[code] for code in present)
+        return result
+
+    def rewrite_field(self, rows: Sequence[int], field_index: int, values: Sequence[str]) -> None:
+        """
+        批量修改若干行的同一字段，并按行号批量重新计算校验码
+
+        只更新raw_lines，对应的数值列由调用方维护。
+
+        Args:
+            rows: 行ID
+            field_index: 字段在行中的位置（0为类型码）
+            values: 每行的新字段文本
+        """
+        raw_lines = self.raw_lines
+        line_numbers = self.line_numbers
+        old_values = [] if self.journal is not None else None
+        with timed('resign') as timing:
+            pending = []
+            for row, value in zip(rows, values):
+                # 只定位被修改的字段，避免把整行（通常有几十个字段）切分再拼接
+                line = raw_lines[row]
+                start = 0
+                for _ in range(field_index):
+                    start = line.index('|', start) + 1
+                end = line.index('|', start)
+                if old_values is not None:
+                    old_values.append(line[start:end])
+                body = line[:start] + value + line[end:line.rindex('|')]
+                pending.append(([body], line_numbers[row]))
+
+            checksums = iter_checksums_with_line_numbers(pending)
+            for row, (parts, _), checksum in zip(rows, pending, checksums):
+                raw_lines[row] = parts[0] + '|' + checksum
+            timing['items'] = len(pending)
+
+        if old_values:
+            self.journal.record(rows, field_index, old_values, values)
+
+    def set_fields(self, rows: Sequence[int], field_index: int, values: Sequence[str]) -> None:
+        """
+        批量修改若干行的同一字段，重新签名并同步更新各列（用于撤销/重做）
+
+        Args:
+            rows: 行ID
+            field_index: 字段在行中的位置（0为类型码）
+            values: 每行的新字段文本
+        """
+        old_keys = [self.row_key(row) for row in rows]
+        self.rewrite_field(rows, field_index, values)
+        for row, old_key in zip(rows, old_keys):
+            self._store_values(row, _split_combat_line(self.raw_lines[row], self.line_prefixes))
+            for observer in self.observers:
+                observer.row_changed(row, old_key)
+
+    def scale_damage(self, multiplier: float, source: Optional[str] = None,
+                     ability: Optional[str] = None, target: Optional[str] = None,
+                     start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                     rows: Optional[Sequence[int]] = None) -> Dict:
+        """
+        按条件批量缩放伤害值并重新签名
+
+        先按条件筛选出行，一次性解码伤害列、乘以倍率（四舍五入）并重新编码，
+        最后批量重新计算这些行的校验码。
+
+        Args:
+            multiplier: 伤害倍率
+            source, ability, target, start_ns, end_ns, rows: 筛选条件，含义同filter
+
+        Returns:
+            修改摘要：matched（匹配行数）、changed（实际变化的行ID列表）、
+            old_total / new_total（匹配行修改前后的伤害合计）
+        """
+        if multiplier < 0:
+            raise ValueError(f"伤害倍率不能为负数: {multiplier}")
+
+        matched = self.filter(source, ability, target, rows, start_ns, end_ns)
+        damage = self.damage
+        old_values = [decode_damage_value(damage[row]) for row in matched]
+        new_values = [min(int(round(value * multiplier)), MAX_DAMAGE) for value in old_values]
+
+        changed = []
+        old_keys = []
+        fields = []
+        for row, old, new in zip(matched, old_values, new_values):
+            if old == new:
+                continue
+            old_keys.append(self.row_key(row))
+            raw = encode_damage_value(new, damage[row])
+            damage[row] = raw
+            changed.append(row)
+            fields.append(format_hex_field(raw, self.raw_lines[row].split('|', 10)[9]))
+
+        # 先更新原始行再通知观察者，保证观察者读到的行与数值列一致
+        self.rewrite_field(changed, 9, fields)
+        for row, old_key in zip(changed, old_keys):
+            for observer in self.observers:
+                observer.row_changed(row, old_key)
+
+        return {
+            'matched': len(matched),
+            'changed': changed,
+            'old_total': sum(old_values),
+            'new_total': sum(new_values),
+        }
+
+    def shift_time(self, delta_ns: int, source: Optional[str] = None,
+                   ability: Optional[str] = None, target: Optional[str] = None,
+                   start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                   rows: Optional[Sequence[int]] = None, segment: Optional[int] = None) -> Dict:
+        """
+        按条件批量平移时间戳并重新签名
+
+        在纪元纳秒时间列上一次性加上偏移量，再按每行原有的格式（小数位数和时区）
+        写回时间戳文本，最后批量重新计算这些行的校验码。
+
+        Args:
+            delta_ns: 偏移量（纳秒，可为负数）
+            source, ability, target, start_ns, end_ns, rows, segment: 筛选条件，含义同filter
+
+        Returns:
+            修改摘要：matched（匹配行数）、changed（实际变化的行ID列表）
+        """
+        matched = self.filter(source, ability, target, rows, start_ns, end_ns, segment)
+        if not delta_ns:
+            return {'matched': len(matched), 'changed': []}
+
+        timestamps = self.timestamps
+        raw_lines = self.raw_lines
+        changed = []
+        old_keys = []
+        fields = []
+        for row in matched:
+            ns = timestamps[row]
+            if ns == INVALID_TIMESTAMP:
+                continue
+            old_keys.append(self.row_key(row))
+            ns += delta_ns
+            timestamps[row] = ns
+            changed.append(row)
+            fields.append(format_timestamp_ns(ns, raw_lines[row].split('|', 2)[1]))
+
+        self.rewrite_field(changed, 1, fields)
+        for row, old_key in zip(changed, old_keys):
+            for observer in self.observers:
+                observer.row_changed(row, old_key)
+
+        return {'matched': len(matched), 'changed': changed}
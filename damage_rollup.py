@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV伤害汇总模块
+按(地图区段, 目标, 来源, 技能)维护伤害合计，随条目修改增量更新
+只统计标志字段表示造成伤害的行，治疗、闪避和附加状态不计入
+"""
+
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from combat_table import CombatTable, decode_damage_value, is_damage_effect
+
+class DamageRollup:
+    """伤害汇总（注册为CombatTable的观察者后自动随修改更新）"""
+
+    def __init__(self, table: CombatTable):
+        self.table = table
+        # (区段, 目标, 来源, 技能) -> 伤害合计，键均为驻留编码
+        self.totals = defaultdict(int)
+        # (区段, 目标) -> 伤害合计
+        self.segment_target_totals = defaultdict(int)
+        # 目标 -> 整个文件的伤害合计
+        self.target_totals = defaultdict(int)
+
+        for row in range(len(table)):
+            self.row_appended(row)
+        table.add_observer(self)
+
+    def close(self) -> None:
+        """停止跟随CombatTable的修改"""
+        self.table.remove_observer(self)
+
+    def _add(self, key: Tuple[int, int, int, int, int, int], sign: int) -> None:
+        """按row_key累加或扣除一行的伤害"""
+        segment, target, source, ability, raw, flags = key
+        if not is_damage_effect(flags):
+            return
+        damage = decode_damage_value(raw) * sign
+        if not damage:
+            return
+        self.totals[(segment, target, source, ability)] += damage
+        self.segment_target_totals[(segment, target)] += damage
+        self.target_totals[target] += damage
+
+    def row_appended(self, row: int) -> None:
+        """CombatTable新增行时调用"""
+        self._add(self.table.row_key(row), 1)
+
+    def row_changed(self, row: int, old_key: Tuple[int, int, int, int, int, int]) -> None:
+        """CombatTable修改行时调用"""
+        self._add(old_key, -1)
+        self._add(self.table.row_key(row), 1)
+
+    def target_total(self, target: str, segment: Optional[int] = None) -> int:
+        """
+        查询目标受到的伤害合计
+
+        Args:
+            target: 目标名称
+            segment: 地图区段序号，None表示整个文件
+
+        Returns:
+            伤害合计
+        """
+        code = self.table.targets.lookup(target)
+        if code is None:
+            return 0
+        if segment is None:
+            return self.target_totals.get(code, 0)
+        return self.segment_target_totals.get((segment, code), 0)
+
+    def total(self, target: str, source: str, ability: str, segment: int) -> int:
+        """查询某区段内某来源的某技能对某目标造成的伤害合计"""
+        table = self.table
+        key = (segment, table.targets.lookup(target), table.sources.lookup(source),
+               table.abilities.lookup(ability))
+        return self.totals.get(key, 0)
+
+    def breakdown(self, target: str, segment: Optional[int] = None) -> Dict[Tuple[str, str], int]:
+        """
+        按(来源, 技能)拆分目标受到的伤害
+
+        Args:
+            target: 目标名称
+            segment: 地图区段序号，None表示整个文件
+
+        Returns:
+            {(来源, 技能): 伤害合计}
+        """
+        table = self.table
+        code = table.targets.lookup(target)
+        result = defaultdict(int)
+        if code is None:
+            return {}
+        for (seg, tgt, source, ability), damage in self.totals.items():
+            if tgt == code and (segment is None or seg == segment) and damage:
+                result[(table.sources.values[source], table.abilities.values[ability])] += damage
+        return dict(result)
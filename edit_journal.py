@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV日志编辑记录模块
+记录被修改、插入和删除的行，保存时只重新计算受影响行的校验码，
+其余字节区间直接从源文件复制
+"""
+
+import bisect
+import os
+import shutil
+import tempfile
+from typing import List, Tuple, Dict, Iterable
+
+from checksum_calculator import resign_log_line
+from log_index import LogIndex
+from perf_monitor import timed
+
+# 复制未修改区间时每次读写的字节数
+COPY_CHUNK_SIZE = 1 << 20
+
+# 备份文件后缀（与原保存逻辑一致）
+BACKUP_SUFFIX = '.backup'
+
+# 内核态复制可用性（首次失败后不再尝试）
+_KERNEL_COPY = {
+    'copy_file_range': hasattr(os, 'copy_file_range'),
+    'sendfile': hasattr(os, 'sendfile') and os.name == 'posix',
+}
+
+def _kernel_copy(src_fd: int, dst_fd: int, start: int, count: int) -> int:
+    """
+    使用copy_file_range或sendfile在内核中复制字节，目标写入位置为当前文件位置
+
+    Returns:
+        已复制的字节数（不支持时可能为0，由调用方继续复制剩余部分）
+    """
+    copied = 0
+    for name in ('copy_file_range', 'sendfile'):
+        if not _KERNEL_COPY[name]:
+            continue
+        try:
+            while copied < count:
+                if name == 'copy_file_range':
+                    n = os.copy_file_range(src_fd, dst_fd, count - copied, start + copied)
+                else:
+                    n = os.sendfile(dst_fd, src_fd, start + copied, count - copied)
+                if n <= 0:
+                    break
+                copied += n
+            return copied
+        except OSError:
+            _KERNEL_COPY[name] = False
+    return copied
+
+def _copy_range(src, dst, start: int, end: int) -> int:
+    """将源文件[start, end)区间的字节复制到目标文件，返回复制的字节数"""
+    dst.flush()
+    copied = _kernel_copy(src.fileno(), dst.fileno(), start, end - start)
+
+    src.seek(start + copied)
+    remaining = end - start - copied
+    while remaining > 0:
+        chunk = src.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        dst.write(chunk)
+        remaining -= len(chunk)
+    return end - start - remaining
+
+def _fsync_directory(path: str) -> None:
+    """同步目录项，确保重命名在崩溃后仍然生效（Windows上不支持，忽略）"""
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _make_backup(file_path: str, backup_path: str) -> bool:
+    """
+    为原文件创建备份而不复制数据：优先建立硬链接（替换原文件后备份仍指向旧内容），
+    文件系统不支持硬链接时将原文件重命名为备份
+
+    Returns:
+        原文件是否被重命名为备份（此时原路径暂时不存在）
+    """
+    if os.path.exists(backup_path):
+        os.remove(backup_path)
+    try:
+        os.link(file_path, backup_path)
+        return False
+    except OSError:
+        os.replace(file_path, backup_path)
+        return True
+
+class EditJournal:
+    """日志编辑记录（行ID为LogIndex中的行索引）"""
+
+    def __init__(self, index: LogIndex):
+        self.index = index
+        self.replaced = {}
+        self.deleted = set()
+        self.inserted = {}
+
+    def replace_line(self, row: int, line: str) -> None:
+        """
+        修改某行内容（校验码在保存时重新计算）
+
+        Args:
+            row: 行ID
+            line: 新的完整日志行，最后一个字段视为校验码
+        """
+        if row in self.deleted:
+            raise ValueError(f"第{row}行已被删除")
+        self.replaced[row] = line.strip()
+
+    def insert_lines(self, row: int, lines: Iterable[str]) -> None:
+        """
+        在某行之前插入新行
+
+        Args:
+            row: 行ID，等于行数时表示追加到文件末尾
+            lines: 新的完整日志行，最后一个字段视为校验码
+        """
+        if not 0 <= row <= len(self.index):
+            raise IndexError(f"无效的行ID: {row}")
+        self.inserted.setdefault(row, []).extend(line.strip() for line in lines)
+
+    def delete_line(self, row: int) -> None:
+        """删除某行"""
+        self.replaced.pop(row, None)
+        self.deleted.add(row)
+
+    def has_changes(self) -> bool:
+        """是否存在未保存的修改"""
+        return bool(self.replaced or self.deleted or self.inserted)
+
+    def clear(self) -> None:
+        """清空编辑记录"""
+        self.replaced.clear()
+        self.deleted.clear()
+        self.inserted.clear()
+
+    def affected_ranges(self) -> List[Tuple[int, int]]:
+        """
+        计算保存时需要重新生成的行区间
+
+        修改只影响该行本身；插入、删除或改变01|地图切换行会使同一地图区段内
+        之后所有行的行号变化，因此影响到区段末尾。
+
+        Returns:
+            按升序排列且互不重叠的[起始行ID, 结束行ID)区间列表
+        """
+        index = self.index
+        count = len(index)
+        segment_starts = index.segment_starts()
+
+        structural = set(self.deleted)
+        structural.update(row for row in self.inserted if row < count)
+        for row, line in self.replaced.items():
+            if line.startswith('01|') != (index.type_codes[row] == 1):
+                structural.add(row)
+
+        ranges = [(row, row + 1) for row in self.replaced]
+        for row in structural:
+            segment = bisect.bisect_right(segment_starts, row)
+            end = segment_starts[segment] if segment < len(segment_starts) else count
+            ranges.append((row, end))
+
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _newline_of(self, row: int) -> str:
+        """返回某行在源文件中使用的换行符，文件末尾无换行时返回空字符串"""
+        start, end = self.index.line_span(row)
+        if end >= self.index.file_size:
+            return ''
+        return '\r\n' if self.index.raw_line(row).endswith(b'\r') else '\n'
+
+    def write_to(self, dst_path: str) -> Dict[str, int]:
+        """
+        将修改后的日志写入新文件
+
+        Args:
+            dst_path: 目标文件路径（不能是源文件本身）
+
+        Returns:
+            统计信息：resigned（重新计算校验码的行数）、copied_bytes（直接复制的字节数）
+        """
+        with timed('save') as timing, open(self.index.file_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            timing['items'] = len(self.index)
+            return self._write(src, dst)
+
+    def save(self, backup: bool = True, reindex: bool = True) -> Dict[str, int]:
+        """
+        原子地保存修改到原文件
+
+        修改后的内容先流式写入同目录的临时文件并落盘，再用os.replace替换原文件，
+        任何时刻崩溃都不会留下写了一半的日志。备份通过硬链接或重命名创建，不复制数据。
+
+        Args:
+            backup: 是否保留原文件为 原文件名 + .backup
+            reindex: 保存后是否重新扫描新文件建立索引（否则调用方需要自行提供新索引）
+
+        Returns:
+            统计信息，同write_to
+        """
+        file_path = self.index.file_path
+        directory = os.path.dirname(os.path.abspath(file_path))
+        backup_path = file_path + BACKUP_SUFFIX
+        moved = False
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(file_path),
+                                        suffix='.tmp')
+        try:
+            with timed('save') as timing, open(self.index.file_path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                timing['items'] = len(self.index)
+                stats = self._write(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            # mkstemp创建的文件权限为0600，替换前沿用原文件的权限
+            shutil.copymode(file_path, tmp_path)
+
+            # Windows上映射中的文件无法被替换，先关闭索引的内存映射
+            self.index.close()
+            if backup:
+                moved = _make_backup(file_path, backup_path)
+            os.replace(tmp_path, file_path)
+            _fsync_directory(directory)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            # 原文件已被重命名为备份但未被替换时，恢复原文件
+            if moved and not os.path.exists(file_path):
+                os.replace(backup_path, file_path)
+            raise
+
+        self.clear()
+        if reindex:
+            self.index = LogIndex.build(file_path)
+        return stats
+
+    def _write(self, src, dst) -> Dict[str, int]:
+        """将修改后的内容从源文件对象写入目标文件对象"""
+        index = self.index
+        count = len(index)
+        offsets = index.offsets
+        line_numbers = index.line_numbers
+        file_size = index.file_size
+        default_newline = self._newline_of(0) if count else '\n'
+        default_newline = default_newline or '\n'
+
+        stats = {'resigned': 0, 'copied_bytes': 0}
+        state = {'number': 1, 'at_line_start': True}
+
+        def copy(start: int, end: int) -> None:
+            if start >= end:
+                return
+            stats['copied_bytes'] += _copy_range(src, dst, start, end)
+            src.seek(end - 1)
+            state['at_line_start'] = src.read(1) == b'\n'
+
+        def write_line(line: str, newline: str, original_number: int = 0) -> None:
+            if not state['at_line_start']:
+                dst.write(default_newline.encode('utf-8'))
+            if line.startswith('01|'):
+                state['number'] = 1
+            number = state['number']
+            state['number'] += 1
+            if number != original_number:
+                line = resign_log_line(line, number)
+                stats['resigned'] += 1
+            dst.write((line + newline).encode('utf-8'))
+            state['at_line_start'] = bool(newline)
+
+        def row_end(row: int) -> int:
+            return offsets[row + 1] if row + 1 < count else file_size
+
+        def copy_gap(row: int) -> None:
+            # 行尾换行符之后到下一行之前的空行原样保留
+            line_end = index.line_span(row)[1]
+            copy(min(line_end + 1, file_size), row_end(row))
+
+        position = 0
+        previous_end = None
+        for start, end in self.affected_ranges():
+            copy(position, offsets[start] if start < count else file_size)
+            if start != previous_end:
+                state['number'] = line_numbers[start - 1] + 1 if start > 0 else 1
+
+            for row in range(start, end):
+                for line in self.inserted.get(row, ()):
+                    write_line(line, default_newline)
+                if row in self.deleted:
+                    copy_gap(row)
+                    continue
+
+                if row in self.replaced:
+                    write_line(self.replaced[row], self._newline_of(row))
+                    copy_gap(row)
+                else:
+                    expected = 1 if index.type_codes[row] == 1 else state['number']
+                    if expected == line_numbers[row]:
+                        # 行号未变化的行直接复制原始字节
+                        state['number'] = expected + 1
+                        copy(offsets[row], row_end(row))
+                    else:
+                        write_line(index.line(row), self._newline_of(row),
+                                   line_numbers[row])
+                        copy_gap(row)
+
+            position = row_end(end - 1) if end > start else position
+            previous_end = end
+
+        copy(position, file_size)
+
+        tail = self.inserted.get(count, ())
+        if tail:
+            if previous_end != count:
+                state['number'] = line_numbers[count - 1] + 1 if count else 1
+            for line in tail:
+                write_line(line, default_newline)
+
+        return stats
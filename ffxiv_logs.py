@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV日志命令行批量编辑工具（无需图形界面）
+用法: python -m ffxiv_logs edit --rules rules.json [-o 输出目录] [-j 进程数] 日志文件...
+      python -m ffxiv_logs validate [-j 进程数] 日志文件...
+
+规则文件为JSON数组，每条规则包含筛选条件和若干操作，例如：
+[
+  {"filter": {"source": "光之战士", "ability": "烈刃"}, "multiplier": 1.2},
+  {"filter": {"types": ["21", "22"]}, "time_offset": -3.5},
+  {"filter": {"target": "木人"}, "rename": {"target": "训练木人"}}
+]
+filter中的source/ability/target按名称精确匹配，types为行类型码（默认只处理21|行）；
+multiplier为伤害倍率，time_offset为时间偏移（秒），rename为字段重命名。
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+from checksum_calculator import (iter_log_file_with_line_numbers, calculate_checksum_with_line_number,
+                                 validate_log_file, LogParseError)
+from combat_table import (decode_damage_value, encode_damage_value, format_hex_field,
+                          parse_hex, shift_timestamp, MAX_DAMAGE)
+
+# 规则中可用的筛选字段和可重命名字段 -> 在行中的位置（21|/22|行格式）
+NAME_FIELDS = {'source': 3, 'ability': 5, 'target': 7}
+
+# 规则允许的键
+_RULE_KEYS = {'filter', 'multiplier', 'time_offset', 'rename'}
+_FILTER_KEYS = set(NAME_FIELDS) | {'types'}
+
+# 默认输出文件名后缀
+DEFAULT_SUFFIX = '_edited'
+
+def load_rules(rules_path: str) -> List[Dict]:
+    """
+    读取并检查规则文件
+
+    Args:
+        rules_path: JSON规则文件路径
+
+    Returns:
+        规则列表（types已规范化为字符串集合，time_offset已转换为纳秒）
+
+    Raises:
+        ValueError: 规则格式错误
+    """
+    with open(rules_path, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+    if isinstance(rules, dict):
+        rules = [rules]
+    if not isinstance(rules, list):
+        raise ValueError("规则文件必须是JSON数组")
+
+    normalized = []
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            raise ValueError(f"第{i + 1}条规则必须是JSON对象")
+        unknown = set(rule) - _RULE_KEYS
+        if unknown:
+            raise ValueError(f"第{i + 1}条规则包含未知字段: {', '.join(sorted(unknown))}")
+        conditions = dict(rule.get('filter') or {})
+        unknown = set(conditions) - _FILTER_KEYS
+        if unknown:
+            raise ValueError(f"第{i + 1}条规则的筛选条件包含未知字段: {', '.join(sorted(unknown))}")
+        rename = dict(rule.get('rename') or {})
+        unknown = set(rename) - set(NAME_FIELDS)
+        if unknown:
+            raise ValueError(f"第{i + 1}条规则的重命名包含未知字段: {', '.join(sorted(unknown))}")
+        multiplier = rule.get('multiplier')
+        if multiplier is not None and (not isinstance(multiplier, (int, float)) or multiplier < 0):
+            raise ValueError(f"第{i + 1}条规则的倍率无效: {multiplier}")
+
+        types = conditions.pop('types', ['21'])
+        if isinstance(types, (str, int)):
+            types = [types]
+        if not isinstance(types, list) or not all(isinstance(code, (str, int)) for code in types):
+            raise ValueError(f"第{i + 1}条规则的types必须是行类型码数组: {types}")
+        time_offset = rule.get('time_offset')
+        normalized.append({
+            'types': {str(code).zfill(2) for code in types},
+            'names': {NAME_FIELDS[key]: value for key, value in conditions.items()},
+            'multiplier': multiplier,
+            'time_offset_ns': None if time_offset is None else int(round(float(time_offset) * 1e9)),
+            'rename': {NAME_FIELDS[key]: value for key, value in rename.items()},
+        })
+    return normalized
+
+def apply_rules(parts: List[str], rules: List[Dict]) -> bool:
+    """
+    对一行的各字段（含末尾校验码）依次应用规则
+
+    Args:
+        parts: 按|切分的字段列表，就地修改
+        rules: load_rules返回的规则
+
+    Returns:
+        是否有字段被修改
+    """
+    changed = False
+    for rule in rules:
+        if parts[0] not in rule['types']:
+            continue
+        if any(len(parts) <= pos or parts[pos] != value for pos, value in rule['names'].items()):
+            continue
+
+        if rule['multiplier'] is not None and len(parts) > 10:
+            raw = parse_hex(parts[9])
+            damage = decode_damage_value(raw)
+            new_damage = min(int(round(damage * rule['multiplier'])), MAX_DAMAGE)
+            if new_damage != damage:
+                parts[9] = format_hex_field(encode_damage_value(new_damage, raw), parts[9])
+                changed = True
+
+        if rule['time_offset_ns'] and len(parts) > 2:
+            shifted = shift_timestamp(parts[1], rule['time_offset_ns'])
+            if shifted != parts[1]:
+                parts[1] = shifted
+                changed = True
+
+        for pos, value in rule['rename'].items():
+            if len(parts) > pos + 1 and parts[pos] != value:
+                parts[pos] = value
+                changed = True
+    return changed
+
+def edit_file(file_path: str, output_path: str, rules: List[Dict]) -> Dict:
+    """
+    流式编辑一个日志文件并写入新文件，修改过的行按行号重新计算校验码
+
+    未修改的内容（包括空行和换行符）按原字节复制，输出文件只有被修改的行不同。
+
+    Args:
+        file_path: 输入日志文件
+        output_path: 输出文件
+        rules: load_rules返回的规则
+
+    Returns:
+        统计信息：file、output、lines、changed
+    """
+    lines = 0
+    changed = 0
+    with open(file_path, 'rb') as src, open(output_path, 'wb') as out:
+        size = os.fstat(src.fileno()).st_size
+        data = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            copied = 0
+            for line, line_number, offset in iter_log_file_with_line_numbers(file_path):
+                lines += 1
+                parts = line.split('|')
+                if len(parts) < 2 or not apply_rules(parts, rules):
+                    continue
+                # 行内容在原文件中的位置（行首可能有被strip掉的空白）
+                old = line.encode('utf-8')
+                line_end = data.find(b'\n', offset)
+                start = data.find(old, offset, size if line_end < 0 else line_end)
+                parts[-1] = calculate_checksum_with_line_number(parts[:-1], line_number)
+                out.write(data[copied:start])
+                out.write('|'.join(parts).encode('utf-8'))
+                copied = start + len(old)
+                changed += 1
+            out.write(data[copied:])
+        except BaseException:
+            # 不留下写了一半的输出文件
+            out.close()
+            os.remove(output_path)
+            raise
+        finally:
+            if size:
+                data.close()
+    return {'file': file_path, 'output': output_path, 'lines': lines, 'changed': changed}
+
+def output_path_for(file_path: str, output_dir: Optional[str], suffix: str) -> str:
+    """计算输出文件路径：输出目录下同名文件，或原目录下加后缀的文件"""
+    if output_dir:
+        return os.path.join(output_dir, os.path.basename(file_path))
+    root, ext = os.path.splitext(file_path)
+    return root + suffix + ext
+
+# 单个文件处理失败时报告并继续处理其他文件的异常
+FILE_ERRORS = (LogParseError, OSError)
+
+def _run_parallel(func, jobs: List[tuple], workers: int) -> List[Tuple[Optional[Dict], Optional[Exception]]]:
+    """
+    在进程池中并行处理多个文件（workers<=1或只有一个文件时串行）
+
+    Returns:
+        与jobs顺序一致的(结果, 异常)列表，文件读写或解析失败时结果为None
+    """
+    def collect(call) -> Tuple[Optional[Dict], Optional[Exception]]:
+        try:
+            return call(), None
+        except FILE_ERRORS as e:
+            return None, e
+
+    if workers <= 1 or len(jobs) <= 1:
+        return [collect(lambda job=job: func(*job)) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = [executor.submit(func, *job) for job in jobs]
+        return [collect(future.result) for future in futures]
+
+def _missing_files(files: List[str]) -> bool:
+    """检查输入文件是否存在，并打印不存在的文件"""
+    missing = [path for path in files if not os.path.isfile(path)]
+    for path in missing:
+        print(f"✗ 文件不存在: {path}")
+    return bool(missing)
+
+def cmd_edit(args) -> int:
+    """edit子命令"""
+    if _missing_files(args.files):
+        return 2
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as e:
+        print(f"✗ 读取规则失败: {e}")
+        return 2
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = []
+    for file_path in args.files:
+        output_path = output_path_for(file_path, args.output_dir, args.suffix)
+        if os.path.abspath(output_path) == os.path.abspath(file_path):
+            print(f"✗ 输出文件不能覆盖输入文件: {file_path}")
+            return 2
+        jobs.append((file_path, output_path, rules))
+
+    status = 0
+    for (file_path, _, _), (result, error) in zip(jobs, _run_parallel(edit_file, jobs, args.jobs)):
+        if error is not None:
+            print(f"✗ {file_path}: {error}")
+            status = 1
+            continue
+        print(f"✓ {result['file']} -> {result['output']}: "
+              f"{result['lines']} 行，修改 {result['changed']} 行")
+    return status
+
+def _validate_one(file_path: str, workers: int = 1) -> Dict:
+    """校验单个文件（供进程池调用）"""
+    report = validate_log_file(file_path, workers=workers)
+    report['file'] = file_path
+    return report
+
+def cmd_validate(args) -> int:
+    """validate子命令"""
+    if _missing_files(args.files):
+        return 2
+    if len(args.files) == 1:
+        results = _run_parallel(_validate_one, [(args.files[0], args.jobs)], 1)
+    else:
+        results = _run_parallel(_validate_one, [(path,) for path in args.files], args.jobs)
+
+    status = 0
+    for file_path, (report, error) in zip(args.files, results):
+        if error is not None:
+            print(f"✗ {file_path}: {error}")
+            status = 1
+            continue
+        invalid = report['invalid']
+        mark = '✓' if not invalid else '✗'
+        print(f"{mark} {report['file']}: {report['total']} 行，校验失败 {len(invalid)} 行")
+        for offset, line_number in invalid[:args.show]:
+            print(f"    字节偏移 {offset}，行号 {line_number}")
+        if invalid:
+            status = 1
+    return status
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog='python -m ffxiv_logs', description='FFXIV日志命令行批量编辑工具')
+    subparsers = parser.add_subparsers(dest='command')
+
+    edit = subparsers.add_parser('edit', help='按规则批量编辑日志并重新计算校验码')
+    edit.add_argument('files', nargs='+', help='日志文件')
+    edit.add_argument('-r', '--rules', required=True, help='JSON规则文件')
+    edit.add_argument('-o', '--output-dir', help='输出目录（默认写到原目录并添加后缀）')
+    edit.add_argument('--suffix', default=DEFAULT_SUFFIX, help=f'未指定输出目录时的文件名后缀（默认{DEFAULT_SUFFIX}）')
+    edit.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='并行处理的进程数')
+    edit.set_defaults(func=cmd_edit)
+
+    validate = subparsers.add_parser('validate', help='校验日志文件的校验码')
+    validate.add_argument('files', nargs='+', help='日志文件')
+    validate.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='并行处理的进程数')
+    validate.add_argument('--show', type=int, default=10, help='每个文件最多列出的失败行数')
+    validate.set_defaults(func=cmd_validate)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函数"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return 2
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV战斗事件倒排索引模块
+为来源、技能、目标和标志维护 值 -> 行ID有序数组 的倒排表，用于快速筛选和级联下拉框
+"""
+
+import array
+import bisect
+from typing import List, Optional, Dict, Tuple
+
+from combat_table import CombatTable
+from perf_monitor import instrument, timed
+
+class InvertedIndex:
+    """CombatTable的倒排索引（注册为观察者后随修改和追加自动更新）"""
+
+    # 筛选参数名 -> CombatTable中的列属性名
+    COLUMNS = {
+        'source': 'source_codes',
+        'ability': 'ability_codes',
+        'target': 'target_codes',
+        'flags': 'flags',
+    }
+
+    # 按名称筛选的列：筛选参数名 -> 驻留表属性名
+    NAME_POOLS = {
+        'source': 'sources',
+        'ability': 'abilities',
+        'target': 'targets',
+    }
+
+    def __init__(self, table: CombatTable):
+        self.table = table
+        self.postings = {name: {} for name in self.COLUMNS}
+
+        with timed('filter_index_build') as timing:
+            for name, column_name in self.COLUMNS.items():
+                lists = self.postings[name]
+                for row, code in enumerate(getattr(table, column_name)):
+                    posting = lists.get(code)
+                    if posting is None:
+                        posting = lists[code] = array.array('I')
+                    posting.append(row)
+            timing['items'] = len(table)
+        table.add_observer(self)
+
+    def close(self) -> None:
+        """停止跟随CombatTable的修改"""
+        self.table.remove_observer(self)
+
+    def row_appended(self, row: int) -> None:
+        """CombatTable新增行时调用（行ID递增，直接追加即可保持有序）"""
+        for name, column_name in self.COLUMNS.items():
+            code = getattr(self.table, column_name)[row]
+            lists = self.postings[name]
+            posting = lists.get(code)
+            if posting is None:
+                posting = lists[code] = array.array('I')
+            posting.append(row)
+
+    def row_changed(self, row: int, old_key: Tuple[int, int, int, int, int, int]) -> None:
+        """CombatTable修改行时调用"""
+        _, target, source, ability, _, flags = old_key
+        old_codes = {'source': source, 'ability': ability, 'target': target, 'flags': flags}
+        for name, column_name in self.COLUMNS.items():
+            new_code = getattr(self.table, column_name)[row]
+            old_code = old_codes[name]
+            if old_code == new_code:
+                continue
+            self._remove(name, old_code, row)
+            lists = self.postings[name]
+            posting = lists.get(new_code)
+            if posting is None:
+                posting = lists[new_code] = array.array('I')
+            posting.insert(bisect.bisect_left(posting, row), row)
+
+    def _remove(self, name: str, code: int, row: int) -> None:
+        """从倒排表中移除一行"""
+        posting = self.postings[name].get(code)
+        if posting is None:
+            return
+        pos = bisect.bisect_left(posting, row)
+        if pos < len(posting) and posting[pos] == row:
+            del posting[pos]
+            if not posting:
+                del self.postings[name][code]
+
+    def _criteria_codes(self, criteria: Dict[str, object]) -> Optional[Dict[str, int]]:
+        """将筛选条件转换为编码，任一名称不存在时返回None"""
+        codes = {}
+        for name, value in criteria.items():
+            if value is None:
+                continue
+            pool_name = self.NAME_POOLS.get(name)
+            code = getattr(self.table, pool_name).lookup(value) if pool_name else value
+            if code is None:
+                return None
+            codes[name] = code
+        return codes
+
+    def _intersect(self, codes: Dict[str, int]) -> Optional[List[int]]:
+        """
+        求多个条件的交集：从最短的倒排表出发，逐行探测其余列的值
+
+        Returns:
+            行ID列表，没有任何条件时返回None
+        """
+        if not codes:
+            return None
+        ordered = sorted(codes.items(), key=lambda item: len(self.postings[item[0]].get(item[1], ())))
+        name, code = ordered[0]
+        rows = self.postings[name].get(code)
+        if rows is None:
+            return []
+        rows = list(rows)
+        for name, code in ordered[1:]:
+            column = getattr(self.table, self.COLUMNS[name])
+            rows = [row for row in rows if column[row] == code]
+        return rows
+
+    @instrument('filter_index', items=len)
+    def lookup(self, source: Optional[str] = None, ability: Optional[str] = None,
+               target: Optional[str] = None, flags: Optional[int] = None) -> List[int]:
+        """
+        按条件筛选行ID（参数为None表示不限制）
+
+        Returns:
+            按升序排列的行ID列表
+        """
+        codes = self._criteria_codes({'source': source, 'ability': ability,
+                                      'target': target, 'flags': flags})
+        if codes is None:
+            return []
+        rows = self._intersect(codes)
+        return list(range(len(self.table))) if rows is None else rows
+
+    def available_values(self, source: Optional[str] = None, ability: Optional[str] = None,
+                         target: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        计算级联筛选下拉框的可选值：每个下拉框的选项由其余两个条件决定
+
+        Returns:
+            {'sources': [...], 'abilities': [...], 'targets': [...]}，各列表已排序
+        """
+        selected = {'source': source, 'ability': ability, 'target': target}
+        result = {}
+        for name, pool_name in self.NAME_POOLS.items():
+            others = {key: value for key, value in selected.items() if key != name}
+            codes = self._criteria_codes(others)
+            pool = getattr(self.table, pool_name)
+            if codes is None:
+                result[pool_name] = []
+                continue
+
+            rows = self._intersect(codes)
+            if rows is None:
+                present = self.postings[name].keys()
+            else:
+                column = getattr(self.table, self.COLUMNS[name])
+                present = {column[row] for row in rows}
+            result[pool_name] = sorted(pool.values[code] for code in present)
+        return result
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV日志行类型解码模块
+按行类型码注册解码器，用一次字典查找分派（不使用正则表达式）；解码结果按需切分，
+只有访问到的字段才会被切出。EventStore一次读取文件即可将各类型事件写入列式存储。
+
+支持的行类型：
+    21|单体技能  22|范围技能  24|DoT/HoT  25|死亡  26|获得状态
+"""
+
+import array
+from typing import Dict, Optional, Tuple, Iterable
+
+from checksum_calculator import ABILITY_LINE_PREFIXES, iter_log_file_with_line_numbers
+from combat_table import CombatTable, StringPool, parse_timestamp_ns
+from perf_monitor import instrument
+
+class LineDecoder:
+    """
+    一种行类型的字段布局
+
+    Args:
+        type_code: 行类型码（行首|之前的文本，如'24'）
+        name: 类型说明
+        fields: 字段名 -> 在行中的位置（类型码位于0）
+        name_fields: 在EventStore中按名称驻留编码的字段（用于筛选）
+    """
+
+    def __init__(self, type_code: str, name: str, fields: Dict[str, int], name_fields: Tuple[str, ...] = ()):
+        self.type_code = type_code
+        self.name = name
+        self.fields = fields
+        self.name_fields = name_fields
+        # EventStore写入列时需要切分到的位置
+        self.column_depth = max([fields['timestamp']] + [fields[field] for field in name_fields])
+
+    def decode(self, line: str, line_number: int = 0) -> 'DecodedLine':
+        """返回延迟切分的解码结果"""
+        return DecodedLine(self, line.strip(), line_number)
+
+class DecodedLine:
+    """
+    延迟解码的日志行：按字段名访问时才切分到该字段所在的位置
+
+        record = decode_line(line)
+        record.source, record.damage, record.checksum
+    """
+
+    __slots__ = ('decoder', 'line', 'line_number', '_parts')
+
+    def __init__(self, decoder: LineDecoder, line: str, line_number: int = 0):
+        self.decoder = decoder
+        self.line = line
+        self.line_number = line_number
+        self._parts = None
+
+    def field(self, pos: int) -> str:
+        """返回第pos个字段，行中没有该字段时返回空字符串"""
+        parts = self._parts
+        # 最后一个元素仍含|时是尚未切分的剩余部分
+        if parts is None or (pos >= len(parts) - 1 and '|' in parts[-1]):
+            parts = self._parts = self.line.split('|', pos + 1)
+        return parts[pos] if pos < len(parts) else ''
+
+    def __getattr__(self, name: str) -> str:
+        pos = self.decoder.fields.get(name)
+        if pos is None:
+            raise AttributeError(f"{self.decoder.type_code}|行没有字段: {name}")
+        return self.field(pos)
+
+    @property
+    def type_code(self) -> str:
+        return self.decoder.type_code
+
+    @property
+    def checksum(self) -> str:
+        """最后一个|之后的校验码"""
+        return self.line.rpartition('|')[2]
+
+    def to_dict(self) -> dict:
+        """具体化所有已声明的字段"""
+        return {name: self.field(pos) for name, pos in self.decoder.fields.items()}
+
+def _positions(*names: str, start: int = 1) -> Dict[str, int]:
+    """按顺序为连续字段编号（空字符串表示跳过的未知字段）"""
+    return {name: pos for pos, name in enumerate(names, start) if name}
+
+# 行类型码 -> 解码器（分派表）
+DECODERS = {}
+
+def register_decoder(decoder: LineDecoder) -> LineDecoder:
+    """注册（或替换）某个行类型的解码器"""
+    DECODERS[decoder.type_code] = decoder
+    return decoder
+
+_ABILITY_FIELDS = _positions('timestamp', 'source_id', 'source', 'ability_id', 'ability',
+                             'target_id', 'target', 'flags', 'damage')
+
+register_decoder(LineDecoder('21', '单体技能', _ABILITY_FIELDS, ('source', 'ability', 'target')))
+register_decoder(LineDecoder('22', '范围技能', _ABILITY_FIELDS, ('source', 'ability', 'target')))
+register_decoder(LineDecoder('24', 'DoT/HoT', dict(
+    _positions('timestamp', 'target_id', 'target', 'which', 'effect_id', 'damage',
+               'current_hp', 'max_hp', 'current_mp', 'max_mp'),
+    **_positions('source_id', 'source', 'damage_type', start=17)), ('source', 'target')))
+register_decoder(LineDecoder('25', '死亡', _positions('timestamp', 'target_id', 'target', 'source_id', 'source'),
+                             ('source', 'target')))
+register_decoder(LineDecoder('26', '获得状态', _positions(
+    'timestamp', 'effect_id', 'effect', 'duration', 'source_id', 'source', 'target_id', 'target',
+    'count', 'target_max_hp', 'source_max_hp'), ('effect', 'source', 'target')))
+
+def line_type(line: str) -> str:
+    """返回行类型码（第一个|之前的文本），行中没有|时返回空字符串"""
+    head, separator, _ = line.partition('|')
+    return head.lstrip() if separator else ''
+
+def decode_line(line: str, line_number: int = 0) -> Optional[DecodedLine]:
+    """
+    解码一行日志
+
+    Returns:
+        DecodedLine，没有对应解码器时返回None
+    """
+    decoder = DECODERS.get(line_type(line))
+    return None if decoder is None else decoder.decode(line, line_number)
+
+class EventColumns:
+    """非技能类事件的列式存储：原始行、行号、区段、时间戳和名称字段的驻留编码"""
+
+    def __init__(self, decoder: LineDecoder):
+        self.decoder = decoder
+        self.raw_lines = []
+        self.line_numbers = array.array('I')
+        self.segment_ids = array.array('I')
+        self.timestamps = array.array('q')
+        self.codes = {field: array.array('I') for field in decoder.name_fields}
+        self.pools = {field: StringPool() for field in decoder.name_fields}
+        self._timestamp_pos = decoder.fields['timestamp']
+        self._name_columns = [(decoder.fields[field], self.codes[field], self.pools[field])
+                              for field in decoder.name_fields]
+
+    def __len__(self) -> int:
+        return len(self.raw_lines)
+
+    def append(self, line: str, line_number: int, segment: int) -> int:
+        """追加一行（只切分到列所需的字段），返回行ID"""
+        line = line.strip()
+        parts = line.split('|', self.decoder.column_depth + 1)
+        count = len(parts)
+        row = len(self.raw_lines)
+        self.raw_lines.append(line)
+        self.line_numbers.append(line_number)
+        self.segment_ids.append(segment)
+        pos = self._timestamp_pos
+        self.timestamps.append(parse_timestamp_ns(parts[pos] if pos < count else ''))
+        for pos, codes, pool in self._name_columns:
+            codes.append(pool.intern(parts[pos] if pos < count else ''))
+        return row
+
+    def record(self, row: int) -> DecodedLine:
+        """返回某行的延迟解码结果"""
+        return DecodedLine(self.decoder, self.raw_lines[row], self.line_numbers[row])
+
+    def filter(self, **names: str) -> list:
+        """按名称字段精确筛选行ID，例如filter(effect='强化药', target='木人')"""
+        rows = None
+        for field, value in names.items():
+            if field not in self.pools:
+                raise ValueError(f"{self.decoder.type_code}|行不能按{field}筛选")
+            code = self.pools[field].lookup(value)
+            if code is None:
+                return []
+            codes = self.codes[field]
+            candidates = range(len(codes)) if rows is None else rows
+            rows = [row for row in candidates if codes[row] == code]
+        return list(range(len(self))) if rows is None else rows
+
+class EventStore:
+    """
+    一次读取日志，将21|/22|写入CombatTable，其余已注册类型写入各自的EventColumns
+
+    各类型共用CombatTable的区段计数（行号为1的行开始新的地图区段）。
+    """
+
+    def __init__(self, type_codes: Optional[Iterable[str]] = None):
+        self.combat = CombatTable(ABILITY_LINE_PREFIXES)
+        wanted = set(DECODERS if type_codes is None else type_codes)
+        combat_types = {prefix.rstrip('|') for prefix in ABILITY_LINE_PREFIXES}
+        self.tables = {code: EventColumns(DECODERS[code]) for code in sorted(wanted - combat_types)
+                       if code in DECODERS}
+        # 行类型码 -> 追加函数（分派表）
+        self._handlers = {code: self._append_combat for code in wanted & combat_types}
+        for code, table in self.tables.items():
+            self._handlers[code] = self._make_handler(table)
+
+    def _append_combat(self, line: str, line_number: int) -> Optional[int]:
+        return self.combat.append(line, line_number)
+
+    def _make_handler(self, table: EventColumns):
+        combat = self.combat
+
+        def handler(line: str, line_number: int) -> int:
+            if line_number == 1:
+                combat.segment_count += 1
+            return table.append(line, line_number, max(combat.segment_count - 1, 0))
+        return handler
+
+    def append(self, line: str, line_number: int) -> Optional[int]:
+        """
+        追加一行日志
+
+        Returns:
+            在对应表中的行ID，未存储的类型返回None
+        """
+        head, separator, _ = line.partition('|')
+        # 没有|的行不属于任何类型
+        handler = self._handlers.get(head.lstrip()) if separator else None
+        if handler is not None:
+            return handler(line, line_number)
+        if line_number == 1:
+            self.combat.segment_count += 1
+        return None
+
+    def __len__(self) -> int:
+        return len(self.combat) + sum(len(table) for table in self.tables.values())
+
+    def counts(self) -> Dict[str, int]:
+        """各类型已存储的行数（21|和22|合计在'21'下）"""
+        counts = {'21': len(self.combat)}
+        counts.update((code, len(table)) for code, table in self.tables.items())
+        return counts
+
+    @classmethod
+    @instrument('event_store_build', items=len)
+    def from_file(cls, file_path: str, type_codes: Optional[Iterable[str]] = None) -> 'EventStore':
+        """流式读取日志文件，一次读取写入所有类型的事件"""
+        store = cls(type_codes)
+        append = store.append
+        for line, line_number, _ in iter_log_file_with_line_numbers(file_path):
+            append(line, line_number)
+        return store
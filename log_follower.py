@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志实时跟随模块
+ACT/IINACT仍在写入日志时，监视线程通过inotify（Linux）或定时检查文件大小发现追加，
+界面线程按固定帧率只解析新增的完整行并追加到战斗表；行号状态（01|重置）跨读取延续，
+注册在表上的倒排索引、伤害汇总等观察者随之增量更新
+"""
+
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Optional, Callable
+
+from parse_cache import ParsedLog
+from perf_monitor import monitor
+
+# 界面更新的帧率（每秒最多通知界面的次数）
+FOLLOW_FPS = 10
+
+# 无法使用inotify时检查文件大小和修改时间的间隔（秒）
+POLL_INTERVAL = 0.25
+
+# 监视线程每次等待的最长时间（秒），决定停止跟随时的响应速度
+WATCH_TIMEOUT = 0.5
+
+# inotify事件：写入、写入后关闭、被移动或删除、属性变化（截断时也会触发）
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVE_SELF = 0x00000800
+_IN_DELETE_SELF = 0x00000400
+_IN_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVE_SELF | _IN_DELETE_SELF
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_IGNORED = 0x00008000
+# struct inotify_event的固定部分：wd、mask、cookie、len
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+class _InotifyWatcher:
+    """通过ctypes调用inotify监视单个文件（仅Linux）"""
+
+    def __init__(self, file_path: str):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1失败")
+        wd = libc.inotify_add_watch(fd, os.fsencode(file_path), _IN_WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, "inotify_add_watch失败")
+        self.fd = fd
+        # 文件被移动或删除后监视失效，需要重新创建监视器
+        self.lost = False
+
+    def wait(self, timeout: float) -> bool:
+        """等待文件变化，返回是否有事件（读出全部待处理事件）"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while True:
+                data = os.read(self.fd, 4096)
+                if not data:
+                    break
+                pos = 0
+                while pos + _INOTIFY_EVENT.size <= len(data):
+                    _, mask, _, name_len = _INOTIFY_EVENT.unpack_from(data, pos)
+                    if mask & (_IN_MOVE_SELF | _IN_DELETE_SELF | _IN_IGNORED):
+                        self.lost = True
+                    pos += _INOTIFY_EVENT.size + name_len
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+class _PollingWatcher:
+    """定时比较文件大小和修改时间"""
+
+    def __init__(self, file_path: str, interval: float = POLL_INTERVAL):
+        self.file_path = file_path
+        self.interval = interval
+        self._last = self._stat()
+        # 定时检查按路径进行，文件被替换后无需重新创建
+        self.lost = False
+
+    def _stat(self):
+        try:
+            st = os.stat(self.file_path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def wait(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._stat()
+            if current != self._last:
+                self._last = current
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+    def close(self) -> None:
+        pass
+
+def _file_id(file_path: str):
+    """返回(设备号, inode)，用于发现文件被替换"""
+    st = os.stat(file_path)
+    return st.st_dev, st.st_ino
+
+def make_watcher(file_path: str, use_inotify: bool = True):
+    """创建文件监视器：Linux上优先使用inotify，不可用时退回定时检查"""
+    if use_inotify and sys.platform.startswith('linux'):
+        try:
+            return _InotifyWatcher(file_path)
+        except (OSError, AttributeError):
+            pass
+    return _PollingWatcher(file_path)
+
+class LogFollower:
+    """跟随仍在写入的日志，把追加的战斗行加入ParsedLog的战斗表"""
+
+    def __init__(self, root, file_path: str,
+                 on_append: Optional[Callable[[ParsedLog, int, int], None]] = None,
+                 on_reset: Optional[Callable[[ParsedLog], None]] = None,
+                 fps: float = FOLLOW_FPS, use_cache: bool = True, use_inotify: bool = True,
+                 parsed: Optional[ParsedLog] = None):
+        """
+        Args:
+            root: Tk根窗口，用于root.after调度；为None时由调用方调用run()或poll()
+            file_path: 日志文件路径
+            on_append: 新行加入表后调用（每帧最多一次），参数为(ParsedLog, 起始行ID, 行数)
+            on_reset: 文件被截断或替换、重新解析后调用，参数为新的ParsedLog
+                      （原表上的观察者需要由调用方重新注册）
+            fps: 每秒最多处理和通知的次数
+            use_cache: 是否使用.ffxcache解析缓存
+            use_inotify: 是否尝试使用inotify
+            parsed: 已打开的ParsedLog（不能包含不完整的最后一行），None表示在此打开
+        """
+        self.root = root
+        self.file_path = file_path
+        self.on_append = on_append
+        self.on_reset = on_reset
+        self.frame_ms = max(int(1000 / fps), 1)
+        self.use_cache = use_cache
+        self.use_inotify = use_inotify
+        if parsed is None:
+            parsed = ParsedLog.open(file_path, use_cache, include_partial=False)[0]
+        self.parsed = parsed
+        self._file_id = _file_id(file_path)
+        self.appended_rows = 0
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._after_id = None
+
+    @property
+    def table(self):
+        return self.parsed.table
+
+    def start(self) -> None:
+        """启动监视线程和界面线程的定时处理"""
+        self._stop.clear()
+        self._changed.set()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+        if self.root is not None:
+            self._after_id = self.root.after(self.frame_ms, self._tick)
+
+    def stop(self, save_cache: bool = True) -> None:
+        """
+        停止跟随
+
+        Args:
+            save_cache: 是否把已解析的内容写入解析缓存，下次打开时不必重新解析
+        """
+        self._stop.set()
+        if self._after_id is not None and self.root is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._thread is not None:
+            self._thread.join(WATCH_TIMEOUT * 2)
+            self._thread = None
+        if save_cache and self.use_cache:
+            try:
+                self.parsed.save_cache()
+            except (OSError, ValueError) as e:
+                print(f"保存解析缓存失败: {e}")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stop.is_set()
+
+    def _watch(self) -> None:
+        """监视线程：只负责发现变化，解析在调用poll()的线程中进行"""
+        watcher = make_watcher(self.file_path, self.use_inotify)
+        try:
+            while not self._stop.is_set():
+                if watcher.wait(WATCH_TIMEOUT):
+                    self._changed.set()
+                if watcher.lost and os.path.exists(self.file_path):
+                    # 日志被替换为新文件，监视新文件
+                    watcher.close()
+                    watcher = make_watcher(self.file_path, self.use_inotify)
+                    self._changed.set()
+        finally:
+            watcher.close()
+
+    def _tick(self) -> None:
+        """界面线程：每帧最多处理一次文件变化"""
+        self._after_id = None
+        if self._stop.is_set():
+            return
+        self.poll()
+        self._after_id = self.root.after(self.frame_ms, self._tick)
+
+    def poll(self) -> int:
+        """
+        若文件有变化则解析新增的完整行
+
+        Returns:
+            新增的表行数
+        """
+        if not self._changed.is_set():
+            return 0
+        self._changed.clear()
+
+        try:
+            st = os.stat(self.file_path)
+        except OSError:
+            # 文件暂时不存在（例如正在被替换），等待下一次变化
+            return 0
+        if st.st_size < self.parsed.complete_size or (st.st_dev, st.st_ino) != self._file_id:
+            self._reset()
+            return 0
+
+        first = len(self.parsed.table)
+        start = time.perf_counter()
+        count = self.parsed.extend()
+        if count:
+            monitor.record('follow', time.perf_counter() - start, count)
+            self.appended_rows += count
+            if self.on_append:
+                self.on_append(self.parsed, first, count)
+        return count
+
+    def _reset(self) -> None:
+        """文件变小或被替换为新文件时重新解析"""
+        self.parsed = ParsedLog.open(self.file_path, self.use_cache, include_partial=False)[0]
+        self._file_id = _file_id(self.file_path)
+        self.appended_rows = 0
+        if self.on_reset:
+            self.on_reset(self.parsed)
+
+    def run(self, duration: Optional[float] = None) -> None:
+        """
+        不使用Tk时在当前线程中跟随，直到stop()被调用或经过duration秒
+
+        Args:
+            duration: 最长运行时间（秒），None表示不限
+        """
+        deadline = None if duration is None else time.monotonic() + duration
+        if self._thread is None:
+            self.start()
+        frame = self.frame_ms / 1000
+        while not self._stop.is_set() and (deadline is None or time.monotonic() < deadline):
+            frame_start = time.monotonic()
+            self.poll()
+            time.sleep(max(frame - (time.monotonic() - frame_start), 0))
+
+def follow_log(root, file_path: str, **kwargs) -> LogFollower:
+    """
+    创建并启动日志跟随
+
+    Args:
+        root: Tk根窗口
+        file_path: 日志文件路径
+        **kwargs: 传给LogFollower的其他参数
+
+    Returns:
+        LogFollower实例
+    """
+    follower = LogFollower(root, file_path, **kwargs)
+    follower.start()
+    return follower
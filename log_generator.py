@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV合成日志生成模块
+生成带有效校验码的仿真ACT日志，用于性能测试
+用法: python log_generator.py <输出文件> <行数，如100k、10M> [--seed 种子]
+
+每个区域以01|切换行开始（行号重置为1），随后是03|战斗成员行和若干场战斗；
+每场战斗由00|倒计时、33|开始标记、21|/22|/26|/37|事件和33|胜利/团灭标记组成。
+"""
+
+import argparse
+import os
+import random
+import sys
+from typing import List, Dict, Iterator, Optional
+
+from checksum_calculator import iter_checksums_with_line_numbers
+from combat_table import encode_damage_value, format_timestamp_ns, parse_timestamp_ns
+
+# 第一行的时间戳（同时作为时间戳格式模板）
+START_TIMESTAMP = '2025-07-26T20:00:00.0000000+08:00'
+
+# 33|行的副本指令
+DIRECTOR_COMMENCE = '40000001'
+DIRECTOR_VICTORY = '40000003'
+DIRECTOR_WIPE = '40000010'
+
+# 战斗中各类事件行的权重
+EVENT_WEIGHTS = {'21': 50, '22': 15, '26': 10, '37': 20, '00': 5}
+
+# 每次批量计算校验码并写入的行数
+WRITE_BATCH_LINES = 10000
+
+_PLAYER_NAMES = ('光之战士', '冒险者', '暗之战士', '白魔法师', '黑魔法师', '吟游诗人', '龙骑士', '学者')
+_ENEMY_NAMES = ('木人', '泰坦', '伊弗利特', '迦楼罗', '利维亚桑', '拉姆', '希瓦', '奥丁')
+_ZONE_NAMES = ('利姆萨·罗敏萨上层甲板', '巨人之石', '灾厄之地', '海之底', '天之座', '无限城')
+_ABILITIES = (('9D7A', '烈刃'), ('9D7B', '强力斩'), ('1D5E', '醒梦'), ('DD0', '攻击'),
+              ('4070', '血乱'), ('25C7', '绝对温度'), ('9C8', '飞刺'), ('408C', '死斗'))
+_EFFECTS = (('31', '强化药'), ('74F', '战斗连祷'), ('A27', '灼热'), ('49', '毒'))
+_FLAGS = ('710003', '750003', '3', '1B')
+
+class _LogState:
+    """生成过程中的时间、序号和当前区域战斗成员"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.ns = parse_timestamp_ns(START_TIMESTAMP)
+        self.sequence = 0x4A00
+        self.players = []
+        self.enemies = []
+
+    def timestamp(self, max_step_ms: int = 200) -> str:
+        """时间前进随机的毫秒数并返回时间戳文本"""
+        self.ns += self.rng.randint(1, max_step_ms) * 1000000 + self.rng.randint(0, 9999) * 100
+        return format_timestamp_ns(self.ns, START_TIMESTAMP)
+
+def _actor_state(rng: random.Random, actor: Dict) -> List[str]:
+    """战斗成员的 当前HP|最大HP|当前MP|最大MP|||X|Y|Z|朝向 字段"""
+    return [str(rng.randint(1, actor['hp'])), str(actor['hp']), '10000', '10000', '', '',
+            '%.2f' % rng.uniform(80, 120), '%.2f' % rng.uniform(80, 120), '0.00', '%.2f' % rng.uniform(-3.14, 3.14)]
+
+def _ability_line(state: _LogState, line_type: str, target_index: int = 0, target_count: int = 1) -> List[str]:
+    """21|单体或22|范围技能行（字段布局与ACT实际日志一致）"""
+    rng = state.rng
+    source = rng.choice(state.players)
+    target = rng.choice(state.enemies)
+    ability_id, ability = rng.choice(_ABILITIES)
+    # 大部分伤害在65536以内，少量使用大伤害编码
+    damage = int(rng.lognormvariate(9.5, 0.8))
+    state.sequence += 1
+    return ([line_type, state.timestamp(), source['id'], source['name'], ability_id, ability,
+             target['id'], target['name'], rng.choice(_FLAGS), '%X' % encode_damage_value(damage),
+             '1B', ability_id + '8000'] + ['0'] * 12
+            + _actor_state(rng, target) + _actor_state(rng, source)
+            + ['%08X' % state.sequence, str(target_index), str(target_count), '00', '', '01',
+               ability_id, ability_id, '0.100', '%04X' % rng.randint(0, 0xFFFF)])
+
+def _event_lines(state: _LogState, line_type: str) -> List[List[str]]:
+    """生成一个战斗事件（22|范围技能会产生多行）"""
+    rng = state.rng
+    if line_type == '21':
+        return [_ability_line(state, '21')]
+    if line_type == '22':
+        count = rng.randint(2, 4)
+        return [_ability_line(state, '22', index, count) for index in range(count)]
+    if line_type == '26':
+        effect_id, effect = rng.choice(_EFFECTS)
+        source = rng.choice(state.players)
+        target = rng.choice(state.players + state.enemies)
+        return [['26', state.timestamp(), effect_id, effect, '%.2f' % rng.choice((15, 20, 30, 60)),
+                 source['id'], source['name'], target['id'], target['name'], '00',
+                 str(target['hp']), str(source['hp'])]]
+    if line_type == '37':
+        actor = rng.choice(state.players + state.enemies)
+        state.sequence += 1
+        return [['37', state.timestamp(), actor['id'], actor['name'], '%08X' % state.sequence]
+                + _actor_state(rng, actor)[:4] + ['0', ''] + _actor_state(rng, actor)[6:]]
+    return [['00', state.timestamp(), '0039', '', rng.choice(('战斗开始！', '5秒后战斗开始！', '战斗开始倒计时取消。'))]]
+
+def iter_log_parts(seed: int = 0, fight_events: int = 3000, fights_per_zone: int = 4) -> Iterator[List[str]]:
+    """
+    无限生成日志行的字段列表（不含校验码）
+
+    Args:
+        seed: 随机种子，相同种子生成相同内容
+        fight_events: 每场战斗的平均事件数
+        fights_per_zone: 每个区域的战斗场数
+    """
+    rng = random.Random(seed)
+    state = _LogState(rng)
+    event_types = list(EVENT_WEIGHTS)
+    weights = list(EVENT_WEIGHTS.values())
+    zone = 0
+    while True:
+        zone += 1
+        zone_name = _ZONE_NAMES[zone % len(_ZONE_NAMES)]
+        yield ['01', state.timestamp(5000), '%X' % (0x300 + zone % 0x400), zone_name]
+
+        state.players = [{'id': '10%06X' % (0x574A2B + i), 'name': name, 'hp': rng.randint(90000, 110000)}
+                         for i, name in enumerate(_PLAYER_NAMES)]
+        state.enemies = [{'id': '40%06X' % (0x11B8C + zone * 16 + i), 'name': name, 'hp': rng.randint(10 ** 6, 10 ** 7)}
+                         for i, name in enumerate(rng.sample(_ENEMY_NAMES, rng.randint(1, 4)))]
+        for actor in state.players + state.enemies:
+            yield (['03', state.timestamp(10), actor['id'], actor['name'], '%X' % rng.randint(1, 40), '64',
+                    '0000', '0', '', '0', '0', str(actor['hp']), str(actor['hp']), '10000', '10000', '', '']
+                   + _actor_state(rng, actor)[6:])
+
+        for _ in range(fights_per_zone):
+            instance = '8003%04X' % (zone % 0x10000)
+            yield _event_lines(state, '00')[0]
+            yield ['33', state.timestamp(), instance, DIRECTOR_COMMENCE, '708', '0', '0', '0']
+            for _ in range(rng.randint(fight_events // 2, fight_events * 3 // 2)):
+                yield from _event_lines(state, rng.choices(event_types, weights)[0])
+            outcome = DIRECTOR_VICTORY if rng.random() < 0.7 else DIRECTOR_WIPE
+            yield ['33', state.timestamp(), instance, outcome, '0', '0', '0', '0']
+            for _ in range(rng.randint(5, 30)):
+                yield from _event_lines(state, rng.choice(('26', '37')))
+
+def generate_log(file_path: str, lines: int, seed: int = 0, newline: str = '\r\n',
+                 fight_events: int = 3000, fights_per_zone: int = 4) -> Dict:
+    """
+    生成合成日志文件
+
+    Args:
+        file_path: 输出文件路径
+        lines: 行数
+        seed: 随机种子
+        newline: 换行符
+        fight_events: 每场战斗的平均事件数
+        fights_per_zone: 每个区域的战斗场数
+
+    Returns:
+        统计信息：lines、bytes、zones、fights、types（各类型行数）
+    """
+    stats = {'lines': 0, 'bytes': 0, 'zones': 0, 'fights': 0, 'types': {}}
+    types = stats['types']
+    line_number = 0
+    batch = []
+    source = iter_log_parts(seed, fight_events, fights_per_zone)
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        def flush():
+            text = ''.join('|'.join(parts) + '|' + checksum + newline
+                           for (parts, _), checksum in zip(batch, iter_checksums_with_line_numbers(batch)))
+            f.write(text)
+            batch.clear()
+
+        for _ in range(lines):
+            parts = next(source)
+            line_type = parts[0]
+            if line_type == '01':
+                line_number = 1
+                stats['zones'] += 1
+            else:
+                line_number += 1
+            if line_type == '33' and parts[3] == DIRECTOR_COMMENCE:
+                stats['fights'] += 1
+            types[line_type] = types.get(line_type, 0) + 1
+            batch.append((parts, line_number))
+            if len(batch) >= WRITE_BATCH_LINES:
+                flush()
+        flush()
+    stats['lines'] = lines
+    stats['bytes'] = os.path.getsize(file_path)
+    return stats
+
+def parse_count(text: str) -> int:
+    """解析行数参数，支持k/M后缀（如10k、2.5M）"""
+    text = text.strip()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:].lower())
+    if multiplier:
+        return int(float(text[:-1]) * multiplier)
+    return int(text)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函数"""
+    parser = argparse.ArgumentParser(description='生成带有效校验码的合成FFXIV日志')
+    parser.add_argument('output', help='输出文件路径')
+    parser.add_argument('lines', type=parse_count, help='行数，支持k/M后缀')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--lf', action='store_true', help='使用\\n换行（默认\\r\\n）')
+    args = parser.parse_args(argv)
+
+    stats = generate_log(args.output, args.lines, args.seed, '\n' if args.lf else '\r\n')
+    print(f"✓ 已生成 {args.output}: {stats['lines']} 行，{stats['bytes'] / 1024 / 1024:.1f} MB，"
+          f"{stats['zones']} 个区域，{stats['fights']} 场战斗")
+    print("  " + "，".join(f"{code}|: {count}" for code, count in sorted(stats['types'].items())))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
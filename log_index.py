@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV日志行偏移索引模块
+基于mmap一次扫描记录每行的字节偏移、类型码和行号，支持按行随机访问
+"""
+
+import array
+import itertools
+import mmap
+import os
+import struct
+import sys
+from typing import List, Optional, Iterator, Tuple
+
+from perf_monitor import instrument
+
+# 无法识别的行类型码
+UNKNOWN_TYPE = 0xFFFF
+
+# 索引旁路文件的后缀、标识和头部格式
+SIDECAR_SUFFIX = '.idx'
+_SIDECAR_MAGIC = b'FFXIDX01'
+_SIDECAR_HEADER = struct.Struct('<8sQQQ')
+
+def _parse_type_code(line: bytes) -> int:
+    """从去除空白的行中解析类型码（第一个|之前的数字）"""
+    pos = line.find(b'|')
+    field = line if pos < 0 else line[:pos]
+    # 类型码为2~4位数字，且只有两位时才允许前导0（例如01、00）
+    if 2 <= len(field) <= 4 and field.isdigit() and (len(field) == 2 or field[0] != 0x30):
+        return int(field)
+    return UNKNOWN_TYPE
+
+def _stat_key(file_path: str) -> Tuple[int, int]:
+    """返回用于判断索引是否过期的(文件大小, 修改时间纳秒)"""
+    st = os.stat(file_path)
+    return st.st_size, st.st_mtime_ns
+
+class LogIndex:
+    """日志行偏移索引（行号规则与parse_log_file_with_line_numbers一致）"""
+
+    def __init__(self, file_path: str, offsets: array.array, type_codes: array.array,
+                 line_numbers: array.array, file_size: int, mtime_ns: int):
+        self.file_path = file_path
+        self.offsets = offsets
+        self.type_codes = type_codes
+        self.line_numbers = line_numbers
+        self.file_size = file_size
+        self.mtime_ns = mtime_ns
+        self._file = None
+        self._mm = None
+        self._segment_starts = None
+
+    @classmethod
+    @instrument('index_build', items=len)
+    def build(cls, file_path: str, end: Optional[int] = None) -> 'LogIndex':
+        """
+        扫描日志文件构建索引
+
+        Args:
+            file_path: 日志文件路径
+            end: 只扫描到该字节偏移（应位于行首），None表示整个文件
+
+        Returns:
+            LogIndex实例
+        """
+        file_size, mtime_ns = _stat_key(file_path)
+        if end is not None:
+            file_size = min(end, file_size)
+        index = cls(file_path, array.array('Q'), array.array('H'), array.array('I'), 0, mtime_ns)
+        index._scan(file_size)
+        return index
+
+    def _scan(self, end: int) -> None:
+        """从当前索引末尾（file_size）扫描到end，追加新行（行号接续已有的最后一行）"""
+        start = self.file_size
+        if end > start:
+            offsets = self.offsets
+            add_offset = offsets.append
+            add_code = self.type_codes.append
+            add_number = self.line_numbers.append
+            current_line_number = self.line_numbers[-1] + 1 if len(self.line_numbers) else 1
+            with open(self.file_path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    end = min(end, len(mm))
+                    pos = start
+                    while pos < end:
+                        nl = mm.find(b'\n', pos, end)
+                        if nl < 0:
+                            nl = end
+                        line = mm[pos:nl].strip()
+
+                        # 非ASCII首尾字符时按文本规则判断空行（如全角空格）
+                        if line and (line[0] >= 0x80 or line[-1] >= 0x80):
+                            if not line.decode('utf-8', errors='replace').strip():
+                                line = b''
+
+                        if line:
+                            if line.startswith(b'01|'):
+                                current_line_number = 1
+                            add_offset(pos)
+                            add_code(_parse_type_code(line))
+                            add_number(current_line_number)
+                            current_line_number += 1
+                        pos = nl + 1
+        self.file_size = max(end, start)
+        self._segment_starts = None
+
+    def extend(self, end: Optional[int] = None) -> int:
+        """
+        扫描文件中追加在已索引部分之后的内容（用于仍在写入的日志）
+
+        调用方需保证已索引部分止于换行符之后，否则最后一行会被拆成两行。
+
+        Args:
+            end: 扫描到该字节偏移，None表示当前文件末尾
+
+        Returns:
+            新增的行数
+        """
+        file_size, mtime_ns = _stat_key(self.file_path)
+        before = len(self.offsets)
+        self.close()
+        self._scan(file_size if end is None else min(end, file_size))
+        self.mtime_ns = mtime_ns
+        return len(self.offsets) - before
+
+    @classmethod
+    def open(cls, file_path: str, use_sidecar: bool = True) -> 'LogIndex':
+        """
+        打开日志索引：旁路文件有效时直接读取，否则重新扫描并保存旁路文件
+
+        Args:
+            file_path: 日志文件路径
+            use_sidecar: 是否读写旁路索引文件
+
+        Returns:
+            LogIndex实例
+        """
+        if use_sidecar:
+            index = cls.load_sidecar(file_path)
+            if index is not None:
+                return index
+
+        index = cls.build(file_path)
+        if use_sidecar:
+            try:
+                index.save_sidecar()
+            except OSError as e:
+                print(f"保存索引文件失败: {e}")
+        return index
+
+    @staticmethod
+    def sidecar_path(file_path: str) -> str:
+        """返回日志文件对应的旁路索引文件路径"""
+        return file_path + SIDECAR_SUFFIX
+
+    def save_sidecar(self) -> None:
+        """将索引保存到旁路文件（小端序）"""
+        path = self.sidecar_path(self.file_path)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_SIDECAR_HEADER.pack(_SIDECAR_MAGIC, self.file_size, self.mtime_ns, len(self.offsets)))
+            for column in (self.offsets, self.type_codes, self.line_numbers):
+                if sys.byteorder == 'big':
+                    column = array.array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_sidecar(cls, file_path: str) -> Optional['LogIndex']:
+        """
+        读取旁路索引文件
+
+        Args:
+            file_path: 日志文件路径
+
+        Returns:
+            LogIndex实例，旁路文件不存在、损坏或已过期时返回None
+        """
+        path = cls.sidecar_path(file_path)
+        try:
+            file_size, mtime_ns = _stat_key(file_path)
+            with open(path, 'rb') as f:
+                header = f.read(_SIDECAR_HEADER.size)
+                if len(header) != _SIDECAR_HEADER.size:
+                    return None
+                magic, saved_size, saved_mtime, count = _SIDECAR_HEADER.unpack(header)
+                if magic != _SIDECAR_MAGIC or saved_size != file_size or saved_mtime != mtime_ns:
+                    return None
+
+                columns = []
+                for typecode in ('Q', 'H', 'I'):
+                    column = array.array(typecode)
+                    column.fromfile(f, count)
+                    if sys.byteorder == 'big':
+                        column.byteswap()
+                    columns.append(column)
+        except (OSError, EOFError, ValueError, struct.error):
+            return None
+
+        return cls(file_path, columns[0], columns[1], columns[2], file_size, mtime_ns)
+
+    def _mmap(self) -> mmap.mmap:
+        """按需打开日志文件的只读内存映射"""
+        if self._mm is None:
+            self._file = open(self.file_path, 'rb')
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def close(self) -> None:
+        """关闭内存映射"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def line_span(self, row: int) -> Tuple[int, int]:
+        """
+        返回某行在文件中的字节范围（不含换行符）
+
+        Args:
+            row: 行索引（从0开始，不计空行）
+
+        Returns:
+            (起始偏移, 结束偏移)
+        """
+        start = self.offsets[row]
+        end = self._mmap().find(b'\n', start)
+        return start, (self.file_size if end < 0 else end)
+
+    def raw_line(self, row: int) -> bytes:
+        """返回某行的原始字节（不含换行符）"""
+        start, end = self.line_span(row)
+        return self._mmap()[start:end]
+
+    def line(self, row: int) -> str:
+        """返回某行的文本内容（已去除首尾空白）"""
+        return self.raw_line(row).decode('utf-8', errors='replace').strip()
+
+    def rows_of_type(self, type_code: int) -> array.array:
+        """
+        返回指定类型的所有行索引
+
+        Args:
+            type_code: 行类型码，例如21
+
+        Returns:
+            按升序排列的行索引数组
+        """
+        return array.array('I', itertools.compress(range(len(self.type_codes)),
+                                                   map(type_code.__eq__, self.type_codes)))
+
+    def iter_lines_of_type(self, type_code: int) -> Iterator[Tuple[int, str, int]]:
+        """
+        逐个产出指定类型的行
+
+        Yields:
+            (行索引, 行内容, 行号) 元组
+        """
+        line_numbers = self.line_numbers
+        for row in self.rows_of_type(type_code):
+            yield row, self.line(row), line_numbers[row]
+
+    def segment_starts(self) -> List[int]:
+        """返回每个地图区段（01|切换行或文件开头）的首行索引"""
+        if self._segment_starts is None:
+            starts = list(self.rows_of_type(1))
+            if len(self.offsets) and (not starts or starts[0] != 0):
+                starts.insert(0, 0)
+            self._segment_starts = starts
+        return self._segment_starts
+
+    def row_for_line_number(self, segment: int, line_number: int) -> int:
+        """
+        根据区段序号和区段内行号定位行索引
+
+        Args:
+            segment: 区段序号（从0开始）
+            line_number: 区段内行号（从1开始）
+
+        Returns:
+            行索引
+        """
+        row = self.segment_starts()[segment] + line_number - 1
+        if line_number < 1 or row >= len(self.line_numbers) or self.line_numbers[row] != line_number:
+            raise IndexError(f"区段{segment}中不存在行号{line_number}")
+        return row
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV多文件日志会话模块
+一次扫描行索引找出01|区域切换和33|战斗开始/胜利/团灭标记，将日志划分为首尾相接的区段列表；
+区段中的21|/22|事件只在打开时才解析，内存占用与打开的区段数成正比
+"""
+
+import array
+import collections
+import itertools
+from typing import List, Optional, Dict, Iterator, Tuple
+
+from checksum_calculator import ABILITY_LINE_PREFIXES
+from combat_table import CombatTable, INVALID_TIMESTAMP, parse_timestamp_ns
+from edit_journal import EditJournal
+from log_index import LogIndex
+from perf_monitor import instrument
+
+# 区段划分使用的行类型
+ZONE_CHANGE_TYPE = 1
+DIRECTOR_TYPE = 33
+
+# 打开区段时解析的行类型（21|单体技能、22|范围技能）
+SEGMENT_EVENT_TYPES = frozenset((21, 22))
+
+# 33|行的副本指令（第4个字段）
+COMMENCE_COMMANDS = frozenset(('40000001', '40000006'))
+VICTORY_COMMANDS = frozenset(('40000002', '40000003'))
+WIPE_COMMANDS = frozenset(('40000005', '4000000F', '40000010'))
+
+# 区段结果
+OUTCOME_VICTORY = 'victory'
+OUTCOME_WIPE = 'wipe'
+
+OUTCOME_LABELS = {OUTCOME_VICTORY: '胜利', OUTCOME_WIPE: '团灭', None: '未结束'}
+
+# 区段类型：战斗、没有战斗的整个区域、区域内战斗之外的部分
+KIND_FIGHT = 'fight'
+KIND_ZONE = 'zone'
+KIND_BETWEEN = 'between'
+
+# 默认同时保持打开的区段数
+DEFAULT_MAX_OPEN_SEGMENTS = 4
+
+SEGMENT_FIELDS = ('file_id', 'kind', 'number', 'start_row', 'end_row', 'zone', 'outcome', 'start_ns', 'end_ns')
+
+class Segment(collections.namedtuple('Segment', SEGMENT_FIELDS)):
+    """
+    日志区段（不可变，可作为字典键）
+
+    kind为'fight'（33|开始标记到胜利/团灭标记，含两端）、'zone'（没有战斗标记的整个区域）
+    或'between'（有战斗的区域中战斗之外的行，如区域切换、开怪前和战斗之间的部分）。
+    [start_row, end_row)为LogIndex中的行索引区间；number对战斗为区域内的序号（从1开始），
+    对'between'为此前已结束的战斗场数。
+    """
+
+    __slots__ = ()
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        """区段首末行的时间差（秒），时间戳无法解析时返回None"""
+        if self.start_ns == INVALID_TIMESTAMP or self.end_ns == INVALID_TIMESTAMP:
+            return None
+        return (self.end_ns - self.start_ns) / 1e9
+
+    @property
+    def title(self) -> str:
+        """用于区段列表显示的标题"""
+        zone = self.zone or '未知区域'
+        if self.kind == KIND_ZONE:
+            return zone
+        if self.kind == KIND_BETWEEN:
+            return f"{zone} 开怪前" if self.number == 0 else f"{zone} #{self.number} 之后"
+        return f"{zone} #{self.number} {OUTCOME_LABELS.get(self.outcome, self.outcome)}"
+
+def _director_command(line: str) -> str:
+    """返回33|行的指令字段（大写），字段不足时返回空字符串"""
+    parts = line.split('|', 5)
+    return parts[3].upper() if len(parts) > 4 else ''
+
+def _row_timestamp(index: LogIndex, row: int) -> int:
+    """解析某行的时间戳（纳秒）"""
+    parts = index.line(row).split('|', 2)
+    return parse_timestamp_ns(parts[1]) if len(parts) > 2 else INVALID_TIMESTAMP
+
+@instrument('segment_scan', items=len)
+def find_segments(index: LogIndex, file_id: int = 0) -> List[Segment]:
+    """
+    划分日志区段
+
+    只根据索引中的类型码定位01|和33|行，并只读取这些行的内容，不解析其他行。
+    每场战斗从开始标记起，到胜利/团灭标记（含）、下一个开始标记或区域结束为止；
+    没有战斗标记的区域整体作为一个'zone'区段，有战斗的区域中战斗之外的行
+    作为'between'区段，因此每一行都恰好属于一个区段。
+
+    Args:
+        index: 日志行索引
+        file_id: 写入Segment的文件序号
+
+    Returns:
+        按行顺序排列、首尾相接的区段列表
+    """
+    count = len(index)
+    zone_starts = index.segment_starts()
+    director_rows = index.rows_of_type(DIRECTOR_TYPE)
+    segments = []
+
+    def add(kind: str, number: int, start: int, end: int, zone: str, outcome: Optional[str]) -> None:
+        segments.append(Segment(file_id, kind, number, start, end, zone, outcome,
+                                _row_timestamp(index, start), _row_timestamp(index, end - 1)))
+
+    marker = 0
+    for i, zone_start in enumerate(zone_starts):
+        zone_end = zone_starts[i + 1] if i + 1 < len(zone_starts) else count
+        zone = ''
+        if index.type_codes[zone_start] == ZONE_CHANGE_TYPE:
+            parts = index.line(zone_start).split('|', 4)
+            zone = parts[3] if len(parts) > 4 else ''
+
+        # (起始行, 结束行, 结果)
+        fights = []
+        fight_start = None
+        while marker < len(director_rows) and director_rows[marker] < zone_end:
+            row = director_rows[marker]
+            marker += 1
+            command = _director_command(index.line(row))
+            if command in COMMENCE_COMMANDS:
+                # 上一场没有结束标记时（例如重新开始），在此处截断
+                if fight_start is not None:
+                    fights.append((fight_start, row, None))
+                fight_start = row
+            elif fight_start is not None and (command in VICTORY_COMMANDS or command in WIPE_COMMANDS):
+                fights.append((fight_start, row + 1,
+                               OUTCOME_VICTORY if command in VICTORY_COMMANDS else OUTCOME_WIPE))
+                fight_start = None
+        if fight_start is not None:
+            fights.append((fight_start, zone_end, None))
+
+        if not fights:
+            if zone_end > zone_start:
+                add(KIND_ZONE, 0, zone_start, zone_end, zone, None)
+            continue
+
+        covered = zone_start
+        for number, (start, end, outcome) in enumerate(fights, 1):
+            if start > covered:
+                add(KIND_BETWEEN, number - 1, covered, start, zone, None)
+            add(KIND_FIGHT, number, start, end, zone, outcome)
+            covered = end
+        if zone_end > covered:
+            add(KIND_BETWEEN, len(fights), covered, zone_end, zone, None)
+    return segments
+
+class SegmentView:
+    """已打开的区段：只含该区段21|/22|事件的战斗表，以及表行ID到索引行的映射"""
+
+    def __init__(self, segment: Segment, table: CombatTable, file_rows):
+        self.segment = segment
+        self.table = table
+        self.file_rows = file_rows
+        # 被修改过的表行ID（作为观察者记录，保存时写入编辑记录）
+        self.changed_rows = set()
+        table.add_observer(self)
+
+    def row_appended(self, row: int) -> None:
+        pass
+
+    def row_changed(self, row: int, old_key) -> None:
+        self.changed_rows.add(row)
+
+    @property
+    def modified(self) -> bool:
+        """是否有尚未写入编辑记录的修改"""
+        return bool(self.changed_rows)
+
+class LogSession:
+    """
+    多文件日志会话
+
+    每个文件只常驻行索引（每行约14字节）和区段列表，区段的战斗表按需构建，
+    超过max_open_segments时关闭最久未使用的未修改区段。
+    """
+
+    def __init__(self, max_open_segments: Optional[int] = DEFAULT_MAX_OPEN_SEGMENTS,
+                 use_sidecar: bool = True):
+        self.max_open_segments = max_open_segments
+        self.use_sidecar = use_sidecar
+        self.indexes = []
+        self.segments = []
+        self.journals = {}
+        # 按最近使用顺序排列：Segment -> SegmentView
+        self._open = collections.OrderedDict()
+
+    def add_file(self, file_path: str) -> List[Segment]:
+        """
+        加入日志文件并划分区段（有有效的旁路索引文件时不扫描日志）
+
+        Args:
+            file_path: 日志文件路径
+
+        Returns:
+            该文件的区段列表
+        """
+        index = LogIndex.open(file_path, self.use_sidecar)
+        file_id = len(self.indexes)
+        self.indexes.append(index)
+        segments = find_segments(index, file_id)
+        self.segments.extend(segments)
+        return segments
+
+    @property
+    def files(self) -> List[str]:
+        """会话中的文件路径（下标即file_id）"""
+        return [index.file_path for index in self.indexes]
+
+    def segments_of_file(self, file_id: int) -> List[Segment]:
+        """返回某个文件的区段"""
+        return [segment for segment in self.segments if segment.file_id == file_id]
+
+    def is_open(self, segment: Segment) -> bool:
+        """区段是否已打开"""
+        return segment in self._open
+
+    @property
+    def open_views(self) -> List[SegmentView]:
+        """已打开的区段（最久未使用的在前）"""
+        return list(self._open.values())
+
+    def loaded_rows(self) -> int:
+        """已打开区段的战斗表总行数"""
+        return sum(len(view.table) for view in self._open.values())
+
+    def _segment_rows(self, segment: Segment) -> Iterator[int]:
+        """区段内21|/22|行的索引行号"""
+        type_codes = self.indexes[segment.file_id].type_codes
+        return itertools.compress(range(segment.start_row, segment.end_row),
+                                  map(SEGMENT_EVENT_TYPES.__contains__,
+                                      type_codes[segment.start_row:segment.end_row]))
+
+    @instrument('segment_open', items=lambda view: len(view.table))
+    def _load(self, segment: Segment) -> SegmentView:
+        """构建区段的战斗表（已写入编辑记录但尚未保存的行使用编辑记录中的内容）"""
+        index = self.indexes[segment.file_id]
+        line_numbers = index.line_numbers
+        journal = self.journals.get(segment.file_id)
+        replaced = journal.replaced if journal is not None else {}
+        deleted = journal.deleted if journal is not None else ()
+        table = CombatTable(ABILITY_LINE_PREFIXES)
+        file_rows = array.array('I')
+        for row in self._segment_rows(segment):
+            if row in deleted:
+                continue
+            line = replaced.get(row)
+            if line is None:
+                line = index.line(row)
+            if table.append(line, line_numbers[row]) is not None:
+                file_rows.append(row)
+        return SegmentView(segment, table, file_rows)
+
+    def open_segment(self, segment: Segment) -> SegmentView:
+        """
+        打开区段（已打开时直接返回）
+
+        Args:
+            segment: segments中的区段
+
+        Returns:
+            SegmentView
+        """
+        view = self._open.get(segment)
+        if view is not None:
+            self._open.move_to_end(segment)
+            return view
+
+        view = self._load(segment)
+        self._open[segment] = view
+        self._evict()
+        return view
+
+    def _evict(self) -> None:
+        """关闭超出数量限制的最久未使用区段（有未保存修改的区段保持打开）"""
+        if self.max_open_segments is None:
+            return
+        excess = len(self._open) - self.max_open_segments
+        for segment in [segment for segment, view in self._open.items() if not view.modified][:max(excess, 0)]:
+            self.close_segment(segment)
+
+    def close_segment(self, segment: Segment, discard: bool = False) -> None:
+        """
+        关闭区段并释放其战斗表
+
+        Args:
+            segment: 区段
+            discard: 是否丢弃未保存的修改（否则先写入该文件的编辑记录）
+        """
+        view = self._open.pop(segment, None)
+        if view is None:
+            return
+        if view.modified and not discard:
+            self._stage(view)
+        view.table.remove_observer(view)
+
+    def journal(self, file_id: int) -> EditJournal:
+        """返回某个文件的编辑记录"""
+        journal = self.journals.get(file_id)
+        if journal is None:
+            journal = self.journals[file_id] = EditJournal(self.indexes[file_id])
+        return journal
+
+    def _stage(self, view: SegmentView) -> None:
+        """将区段中被修改的行写入编辑记录"""
+        journal = self.journal(view.segment.file_id)
+        for row in sorted(view.changed_rows):
+            journal.replace_line(view.file_rows[row], view.table.raw_lines[row])
+        view.changed_rows.clear()
+
+    def has_changes(self, file_id: Optional[int] = None) -> bool:
+        """是否存在未保存的修改（file_id为None时检查所有文件）"""
+        for view in self._open.values():
+            if view.modified and (file_id is None or view.segment.file_id == file_id):
+                return True
+        return any(journal.has_changes() for fid, journal in self.journals.items()
+                   if file_id is None or fid == file_id)
+
+    def save_file(self, file_id: int, backup: bool = True) -> Dict[str, int]:
+        """
+        保存某个文件的修改（区段划分和已打开的区段保持有效）
+
+        Returns:
+            统计信息，同EditJournal.save
+        """
+        for view in self._open.values():
+            if view.segment.file_id == file_id and view.modified:
+                self._stage(view)
+        journal = self.journal(file_id)
+        stats = journal.save(backup=backup)
+        self.indexes[file_id] = journal.index
+        if self.use_sidecar:
+            try:
+                journal.index.save_sidecar()
+            except OSError as e:
+                print(f"保存索引文件失败: {e}")
+        return stats
+
+    def locate(self, view: SegmentView, row: int) -> Tuple[str, int]:
+        """返回区段表中某行所在的(文件路径, 索引行号)"""
+        return self.indexes[view.segment.file_id].file_path, view.file_rows[row]
+
+    def close(self) -> None:
+        """关闭所有区段和文件的内存映射"""
+        for segment in list(self._open):
+            self.close_segment(segment, discard=True)
+        for index in self.indexes:
+            index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
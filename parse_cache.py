@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV日志解析缓存模块
+将解析后的战斗表各列、名称驻留表和行偏移索引保存到日志旁的 .ffxcache 文件，
+再次打开时通过内存映射直接读回各列，不再解析日志；日志被追加写入时只解析新增部分
+
+缓存按文件大小、修改时间以及开头/结尾各64KB的SHA256判断是否有效：
+    大小和修改时间都一致且两处哈希一致     -> 直接使用
+    文件变大、开头一致且原结尾处内容未变   -> 读取缓存后只解析追加的部分
+    其他情况                               -> 重新解析并覆盖缓存
+"""
+
+import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from typing import Optional, Tuple, List
+
+from combat_table import CombatTable, StringPool
+from log_index import LogIndex
+from perf_monitor import instrument
+
+CACHE_SUFFIX = '.ffxcache'
+_CACHE_MAGIC = b'FFXPCC01'
+# 标识、缓存覆盖的字节数、修改时间（纳秒）、开头哈希、结尾哈希、区段计数、行类型前缀字节数
+_CACHE_HEADER = struct.Struct('<8sQQ32s32sII')
+# 每列：类型码、元素个数
+_COLUMN_HEADER = struct.Struct('<cQ')
+
+# 计算开头/结尾哈希的字节数
+HASH_SPAN = 64 * 1024
+
+# 战斗表中保存到缓存的数值列
+_TABLE_COLUMNS = ('line_numbers', 'timestamps', 'source_ids', 'ability_ids', 'target_ids', 'flags',
+                  'damage', 'source_codes', 'ability_codes', 'target_codes', 'segment_ids')
+_TABLE_POOLS = ('sources', 'abilities', 'targets')
+
+# 加载状态
+STATUS_HIT = 'hit'
+STATUS_APPEND = 'append'
+STATUS_MISS = 'miss'
+
+def cache_path(log_path: str) -> str:
+    """返回日志文件对应的解析缓存文件路径"""
+    return log_path + CACHE_SUFFIX
+
+def _span_hashes(mm, size: int) -> Tuple[bytes, bytes]:
+    """返回[0, size)区间开头和结尾各HASH_SPAN字节的SHA256"""
+    head = hashlib.sha256(mm[:min(size, HASH_SPAN)]).digest()
+    tail = hashlib.sha256(mm[max(size - HASH_SPAN, 0):size]).digest()
+    return head, tail
+
+def _write_column(f, column: array.array) -> None:
+    f.write(_COLUMN_HEADER.pack(column.typecode.encode('ascii'), len(column)))
+    if sys.byteorder == 'big':
+        column = array.array(column.typecode, column)
+        column.byteswap()
+    column.tofile(f)
+
+def _read_column(mm, pos: int) -> Tuple[array.array, int]:
+    typecode, count = _COLUMN_HEADER.unpack_from(mm, pos)
+    pos += _COLUMN_HEADER.size
+    column = array.array(typecode.decode('ascii'))
+    end = pos + count * column.itemsize
+    if end > len(mm):
+        raise ValueError("缓存文件被截断")
+    column.frombytes(mm[pos:end])
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column, end
+
+def _write_pool(f, pool: StringPool) -> None:
+    encoded = [value.encode('utf-8') for value in pool.values]
+    _write_column(f, array.array('I', map(len, encoded)))
+    blob = b''.join(encoded)
+    f.write(struct.pack('<Q', len(blob)))
+    f.write(blob)
+
+def _read_pool(mm, pos: int) -> Tuple[StringPool, int]:
+    lengths, pos = _read_column(mm, pos)
+    size, = struct.unpack_from('<Q', mm, pos)
+    pos += 8
+    text = mm[pos:pos + size]
+    pool = StringPool()
+    start = 0
+    for length in lengths:
+        pool.intern(text[start:start + length].decode('utf-8'))
+        start += length
+    return pool, pos + size
+
+class ParsedLog:
+    """
+    已解析的日志：行偏移索引、战斗表，以及每个表行在文件中的字节范围
+
+    只解析以换行符结尾的完整行（include_partial为True时，文件末尾没有换行符的最后一行也会解析，
+    但不写入缓存，之后文件变大时整体重新解析）。
+    """
+
+    def __init__(self, file_path: str, index: LogIndex, table: CombatTable,
+                 row_starts: array.array, row_ends: array.array, complete_size: int):
+        self.file_path = file_path
+        self.index = index
+        self.table = table
+        self.row_starts = row_starts
+        self.row_ends = row_ends
+        # 已解析的完整行止于此字节偏移（最后一个换行符之后）
+        self.complete_size = complete_size
+        self.partial = index.file_size > complete_size
+
+    @classmethod
+    @instrument('parse_cache_open', items=lambda result: len(result[0].table))
+    def open(cls, file_path: str, use_cache: bool = True,
+             include_partial: bool = True) -> Tuple['ParsedLog', str]:
+        """
+        打开日志：缓存有效时直接读取，文件被追加时只解析新增部分，否则完整解析
+
+        Args:
+            file_path: 日志文件路径
+            use_cache: 是否读写缓存文件
+            include_partial: 是否解析文件末尾没有换行符的最后一行
+
+        Returns:
+            (ParsedLog, 状态)，状态为 'hit'、'append' 或 'miss'
+        """
+        parsed = cls.load_cache(file_path) if use_cache else None
+        status = STATUS_HIT
+        if parsed is None:
+            status = STATUS_MISS
+            parsed = cls(file_path, LogIndex.build(file_path, 0), CombatTable(),
+                         array.array('Q'), array.array('Q'), 0)
+
+        cached_size = parsed.complete_size
+        parsed.extend(include_partial=False)
+        if status == STATUS_HIT and parsed.complete_size != cached_size:
+            status = STATUS_APPEND
+        if use_cache and status != STATUS_HIT:
+            try:
+                parsed.save_cache()
+            except OSError as e:
+                print(f"保存解析缓存失败: {e}")
+        if include_partial:
+            parsed.extend(include_partial=True)
+        return parsed, status
+
+    def extend(self, include_partial: bool = False) -> int:
+        """
+        解析文件中追加在已解析部分之后的完整行，写入索引和战斗表
+
+        Args:
+            include_partial: 是否同时解析末尾没有换行符的最后一行
+
+        Returns:
+            新增的战斗表行数
+
+        Raises:
+            ValueError: 之前已解析了不完整的最后一行（需要重新打开）
+        """
+        if self.partial:
+            raise ValueError("已解析不完整的最后一行，无法继续追加")
+
+        file_size = os.path.getsize(self.file_path)
+        if file_size <= self.complete_size:
+            return 0
+        with open(self.file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                file_size = min(file_size, len(mm))
+                complete = mm.rfind(b'\n', self.complete_size, file_size) + 1
+        end = file_size if include_partial else max(complete, self.complete_size)
+        if end <= self.complete_size:
+            return 0
+
+        index = self.index
+        first = len(index)
+        index.extend(end)
+        self.complete_size = max(complete, self.complete_size)
+        self.partial = end > self.complete_size
+
+        table = self.table
+        before = len(table)
+        prefix_code = _type_code_of(table.line_prefixes)
+        type_codes = index.type_codes
+        line_numbers = index.line_numbers
+        for row in range(first, len(index)):
+            line_number = line_numbers[row]
+            if line_number != 1 and type_codes[row] not in prefix_code:
+                continue
+            start, stop = index.line_span(row)
+            if table.append(index.line(row), line_number) is not None:
+                self.row_starts.append(start)
+                self.row_ends.append(stop)
+        return len(table) - before
+
+    def save_cache(self) -> None:
+        """将已解析的完整行写入缓存文件（先写临时文件再替换）"""
+        if self.partial:
+            raise ValueError("已解析不完整的最后一行，不能写入缓存")
+        with open(self.file_path, 'rb') as f:
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            if self.complete_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    head, tail = _span_hashes(mm, self.complete_size)
+            else:
+                head = tail = hashlib.sha256(b'').digest()
+
+        table = self.table
+        prefixes = _encode_prefixes(table.line_prefixes)
+        path = cache_path(self.file_path)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, self.complete_size, mtime_ns, head, tail,
+                                       table.segment_count, len(prefixes)))
+            f.write(prefixes)
+            for column in (self.index.offsets, self.index.type_codes, self.index.line_numbers,
+                           self.row_starts, self.row_ends):
+                _write_column(f, column)
+            for name in _TABLE_COLUMNS:
+                _write_column(f, getattr(table, name))
+            for name in _TABLE_POOLS:
+                _write_pool(f, getattr(table, name))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_cache(cls, file_path: str) -> Optional['ParsedLog']:
+        """
+        读取缓存文件
+
+        Returns:
+            ParsedLog（可能只覆盖文件的前一部分，由调用方extend），缓存不存在、损坏或已失效时返回None
+        """
+        try:
+            with open(cache_path(file_path), 'rb') as cf, open(file_path, 'rb') as lf:
+                st = os.fstat(lf.fileno())
+                with mmap.mmap(cf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    magic, size, mtime_ns, head, tail, segment_count, prefix_size = \
+                        _CACHE_HEADER.unpack_from(mm, 0)
+                    if magic != _CACHE_MAGIC or size > st.st_size:
+                        return None
+                    if size == st.st_size and mtime_ns != st.st_mtime_ns:
+                        return None
+                    if size and not _log_matches(lf, size, head, tail):
+                        return None
+
+                    pos = _CACHE_HEADER.size
+                    prefixes = _decode_prefixes(mm[pos:pos + prefix_size])
+                    pos += prefix_size
+                    columns = []
+                    for _ in range(5 + len(_TABLE_COLUMNS)):
+                        column, pos = _read_column(mm, pos)
+                        columns.append(column)
+                    pools = []
+                    for _ in _TABLE_POOLS:
+                        pool, pos = _read_pool(mm, pos)
+                        pools.append(pool)
+
+                lines = _read_lines(lf, columns[3], columns[4])
+        except (OSError, ValueError, struct.error, UnicodeDecodeError):
+            return None
+
+        index = LogIndex(file_path, columns[0], columns[1], columns[2], size, mtime_ns)
+        table = CombatTable(prefixes)
+        table.raw_lines = lines
+        for name, column in zip(_TABLE_COLUMNS, columns[5:]):
+            setattr(table, name, column)
+        for name, pool in zip(_TABLE_POOLS, pools):
+            setattr(table, name, pool)
+        table.segment_count = segment_count
+        if len(set(map(len, columns[3:]))) != 1 or len(lines) != len(columns[3]):
+            return None
+        return cls(file_path, index, table, columns[3], columns[4], size)
+
+def _log_matches(f, size: int, head: bytes, tail: bytes) -> bool:
+    """日志的[0, size)区间开头和结尾是否与缓存记录的哈希一致"""
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _span_hashes(mm, size) == (head, tail)
+
+def _read_lines(f, starts: array.array, ends: array.array) -> List[str]:
+    """按字节范围从日志中读取表行的原始内容"""
+    if not len(starts):
+        return []
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return [mm[start:end].decode('utf-8', errors='replace').strip() for start, end in zip(starts, ends)]
+
+def _encode_prefixes(prefixes) -> bytes:
+    if isinstance(prefixes, str):
+        prefixes = (prefixes,)
+    return '\n'.join(prefixes).encode('utf-8')
+
+def _decode_prefixes(data: bytes):
+    prefixes = tuple(data.decode('utf-8').split('\n'))
+    return prefixes[0] if len(prefixes) == 1 else prefixes
+
+def _type_code_of(prefixes) -> frozenset:
+    """行类型前缀（如'21|'）对应的索引类型码集合"""
+    if isinstance(prefixes, str):
+        prefixes = (prefixes,)
+    return frozenset(int(prefix.rstrip('|')) for prefix in prefixes)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能监控模块
+为解析、建索引、筛选、校验码、保存等操作记录耗时和计数，可选采集cProfile/tracemalloc，
+并输出JSON报告
+
+环境变量：
+    FFXIV_PERF_DETAIL=1          同时统计逐次调用的热点函数（如单行校验码计算，有额外开销）
+    FFXIV_PERF_CAPTURE=cprofile,tracemalloc   启动时开始采集
+    FFXIV_PERF_REPORT=报告路径    程序退出时写入JSON报告
+"""
+
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Callable, Iterable
+
+DETAIL_ENV = "FFXIV_PERF_DETAIL"
+CAPTURE_ENV = "FFXIV_PERF_CAPTURE"
+REPORT_ENV = "FFXIV_PERF_REPORT"
+
+# 是否统计逐次调用的热点函数（导入时决定，关闭时这些函数不做任何包装）
+DETAIL_ENABLED = os.environ.get(DETAIL_ENV, '') not in ('', '0')
+
+# 报告中cProfile/tracemalloc各列出的最大条目数
+CAPTURE_TOP = 20
+
+def peak_memory_bytes() -> Optional[int]:
+    """返回进程的峰值内存（字节），无法获取时返回None"""
+    import tracemalloc
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1]
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        try:
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.PeakWorkingSetSize
+        except (AttributeError, OSError):
+            pass
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class PerfMonitor:
+    """耗时与计数统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 名称 -> {'calls', 'total', 'max', 'items'}
+        self.timers = {}
+        self.counters = {}
+        self.started_at = time.time()
+        self._profiler = None
+        self._capture = {}
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+            self.started_at = time.time()
+
+    def record(self, name: str, seconds: float, items: int = 0) -> None:
+        """记录一次耗时（items为本次处理的行数等数量，用于计算吞吐量）"""
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = {'calls': 0, 'total': 0.0, 'max': 0.0, 'items': 0}
+            timer['calls'] += 1
+            timer['total'] += seconds
+            timer['items'] += items
+            if seconds > timer['max']:
+                timer['max'] = seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        """计数器加n"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def timed(self, name: str):
+        """
+        计时上下文，可在块内设置处理数量：
+
+            with monitor.timed('parse') as timing:
+                ...
+                timing['items'] = len(lines)
+        """
+        timing = {'items': 0}
+        start = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            self.record(name, time.perf_counter() - start, timing['items'])
+
+    def instrument(self, name: str, items: Optional[Callable] = None, detail: bool = False):
+        """
+        函数计时装饰器
+
+        Args:
+            name: 统计名称
+            items: 由返回值计算处理数量的函数（如len），None表示不统计数量
+            detail: 是否为逐次调用的热点函数，只有设置FFXIV_PERF_DETAIL时才包装
+        """
+        def decorator(func):
+            if detail and not DETAIL_ENABLED:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                self.record(name, time.perf_counter() - start, items(result) if items else 0)
+                return result
+            return wrapper
+        return decorator
+
+    @property
+    def capturing(self) -> bool:
+        """是否正在采集cProfile/tracemalloc"""
+        return bool(self._capture)
+
+    def start_capture(self, cprofile: bool = True, memory: bool = True) -> None:
+        """开始采集cProfile和/或tracemalloc"""
+        if self._capture:
+            return
+        if cprofile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+            self._capture['cprofile'] = True
+        if memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._capture['tracemalloc'] = True
+
+    def stop_capture(self, profile_path: Optional[str] = None) -> Dict:
+        """
+        停止采集
+
+        Args:
+            profile_path: cProfile结果的保存路径（可用pstats或snakeviz查看），None表示不保存
+
+        Returns:
+            {'cprofile': 耗时最多的函数列表, 'tracemalloc': 分配最多的位置列表}
+        """
+        result = {}
+        if self._profiler is not None:
+            import pstats
+            self._profiler.disable()
+            if profile_path:
+                self._profiler.dump_stats(profile_path)
+            stats = pstats.Stats(self._profiler)
+            entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+            result['cprofile'] = [{
+                'function': f"{filename}:{line}({function})",
+                'calls': calls,
+                'self_seconds': round(self_time, 6),
+                'cumulative_seconds': round(cumulative, 6),
+            } for (filename, line, function), (_, calls, self_time, cumulative, _) in entries[:CAPTURE_TOP]]
+            self._profiler = None
+        if self._capture.get('tracemalloc'):
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            result['tracemalloc'] = {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top': [{'location': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+                        for stat in snapshot.statistics('lineno')[:CAPTURE_TOP]],
+            }
+            tracemalloc.stop()
+        self._capture = {}
+        return result
+
+    def report(self) -> Dict:
+        """
+        生成报告
+
+        Returns:
+            {'timers': {名称: {calls, total_seconds, max_seconds, items, items_per_second}},
+             'counters': {...}, 'peak_memory_bytes', 'uptime_seconds'}
+        """
+        with self._lock:
+            timers = {name: dict(timer) for name, timer in self.timers.items()}
+            counters = dict(self.counters)
+        return {
+            'timers': {name: {
+                'calls': timer['calls'],
+                'total_seconds': round(timer['total'], 6),
+                'max_seconds': round(timer['max'], 6),
+                'items': timer['items'],
+                'items_per_second': round(timer['items'] / timer['total'], 1)
+                if timer['items'] and timer['total'] > 0 else None,
+            } for name, timer in sorted(timers.items())},
+            'counters': counters,
+            'peak_memory_bytes': peak_memory_bytes(),
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+        }
+
+    def write_report(self, path: str, capture: Optional[Dict] = None) -> None:
+        """将报告（以及stop_capture的结果）写入JSON文件"""
+        import json
+        report = self.report()
+        if capture:
+            report['capture'] = capture
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+# 全局监控实例与便捷函数
+monitor = PerfMonitor()
+timed = monitor.timed
+instrument = monitor.instrument
+count = monitor.count
+
+def _capture_from_env(value: str) -> Iterable[str]:
+    """解析FFXIV_PERF_CAPTURE的取值"""
+    names = {name.strip().lower() for name in value.split(',') if name.strip()}
+    if names & {'1', 'all', 'true'}:
+        names |= {'cprofile', 'tracemalloc'}
+    return names
+
+def _write_report_at_exit(path: str) -> None:
+    """程序退出时写入报告"""
+    capture = monitor.stop_capture(os.path.splitext(path)[0] + '.prof') if monitor.capturing else None
+    try:
+        monitor.write_report(path, capture)
+    except OSError as e:
+        print(f"写入性能报告失败: {e}")
+
+if os.environ.get(CAPTURE_ENV):
+    _names = _capture_from_env(os.environ[CAPTURE_ENV])
+    monitor.start_capture(cprofile='cprofile' in _names, memory='tracemalloc' in _names)
+if os.environ.get(REPORT_ENV):
+    atexit.register(_write_report_at_exit, os.environ[REPORT_ENV])
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能面板模块
+显示perf_monitor收集的各项操作耗时、吞吐量（行/秒）和峰值内存，并可开关cProfile/tracemalloc采集
+"""
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from typing import Optional
+
+from perf_monitor import monitor
+
+# 面板自动刷新间隔（毫秒）
+REFRESH_MS = 1000
+
+# 操作名称的中文说明
+TIMER_LABELS = {
+    'parse': '解析日志',
+    'load': '后台加载',
+    'load_batch': '加载批次',
+    'table_build': '构建战斗表',
+    'event_store_build': '构建事件表',
+    'index_build': '构建行索引',
+    'parse_cache_open': '打开日志（解析缓存）',
+    'follow': '实时跟随',
+    'filter_index_build': '构建筛选索引',
+    'filter': '筛选',
+    'filter_index': '索引筛选',
+    'checksum': '校验码（单行）',
+    'checksum_batch': '校验码（批量）',
+    'resign': '重新签名',
+    'validate': '校验文件',
+    'refresh_tree': '刷新列表',
+    'segment_scan': '划分区段',
+    'segment_open': '打开区段',
+    'save': '保存',
+}
+
+def _format_bytes(size: Optional[int]) -> str:
+    """格式化字节数"""
+    if size is None:
+        return '未知'
+    return f"{size / 1024 / 1024:.1f} MB"
+
+class PerformancePanel(ttk.Frame):
+    """性能面板"""
+
+    COLUMNS = ('name', 'calls', 'total', 'max', 'rate')
+    HEADINGS = {'name': '操作', 'calls': '次数', 'total': '总耗时(ms)', 'max': '最长(ms)', 'rate': '行/秒'}
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, padding=10, **kwargs)
+        self.last_capture = None
+        self.capture_var = tk.BooleanVar(value=monitor.capturing)
+        self.memory_var = tk.StringVar()
+
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS, show='headings', height=12)
+        for column in self.COLUMNS:
+            self.tree.heading(column, text=self.HEADINGS[column])
+            self.tree.column(column, width=150 if column == 'name' else 90,
+                             anchor=tk.W if column == 'name' else tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(self, textvariable=self.memory_var).pack(anchor=tk.W, pady=(8, 0))
+
+        button_frame = ttk.Frame(self)
+        button_frame.pack(fill=tk.X, pady=(8, 0))
+        ttk.Checkbutton(button_frame, text="采集cProfile/tracemalloc", variable=self.capture_var,
+                        command=self.toggle_capture).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="导出报告", command=self.export_report).pack(side=tk.RIGHT)
+        ttk.Button(button_frame, text="重置", command=self.reset).pack(side=tk.RIGHT, padx=(0, 10))
+
+        self._after_id = None
+        self.refresh()
+
+    def refresh(self) -> None:
+        """刷新统计并安排下一次刷新"""
+        report = monitor.report()
+        self.tree.delete(*self.tree.get_children())
+        for name, timer in report['timers'].items():
+            rate = timer['items_per_second']
+            self.tree.insert('', 'end', values=(
+                TIMER_LABELS.get(name, name),
+                timer['calls'],
+                f"{timer['total_seconds'] * 1000:.1f}",
+                f"{timer['max_seconds'] * 1000:.1f}",
+                f"{rate:,.0f}" if rate else '',
+            ))
+        self.memory_var.set(f"峰值内存: {_format_bytes(report['peak_memory_bytes'])}"
+                            f"    运行时间: {report['uptime_seconds']:.0f} 秒")
+        self._after_id = self.after(REFRESH_MS, self.refresh)
+
+    def destroy(self) -> None:
+        """关闭面板时取消定时刷新"""
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
+
+    def toggle_capture(self) -> None:
+        """开始或停止cProfile/tracemalloc采集"""
+        if self.capture_var.get():
+            monitor.start_capture()
+        else:
+            self.last_capture = monitor.stop_capture()
+
+    def reset(self) -> None:
+        """清空统计"""
+        monitor.reset()
+        self.last_capture = None
+
+    def export_report(self) -> None:
+        """将报告导出为JSON文件（正在采集时先停止采集，cProfile结果另存为.prof文件）"""
+        path = filedialog.asksaveasfilename(parent=self, title="导出性能报告", defaultextension='.json',
+                                            filetypes=[("JSON文件", "*.json"), ("所有文件", "*.*")])
+        if not path:
+            return
+        if monitor.capturing:
+            self.last_capture = monitor.stop_capture(path.rsplit('.', 1)[0] + '.prof')
+            self.capture_var.set(False)
+        try:
+            monitor.write_report(path, self.last_capture)
+        except OSError as e:
+            messagebox.showerror("错误", f"导出性能报告失败: {e}", parent=self)
+            return
+        messagebox.showinfo("提示", f"性能报告已导出到: {path}", parent=self)
+
+def show_performance_window(root) -> tk.Toplevel:
+    """
+    打开性能面板窗口
+
+    Args:
+        root: Tk根窗口
+
+    Returns:
+        面板所在的Toplevel窗口
+    """
+    window = tk.Toplevel(root)
+    window.title("性能监控")
+    window.geometry("600x420")
+    PerformancePanel(window).pack(fill=tk.BOTH, expand=True)
+    return window
+
+def add_performance_menu(menu: tk.Menu, root) -> None:
+    """在菜单中加入“性能监控”菜单项"""
+    menu.add_command(label="性能监控", command=lambda: show_performance_window(root))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV日志编辑器启动导入耗时分析脚本
+用法: python profile_imports.py [模块名...] [--top N] [--budget-ms 毫秒] [--json 报告文件]
+在子进程中以 -X importtime 导入指定模块（默认为存在的入口模块main，否则为启动时加载的编辑器模块），
+按累计耗时列出最慢的导入。
+超过耗时预算或启动时导入了网络模块时返回非零退出码，便于发现启动性能回退。
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import List, Dict, Optional
+
+# 默认分析的入口模块；源码中没有main.py时改为分析启动时加载的编辑器模块
+ENTRY_MODULE = 'main'
+STARTUP_MODULES = ['auto_updater', 'version_config', 'checksum_calculator', 'combat_table',
+                   'background_loader', 'virtual_tree']
+
+def default_modules() -> List[str]:
+    """返回默认分析的模块中实际存在的模块"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for modules in ([ENTRY_MODULE], STARTUP_MODULES):
+        existing = [module for module in modules if os.path.exists(os.path.join(directory, module + '.py'))]
+        if existing:
+            return existing
+    return []
+
+# 启动阶段不应导入的模块（应在主窗口显示后按需导入）
+FORBIDDEN_AT_STARTUP = ('requests', 'urllib3', 'urllib.request', 'http.client', 'ssl')
+
+def run_importtime(modules: List[str]) -> str:
+    """
+    在干净的子进程中导入模块并返回 -X importtime 的输出
+
+    Raises:
+        RuntimeError: 导入失败
+    """
+    statement = '; '.join(f'import {module}' for module in modules)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip()
+                           else f"退出码 {result.returncode}")
+    return result.stderr
+
+def parse_importtime(output: str) -> List[Dict]:
+    """
+    解析 -X importtime 输出
+
+    每行格式为 "import time: self [us] | cumulative | imported package"，
+    包名前的缩进表示嵌套层级。
+
+    Returns:
+        [{'module', 'self_us', 'cumulative_us', 'depth'}] 列表，按导入完成顺序排列
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # 表头
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        entries.append({
+            'module': stripped,
+            'self_us': int(fields[0]),
+            'cumulative_us': int(fields[1]),
+            'depth': (len(name) - len(stripped) - 1) // 2,
+        })
+    return entries
+
+def summarize(entries: List[Dict]) -> Dict:
+    """统计总耗时和被禁止的模块"""
+    imported = {entry['module'] for entry in entries}
+    return {
+        'total_us': sum(entry['cumulative_us'] for entry in entries if entry['depth'] == 0),
+        'module_count': len(entries),
+        'forbidden': [module for module in FORBIDDEN_AT_STARTUP if module in imported],
+    }
+
+def profile_imports(modules: List[str]) -> Dict:
+    """
+    分析导入耗时
+
+    Returns:
+        {'modules', 'total_us', 'module_count', 'forbidden', 'entries'}
+    """
+    entries = parse_importtime(run_importtime(modules))
+    report = summarize(entries)
+    report['modules'] = modules
+    report['entries'] = entries
+    return report
+
+def print_report(report: Dict, top: int) -> None:
+    """打印最慢的导入"""
+    print(f"导入模块: {', '.join(report['modules'])}")
+    print(f"总耗时: {report['total_us'] / 1000:.1f} ms，共导入 {report['module_count']} 个模块")
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    slowest = sorted(report['entries'], key=lambda entry: entry['cumulative_us'], reverse=True)
+    for entry in slowest[:top]:
+        print(f"{entry['cumulative_us'] / 1000:10.1f} {entry['self_us'] / 1000:10.1f}  "
+              f"{'  ' * entry['depth']}{entry['module']}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函数"""
+    parser = argparse.ArgumentParser(description='分析启动时的模块导入耗时')
+    parser.add_argument('modules', nargs='*', help='要导入的模块（默认main，不存在时为启动时加载的编辑器模块）')
+    parser.add_argument('--top', type=int, default=20, help='列出最慢的N个导入')
+    parser.add_argument('--budget-ms', type=float, help='总导入耗时预算（毫秒），超出时返回非零退出码')
+    parser.add_argument('--json', dest='json_path', help='将完整报告写入JSON文件')
+    args = parser.parse_args(argv)
+    modules = args.modules or default_modules()
+    if not modules:
+        parser.error('没有找到默认模块，请指定要导入的模块')
+
+    try:
+        report = profile_imports(modules)
+    except RuntimeError as e:
+        print(f"✗ 导入失败: {e}")
+        return 2
+
+    print_report(report, args.top)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    status = 0
+    if report['forbidden']:
+        print(f"✗ 启动时导入了应延迟导入的模块: {', '.join(report['forbidden'])}")
+        status = 1
+    if args.budget_ms is not None and report['total_us'] / 1000 > args.budget_ms:
+        print(f"✗ 导入耗时 {report['total_us'] / 1000:.1f} ms 超出预算 {args.budget_ms:.1f} ms")
+        status = 1
+    if status == 0:
+        print("✓ 导入耗时检查通过")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
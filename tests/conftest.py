@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""测试公共设置：把仓库根目录加入导入路径，并提供合成日志"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_samples import build_log_lines, write_log  # noqa: E402
+
+@pytest.fixture
+def log_lines():
+    """3个区域、每个区域2场战斗的合成日志行"""
+    return build_log_lines()
+
+@pytest.fixture
+def log_file(tmp_path, log_lines):
+    """log_lines写入的日志文件（CRLF换行）"""
+    return write_log(str(tmp_path / 'Network_test.log'), log_lines)
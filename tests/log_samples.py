@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+测试用的合成日志
+
+按ACT日志的字段布局生成带有效校验码的行：每个区域以01|切换行开始（行号重置为1），
+随后是03|战斗成员行和若干场战斗；战斗之间夹有21|小怪行，战斗由00|倒计时、
+33|开始标记、21|/22|/24|/25|/26|事件和33|胜利/团灭标记组成。
+"""
+
+import datetime
+import random
+from typing import List, Tuple
+
+from checksum_calculator import calculate_checksum_with_line_number
+
+START = datetime.datetime(2025, 7, 26, 20, 0, 0)
+TIMEZONE = '+08:00'
+
+PLAYERS = (('10574A2B', '光之战士'), ('10574A2C', '冒险者'), ('10574A2D', '白魔法师'), ('10574A2E', '吟游诗人'))
+ENEMIES = (('40011B8C', '木人'), ('40011B8D', '泰坦'), ('40011B8E', '伊弗利特'))
+ZONES = (('3E9', '利姆萨·罗敏萨上层甲板'), ('2E5', '巨人之石'), ('3A1', '海之底'))
+ABILITIES = (('9D7A', '烈刃'), ('9D7B', '强力斩'), ('DD0', '攻击'), ('4070', '血乱'))
+EFFECTS = (('31', '强化药'), ('74F', '战斗连祷'))
+
+# 伤害类（效果类型3）与非伤害类（治疗、闪避、状态）的标志
+DAMAGE_FLAGS = ('750003', '710003', '3')
+HEAL_FLAG = '10004'
+MISS_FLAG = '1'
+
+COMMENCE = '40000001'
+VICTORY = '40000003'
+WIPE = '40000010'
+
+def encode_damage(damage: int) -> str:
+    """按ACT的伤害字段格式编码（超过65535时使用大数值编码）"""
+    if damage <= 0xFFFF:
+        return '%X' % (damage << 16)
+    extra = damage >> 16
+    high = (damage & 0xFFFF) + extra
+    return '%X' % ((high << 16) | 0x4000 | extra)
+
+class _Builder:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.time = START
+        self.parts = []
+
+    def timestamp(self) -> str:
+        self.time += datetime.timedelta(microseconds=self.rng.randint(1, 400) * 1000 + self.rng.randint(0, 999))
+        return self.time.strftime('%Y-%m-%dT%H:%M:%S.') + '%07d' % (self.time.microsecond * 10) + TIMEZONE
+
+    def add(self, *fields) -> None:
+        self.parts.append([str(field) for field in fields])
+
+    def ability(self, line_type: str, flags: str = None, target_index: int = 0, target_count: int = 1) -> None:
+        rng = self.rng
+        source_id, source = rng.choice(PLAYERS)
+        if flags == HEAL_FLAG:
+            target_id, target = rng.choice(PLAYERS)
+        else:
+            target_id, target = rng.choice(ENEMIES)
+        ability_id, ability = rng.choice(ABILITIES)
+        if flags is None:
+            flags = rng.choice(DAMAGE_FLAGS)
+        damage = 0 if flags == MISS_FLAG else rng.randint(70000, 400000) if rng.random() < 0.05 \
+            else rng.randint(100, 30000)
+        self.add(line_type, self.timestamp(), source_id, source, ability_id, ability, target_id, target,
+                 flags, encode_damage(damage), '1B', ability_id + '8000', '0', '0', '0', '0',
+                 '100000', '100000', '10000', '10000', '', '', '100.00', '100.00', '0.00', '0.00',
+                 '%08X' % rng.randint(0, 0xFFFFFF), target_index, target_count)
+
+    def event(self) -> None:
+        rng = self.rng
+        kind = rng.choices(('21', '22', '24', '25', '26', 'heal', 'miss', '00'), (50, 12, 8, 1, 8, 8, 3, 3))[0]
+        if kind == '21':
+            self.ability('21')
+        elif kind == 'heal':
+            self.ability('21', HEAL_FLAG)
+        elif kind == 'miss':
+            self.ability('21', MISS_FLAG)
+        elif kind == '22':
+            count = rng.randint(2, 3)
+            for index in range(count):
+                self.ability('22', None, index, count)
+        elif kind == '24':
+            target_id, target = rng.choice(ENEMIES)
+            source_id, source = rng.choice(PLAYERS)
+            self.add('24', self.timestamp(), target_id, target, 'DoT', '0', '%X' % rng.randint(100, 5000),
+                     '100000', '100000', '10000', '10000', '', '', '100.00', '100.00', '0.00', '0.00',
+                     source_id, source, '5')
+        elif kind == '25':
+            target_id, target = rng.choice(PLAYERS)
+            source_id, source = rng.choice(ENEMIES)
+            self.add('25', self.timestamp(), target_id, target, source_id, source)
+        elif kind == '26':
+            self.status()
+        else:
+            self.add('00', self.timestamp(), '0039', '', '战斗开始倒计时取消。')
+
+    def status(self) -> None:
+        effect_id, effect = self.rng.choice(EFFECTS)
+        source_id, source = self.rng.choice(PLAYERS)
+        target_id, target = self.rng.choice(PLAYERS)
+        self.add('26', self.timestamp(), effect_id, effect, '30.00', source_id, source, target_id, target,
+                 '00', '100000', '100000')
+
+def build_log_lines(seed: int = 7, zones: int = 3, fights_per_zone: int = 2, fight_events: int = 80) -> List[str]:
+    """生成日志行（不含换行符），校验码按区域内行号计算"""
+    builder = _Builder(seed)
+    rng = builder.rng
+    for zone in range(zones):
+        zone_id, zone_name = ZONES[zone % len(ZONES)]
+        builder.add('01', builder.timestamp(), zone_id, zone_name)
+        for actor_id, name in PLAYERS + ENEMIES:
+            builder.add('03', builder.timestamp(), actor_id, name, '13', '64', '0000', '0', '', '0', '0',
+                        '100000', '100000', '10000', '10000', '', '', '100.00', '100.00', '0.00', '0.00')
+        for fight in range(fights_per_zone):
+            instance = '8003%04X' % (zone + 1)
+            # 两次开怪之间的小怪
+            for _ in range(rng.randint(3, 8)):
+                builder.ability('21')
+            builder.add('00', builder.timestamp(), '0039', '', '战斗开始！')
+            builder.add('33', builder.timestamp(), instance, COMMENCE, '708', '0', '0', '0')
+            for _ in range(rng.randint(fight_events // 2, fight_events * 3 // 2)):
+                builder.event()
+            builder.add('33', builder.timestamp(), instance, VICTORY if fight % 2 == 0 else WIPE, '0', '0', '0', '0')
+            for _ in range(rng.randint(2, 5)):
+                builder.status()
+        builder.ability('21')
+
+    lines = []
+    line_number = 0
+    for parts in builder.parts:
+        line_number = 1 if parts[0] == '01' else line_number + 1
+        lines.append('|'.join(parts) + '|' + calculate_checksum_with_line_number(parts, line_number))
+    return lines
+
+def with_line_numbers(lines: List[str]) -> List[Tuple[str, int]]:
+    """按01|重置规则为非空行编号"""
+    result = []
+    line_number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        line_number = 1 if line.startswith('01|') else line_number + 1
+        result.append((line, line_number))
+    return result
+
+def write_log(path: str, lines: List[str], newline: str = '\r\n', final_newline: bool = True) -> str:
+    """写入日志文件并返回路径"""
+    text = newline.join(lines) + (newline if final_newline else '')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    return path
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""AutoUpdater对本地HTTP服务器的条件请求、缓存、限流和退避"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import auto_updater
+from auto_updater import AutoUpdater, BACKOFF_BASE
+
+RELEASE = {'name': 'v9.9.9', 'tag_name': 'v9.9.9', 'body': '更新说明', 'published_at': '2026-01-01T00:00:00Z'}
+ETAG = '"release-1"'
+
+class _ReleaseServer(HTTPServer):
+    """模拟GitHub releases API：responses中的下一项决定响应，记录收到的请求头"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _ReleaseHandler)
+        self.responses = []
+        self.requests = []
+
+class _ReleaseHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        status, headers = server.responses.pop(0) if server.responses else (200, {})
+        if status == 200 and self.headers.get('If-None-Match') == ETAG:
+            status = 304
+        body = json.dumps(RELEASE).encode('utf-8') if status == 200 else b''
+        self.send_response(status)
+        if status in (200, 304):
+            self.send_header('ETag', ETAG)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def server(monkeypatch):
+    # 本地请求不经过代理
+    for name in ('http_proxy', 'HTTP_PROXY', 'https_proxy', 'HTTPS_PROXY', 'all_proxy', 'ALL_PROXY'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('no_proxy', '127.0.0.1,localhost')
+    server = _ReleaseServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def updater(server, tmp_path):
+    clock = _Clock()
+    url = f'http://127.0.0.1:{server.server_port}/repos/test/releases/latest'
+    return AutoUpdater('v1.0.0', api_url=url, cache_path=str(tmp_path / 'update_cache.json'),
+                       ttl=3600, clock=clock)
+
+def test_revalidates_with_etag_after_ttl(server, updater):
+    info = updater.check_for_updates()
+    assert info['version'] == 'v9.9.9'
+    assert 'If-None-Match' not in server.requests[0]
+
+    # 有效期内不发起请求
+    assert updater.check_for_updates() == info
+    assert len(server.requests) == 1
+
+    updater.clock.now += 3601
+    assert updater.check_for_updates() == info
+    assert len(server.requests) == 2
+    assert server.requests[1]['If-None-Match'] == ETAG
+    cache = updater.load_cache()
+    assert cache['etag'] == ETAG and cache['next_check_at'] == updater.clock.now + 3600
+
+def test_retry_after_delays_next_check(server, updater):
+    updater.check_for_updates()
+    updater.clock.now += 3601
+    server.responses.append((429, {'Retry-After': '7200'}))
+
+    # 失败时继续使用上次的发布信息，并按Retry-After推迟下次检查
+    assert updater.check_for_updates()['version'] == 'v9.9.9'
+    cache = updater.load_cache()
+    assert cache['failures'] == 1
+    assert cache['next_check_at'] == updater.clock.now + 7200
+
+    updater.clock.now += 7199
+    updater.check_for_updates()
+    assert len(server.requests) == 2
+
+def test_failures_back_off_exponentially(server, updater):
+    delays = []
+    for _ in range(3):
+        server.responses.append((500, {}))
+        assert updater.check_for_updates() is None
+        cache = updater.load_cache()
+        delays.append(cache['next_check_at'] - updater.clock.now)
+        # 退避期间不发起请求
+        requests = len(server.requests)
+        updater.check_for_updates()
+        assert len(server.requests) == requests
+        updater.clock.now = cache['next_check_at']
+    assert delays == [BACKOFF_BASE, BACKOFF_BASE * 2, BACKOFF_BASE * 4]
+
+    # 恢复后清零失败计数
+    assert updater.check_for_updates()['version'] == 'v9.9.9'
+    assert updater.load_cache()['failures'] == 0
+
+def test_env_overrides_api_url(monkeypatch, tmp_path):
+    monkeypatch.setenv(auto_updater.UPDATE_URL_ENV, 'http://127.0.0.1:1/latest')
+    assert AutoUpdater('v1.0.0', cache_path=str(tmp_path / 'c.json')).api_url == 'http://127.0.0.1:1/latest'
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""BackgroundLoader：读取线程解析，界面线程按时间预算分段加入表"""
+
+import time
+
+import background_loader
+from background_loader import BackgroundLoader
+from combat_table import CombatTable
+
+class _FakeRoot:
+    """代替Tk根窗口：记录root.after回调，由测试逐个执行"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def run(self, timeout=30, steps=None):
+        deadline = time.monotonic() + timeout
+        while self.callbacks and time.monotonic() < deadline and steps != 0:
+            self.callbacks.pop(0)()
+            time.sleep(0.001)
+            if steps is not None:
+                steps -= 1
+        if steps is None:
+            assert not self.callbacks, '加载超时'
+
+def _load(log_file, **kwargs):
+    batches = []
+    done = []
+    root = _FakeRoot()
+    loader = BackgroundLoader(root, log_file, on_batch=lambda table, first, count: batches.append((first, count)),
+                              on_done=lambda table, error: done.append(error), **kwargs)
+    loader.start()
+    return root, loader, batches, done
+
+def test_loader_matches_from_file(log_file, log_lines):
+    root, loader, batches, done = _load(log_file)
+    root.run()
+    expected = CombatTable.from_file(log_file)
+    assert done == [None]
+    assert loader.table.raw_lines == expected.raw_lines
+    assert loader.table.segment_ids == expected.segment_ids
+    assert loader.lines_read == len(log_lines) and loader.bytes_read == loader.total_bytes
+    assert [first for first, _ in batches] == [sum(count for _, count in batches[:i]) for i in range(len(batches))]
+
+def test_poll_applies_rows_in_slices(log_file, monkeypatch):
+    monkeypatch.setattr(background_loader, 'FIRST_BATCH_LINES', 100)
+    monkeypatch.setattr(background_loader, 'BATCH_LINES', 400)
+    monkeypatch.setattr(background_loader, 'APPLY_SLICE_ROWS', 50)
+    monkeypatch.setattr(background_loader, 'POLL_TIME_BUDGET', 0)
+    root, loader, batches, done = _load(log_file)
+    root.run()
+
+    # 时间预算用完后每次轮询只加入一段，其余留到下一次轮询
+    assert done == [None]
+    assert batches and all(count <= 50 for _, count in batches)
+    assert sum(count for _, count in batches) == len(loader.table) == len(CombatTable.from_file(log_file))
+
+def test_cancel_keeps_applied_rows(log_file, monkeypatch):
+    monkeypatch.setattr(background_loader, 'FIRST_BATCH_LINES', 100)
+    monkeypatch.setattr(background_loader, 'APPLY_SLICE_ROWS', 10)
+    monkeypatch.setattr(background_loader, 'POLL_TIME_BUDGET', 0)
+    root, loader, batches, done = _load(log_file)
+    while not batches:
+        root.run(steps=1)
+    loader.cancel()
+    applied = len(loader.table)
+    root.run()
+
+    assert loader.cancelled and done == [None]
+    assert len(loader.table) == applied == sum(count for _, count in batches)
+    assert 0 < applied < len(CombatTable.from_file(log_file))
+
+def test_loader_keeps_table_line_prefixes(log_file):
+    from checksum_calculator import ABILITY_LINE_PREFIXES, iter_log_file_with_line_numbers
+
+    root, loader, batches, done = _load(log_file, table=CombatTable(ABILITY_LINE_PREFIXES))
+    root.run()
+
+    expected = CombatTable(ABILITY_LINE_PREFIXES)
+    for line, line_number, _ in iter_log_file_with_line_numbers(log_file):
+        expected.append(line, line_number)
+    assert done == [None]
+    assert any(line.startswith('22|') for line in loader.table.raw_lines)
+    assert loader.table.raw_lines == expected.raw_lines
+    assert loader.table.segment_ids == expected.segment_ids
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""校验码计算与校验"""
+
+import hashlib
+import re
+
+from checksum_calculator import (COMBAT_FIELDS, calculate_checksum_with_line_number,
+                                 calculate_checksums_with_line_numbers, iter_checksums_with_line_numbers,
+                                 parse_combat_line, parse_log_line, u_49152, validate_checksum_with_line_number)
+from log_samples import with_line_numbers
+
+def test_u49152_matches_hex_prefix():
+    for i in range(64):
+        digest = hashlib.sha256(str(i).encode('utf-8')).digest()
+        assert u_49152(digest) == digest[:8].hex()
+
+def test_batch_matches_single(log_lines):
+    items = [(line.split('|')[:-1], line_number) for line, line_number in with_line_numbers(log_lines)]
+    expected = [calculate_checksum_with_line_number(parts, line_number) for parts, line_number in items]
+    assert calculate_checksums_with_line_numbers(items) == expected
+    assert list(iter_checksums_with_line_numbers(iter(items))) == expected
+    assert calculate_checksums_with_line_numbers([]) == []
+
+def test_sample_lines_validate(log_lines):
+    numbered = with_line_numbers(log_lines)
+    assert all(validate_checksum_with_line_number(line, line_number) for line, line_number in numbered)
+    line, line_number = numbered[5]
+    assert not validate_checksum_with_line_number(line, line_number + 1)
+    assert not validate_checksum_with_line_number(line[:-1] + ('0' if line[-1] != '0' else '1'), line_number)
+
+def _corrupt(line):
+    return line[:-1] + ('0' if line[-1] != '0' else '1')
+
+def test_parallel_validate_matches_serial(tmp_path, log_lines):
+    from checksum_calculator import validate_log_file
+    from log_samples import build_log_lines, write_log
+
+    lines = build_log_lines(seed=3, zones=6, fights_per_zone=1, fight_events=30)
+    # 文件末尾是一个只有01|行的区域，另有一行无效校验码
+    lines.append(log_lines[0])
+    lines[40] = _corrupt(lines[40])
+    path = write_log(str(tmp_path / 'zones.log'), lines)
+
+    serial = validate_log_file(path, workers=1)
+    assert serial['total'] == len(lines)
+    assert len(serial['invalid']) == 1
+    for workers in (2, 3, 8):
+        assert validate_log_file(path, workers=workers) == serial
+
+def test_zone_chunks_start_at_zone_change(tmp_path, log_lines):
+    from checksum_calculator import _find_zone_chunks
+    from log_samples import write_log
+
+    path = write_log(str(tmp_path / 'test.log'), log_lines + [log_lines[0]])
+    with open(path, 'rb') as f:
+        data = f.read()
+    chunks = _find_zone_chunks(path, 16)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+    # 末尾的01|行单独成为最后一个区间
+    assert data[chunks[-1][0]:].startswith(b'01|') and data[chunks[-1][0]:].count(b'\n') == 1
+    for (start, end), (next_start, _) in zip(chunks, chunks[1:]):
+        assert end == next_start
+        assert data[next_start:next_start + 3] == b'01|'
+    assert _find_zone_chunks(path, 1) == [(0, len(data))]
+
+def _expected_rows(data: bytes):
+    rows = []
+    offset = 0
+    line_number = 0
+    for raw in data.split(b'\n'):
+        line = raw.decode('utf-8').strip()
+        if line:
+            line_number = 1 if line.startswith('01|') else line_number + 1
+            rows.append((line, line_number, offset))
+        offset += len(raw) + 1
+    return rows
+
+def test_streaming_parser_matches_plain_scan(tmp_path, log_lines):
+    from checksum_calculator import iter_log_file_with_line_numbers, parse_log_file_with_line_numbers
+    from log_samples import write_log
+
+    lines = log_lines[:120]
+    lines[30:30] = ['', '   ']
+    for name, newline, final_newline in (('crlf', '\r\n', True), ('lf', '\n', True), ('bare', '\n', False)):
+        path = write_log(str(tmp_path / f'{name}.log'), lines, newline, final_newline)
+        with open(path, 'rb') as f:
+            expected = _expected_rows(f.read())
+        assert len(expected) == 120
+        for chunk_size in (7, 64, 1 << 20):
+            assert list(iter_log_file_with_line_numbers(path, chunk_size=chunk_size)) == expected
+        assert parse_log_file_with_line_numbers(path) == [(line, number) for line, number, _ in expected]
+
+def test_streaming_parser_rejects_invalid_utf8(tmp_path, log_lines):
+    import pytest
+    from checksum_calculator import LogParseError, iter_log_file_with_line_numbers
+
+    prefix = ('\r\n'.join(log_lines[:3]) + '\r\n').encode('utf-8')
+    path = tmp_path / 'broken.log'
+    path.write_bytes(prefix + b'21|\xff\xfe|abc\r\n' + log_lines[3].encode('utf-8'))
+    with pytest.raises(LogParseError) as info:
+        list(iter_log_file_with_line_numbers(str(path), chunk_size=16))
+    assert info.value.offset == len(prefix) + 3
+    assert info.value.line_number == 4
+    rows = list(iter_log_file_with_line_numbers(str(path), errors='replace'))
+    assert len(rows) == 5
+
+# 旧版parse_log_line使用的正则表达式，作为无正则实现的对照
+_LEGACY_PATTERN = re.compile(r'^21\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|([^|]*)\|.*\|([^|]*)$')
+
+def _legacy_parse(line):
+    if not line.strip():
+        return None
+    match = _LEGACY_PATTERN.match(line.strip())
+    return None if match is None else dict(zip(COMBAT_FIELDS, match.groups()))
+
+_EDGE_CASES = [
+    '',
+    '   ',
+    '21|',
+    '21|a|b|c|d|e|f|g|h|i|checksum',                # 第9个字段后只有校验码
+    '21|a|b|c|d|e|f|g|h|i||checksum',
+    '21|a|b|c|d|e|f|g|h|i|x|',                      # 校验码为空
+    '21|a|b|c|d|e|f|g|h|i|x|y|z|' + '|' * 40 + 'c',  # 额外字段
+    '21|||||||||||',
+    '  21|a|b|c|d|e|f|g|h|i|x|checksum \r\n',
+    '21|a|b|c|d|e|f|g|h|i|x\ny|checksum',
+    '21|a\nb|b|c|d|e|f|g|h|i|x|checksum',
+    '21|a|b|c|d|e|f|g|h|i|x|check\nsum',
+    '22|a|b|c|d|e|f|g|h|i|x|checksum',
+    '210|a|b|c|d|e|f|g|h|i|x|checksum',
+    '2|a|b|c|d|e|f|g|h|i|x|checksum',
+    '121|a|b|c|d|e|f|g|h|i|x|checksum',
+    '00|2025-07-26T20:00:00.0000000+08:00|0039||战斗开始！|abc',
+    '01|2025-07-26T20:00:00.0000000+08:00|3E9|区域|abc',
+]
+
+def test_parser_matches_legacy_regex(log_lines):
+    for line in log_lines + _EDGE_CASES:
+        expected = _legacy_parse(line)
+        assert parse_log_line(line) == expected, line
+        record = parse_combat_line(line)
+        assert (None if record is None else record.to_dict()) == expected, line
+
+def test_combat_record_fields(log_lines):
+    line = next(line for line in log_lines if line.startswith('21|'))
+    record = parse_combat_line(line)
+    parts = line.split('|')
+    assert record.timestamp == parts[1] and record.source == parts[3] and record.target == parts[7]
+    assert record.damage == parts[9] and record.checksum == parts[-1]
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""战斗事件列式存储"""
+
+import datetime
+
+import pytest
+
+from checksum_calculator import parse_combat_line
+from combat_table import INVALID_TIMESTAMP, CombatTable, parse_hex, parse_timestamp_ns
+from log_samples import with_line_numbers
+
+def _combat_lines(log_lines):
+    return [(line, number) for line, number in with_line_numbers(log_lines) if line.startswith('21|')]
+
+def test_from_file_matches_line_parser(log_file, log_lines):
+    table = CombatTable.from_file(log_file)
+    expected = _combat_lines(log_lines)
+    assert len(table) == len(expected)
+    for row, (line, line_number) in enumerate(expected):
+        record = parse_combat_line(line)
+        assert table.record(row) == record
+        assert table.line_numbers[row] == line_number
+        assert table.sources.values[table.source_codes[row]] == record.source
+        assert table.targets.values[table.target_codes[row]] == record.target
+        assert table.flags[row] == int(record.flags, 16)
+        assert table.damage[row] == int(record.damage, 16)
+    assert table.row(0)['line_number'] == expected[0][1]
+
+def test_parse_timestamp_ns():
+    text = '2025-07-26T21:04:33.9250001+08:00'
+    expected = datetime.datetime(2025, 7, 26, 13, 4, 33, tzinfo=datetime.timezone.utc).timestamp()
+    assert parse_timestamp_ns(text) == int(expected) * 1000000000 + 925000100
+    assert parse_timestamp_ns('2025-07-26T21:04:33-01:30') == (int(expected) + 8 * 3600 + 5400) * 1000000000
+    assert parse_timestamp_ns('2025-07-26T13:04:33.5Z') == int(expected) * 1000000000 + 500000000
+    for bad in ('', '2025-07-26', '2025-07-26 21:04:33', '2025-07-26T21:04:33+0800'):
+        assert parse_timestamp_ns(bad) == INVALID_TIMESTAMP
+
+def test_parse_hex():
+    assert parse_hex('1B') == 0x1B
+    assert parse_hex('') == 0 and parse_hex('xyz') == 0 and parse_hex('1FFFFFFFF') == 0
+
+def test_filter_matches_scan(log_file):
+    table = CombatTable.from_file(log_file)
+    records = [table.record(row) for row in range(len(table))]
+    source, target, ability = records[0].source, records[0].target, records[0].ability
+    assert table.filter() == list(range(len(table)))
+    assert table.filter(source=source) == [row for row, r in enumerate(records) if r.source == source]
+    assert table.filter(source=source, target=target, ability=ability) == [
+        row for row, r in enumerate(records) if (r.source, r.target, r.ability) == (source, target, ability)]
+    subset = list(range(0, len(table), 3))
+    assert table.filter(target=target, rows=subset) == [row for row in subset if records[row].target == target]
+    assert table.filter(source='不存在') == []
+
+    values = table.unique_values()
+    assert values['sources'] == sorted({r.source for r in records})
+    assert table.unique_values(rows=[0])['targets'] == [target]
+
+def test_set_line_updates_columns(log_file):
+    table = CombatTable.from_file(log_file)
+    line = table.raw_lines[1].replace(table.record(1).source, '新名字', 1)
+    table.set_line(1, line)
+    assert table.record(1).source == '新名字'
+    assert table.filter(source='新名字') == [1]
+    with pytest.raises(ValueError):
+        table.set_line(1, '22|invalid')
+
+def test_damage_encoding_round_trip():
+    from combat_table import MAX_DAMAGE, decode_damage_value, encode_damage_value
+
+    values = list(range(0, 0x20000)) + list(range(0x20000, MAX_DAMAGE + 1, 997))
+    values += [0xFFFF, 0x10000, 0xFFFEFF, 0xFFFF00, MAX_DAMAGE - 1, MAX_DAMAGE]
+    for damage in values:
+        raw = encode_damage_value(damage)
+        assert 0 <= raw <= 0xFFFFFFFF
+        assert decode_damage_value(raw) == damage
+    assert encode_damage_value(MAX_DAMAGE) == 0xFFFF40FF
+    with pytest.raises(ValueError):
+        encode_damage_value(MAX_DAMAGE + 1)
+    with pytest.raises(ValueError):
+        encode_damage_value(-1)
+
+def test_damage_encoding_keeps_other_flags():
+    from combat_table import decode_damage_value, encode_damage_value
+
+    # 普通编码保留第三字节，大数值编码保留其低4位
+    assert encode_damage_value(0x1234, 0x00002300) == 0x12342300
+    assert encode_damage_value(0x1234, 0x56784203) == 0x12340200
+    raw = encode_damage_value(300000, 0x00000300)
+    assert decode_damage_value(raw) == 300000 and (raw >> 8) & 0xF == 3
+    # 日志中的实际大数值字段
+    assert decode_damage_value(0xB3914000) == 0xB391
+    assert decode_damage_value(0x86A04001) == 0x86A0 - 1 + 0x10000
+
+def test_scale_damage_totals_and_checksums(log_file):
+    from checksum_calculator import validate_checksum_with_line_number
+    from combat_table import decode_damage_value
+
+    table = CombatTable.from_file(log_file)
+    source = table.record(0).source
+    rows = table.filter(source=source)
+    before = [decode_damage_value(table.damage[row]) for row in range(len(table))]
+    big_rows = [row for row in rows if before[row] > 0xFFFF]
+    assert big_rows
+
+    result = table.scale_damage(1.5, source=source)
+    assert result['matched'] == len(rows)
+    assert result['old_total'] == sum(before[row] for row in rows)
+    after = [decode_damage_value(table.damage[row]) for row in range(len(table))]
+    assert result['new_total'] == sum(after[row] for row in rows)
+    assert after == [int(round(value * 1.5)) if row in rows else value for row, value in enumerate(before)]
+    assert result['changed'] == [row for row in rows if before[row] != after[row]]
+
+    # 原始行、数值列和校验码保持一致
+    for row in range(len(table)):
+        assert int(table.record(row).damage, 16) == table.damage[row]
+        assert validate_checksum_with_line_number(table.raw_lines[row], table.line_numbers[row])
+
+    assert table.scale_damage(0, rows=big_rows)['new_total'] == 0
+    with pytest.raises(ValueError):
+        table.scale_damage(-1)
+
+def test_filter_by_time_window(log_file):
+    table = CombatTable.from_file(log_file)
+    start, end = table.timestamps[10], table.timestamps[40]
+    assert table.filter(start_ns=start, end_ns=end) == [
+        row for row in range(len(table)) if start <= table.timestamps[row] < end]
+    assert table.filter(start_ns=table.timestamps[-1]) == [len(table) - 1]
+
+def test_observers_see_rewritten_lines(log_file):
+    table = CombatTable.from_file(log_file)
+    seen = []
+
+    class Observer:
+        def row_appended(self, row):
+            pass
+
+        def row_changed(self, row, old_key):
+            assert int(table.record(row).damage, 16) == table.damage[row] != old_key[4]
+            seen.append(row)
+
+    table.add_observer(Observer())
+    result = table.scale_damage(3, source=table.record(0).source)
+    assert seen == result['changed'] and seen
+
+@pytest.mark.parametrize('text', [
+    '2025-07-26T21:04:33.9250001+08:00',
+    '2025-07-26T21:04:33.0000000+08:00',
+    '2025-07-26T21:04:33.925+08:00',
+    '2025-07-26T21:04:33+08:00',
+    '2025-07-26T21:04:33.123456789-05:30',
+    '2025-07-26T21:04:33.5Z',
+    '2024-02-29T00:00:00.0000001+00:00',
+    '1969-12-31T23:59:59.9999999+00:00',
+])
+def test_timestamp_round_trip(text):
+    from combat_table import format_timestamp_ns
+
+    assert format_timestamp_ns(parse_timestamp_ns(text), text) == text
+
+def test_sample_timestamps_round_trip(log_lines):
+    from combat_table import format_timestamp_ns
+
+    for line in log_lines:
+        text = line.split('|')[1]
+        assert len(text.split('.')[1]) == len('0000000+08:00')
+        assert format_timestamp_ns(parse_timestamp_ns(text), text) == text
+
+def test_shift_timestamp_keeps_layout():
+    from combat_table import shift_timestamp
+
+    assert shift_timestamp('2025-07-26T23:59:59.9990000+08:00', 2000000) == '2025-07-27T00:00:00.0010000+08:00'
+    assert shift_timestamp('2025-03-01T00:00:00.0000000-08:00', -100) == '2025-02-28T23:59:59.9999999-08:00'
+    assert shift_timestamp('2025-07-26T21:04:33+08:00', 1500000000) == '2025-07-26T21:04:34+08:00'
+    assert shift_timestamp('无效时间', 1000) == '无效时间'
+
+def test_shift_time_resigns_and_notifies(log_file):
+    from checksum_calculator import validate_checksum_with_line_number
+
+    table = CombatTable.from_file(log_file)
+    changed_rows = []
+
+    class Observer:
+        def row_appended(self, row):
+            pass
+
+        def row_changed(self, row, old_key):
+            assert old_key == table.row_key(row)
+            assert parse_timestamp_ns(table.record(row).timestamp) == table.timestamps[row]
+            changed_rows.append(row)
+
+    table.add_observer(Observer())
+    source = table.record(0).source
+    before = list(table.timestamps)
+    result = table.shift_time(-3600 * 1000000000 - 1500, source=source)
+
+    rows = table.filter(source=source)
+    assert result == {'matched': len(rows), 'changed': rows}
+    assert changed_rows == rows
+    for row in range(len(table)):
+        shift = -3600 * 1000000000 - 1500 if row in rows else 0
+        assert table.timestamps[row] == before[row] + shift
+        assert parse_timestamp_ns(table.record(row).timestamp) == table.timestamps[row]
+        assert validate_checksum_with_line_number(table.raw_lines[row], table.line_numbers[row])
+    # 7位小数和时区保持不变
+    assert table.record(rows[0]).timestamp.endswith('+08:00') and len(table.record(rows[0]).timestamp) == 33
+
+    assert table.shift_time(0)['changed'] == []
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""伤害汇总的增量更新"""
+
+from collections import defaultdict
+
+from combat_table import CombatTable, decode_damage_value
+from damage_rollup import DamageRollup
+from log_samples import HEAL_FLAG, MISS_FLAG, build_log_lines, with_line_numbers
+
+def _rescan(table):
+    """逐行重新统计伤害类行的合计"""
+    totals = defaultdict(int)
+    for row in range(len(table)):
+        record = table.record(row)
+        if int(record.flags, 16) & 0xFF not in (3, 5, 6):
+            continue
+        key = (table.segment_ids[row], table.target_codes[row], table.source_codes[row], table.ability_codes[row])
+        totals[key] += decode_damage_value(int(record.damage, 16))
+    return {key: value for key, value in totals.items() if value}
+
+def _nonzero(totals):
+    return {key: value for key, value in totals.items() if value}
+
+def test_rollup_counts_only_damage(log_file):
+    table = CombatTable.from_file(log_file)
+    rollup = DamageRollup(table)
+    assert _nonzero(rollup.totals) == _rescan(table)
+
+    flags = {table.record(row).flags for row in range(len(table))}
+    assert HEAL_FLAG in flags and MISS_FLAG in flags
+    heal_rows = [row for row in range(len(table)) if table.record(row).flags == HEAL_FLAG]
+    healed = table.record(heal_rows[0]).target
+    assert rollup.target_total(healed) == 0
+    assert rollup.breakdown(healed) == {}
+
+    target = table.record(table.filter()[0]).target
+    expected = sum(value for (segment, code, _, _), value in _rescan(table).items()
+                   if code == table.targets.lookup(target))
+    assert rollup.target_total(target) == expected == sum(rollup.breakdown(target).values())
+    assert sum(rollup.target_total(target, segment) for segment in range(table.segment_count)) == expected
+
+def test_incremental_totals_match_rescan(log_file):
+    table = CombatTable.from_file(log_file)
+    rollup = DamageRollup(table)
+
+    for line, line_number in with_line_numbers(build_log_lines(seed=11, zones=1, fight_events=40)):
+        table.append(line, line_number)
+    assert _nonzero(rollup.totals) == _rescan(table)
+
+    source = table.record(0).source
+    table.scale_damage(2.5, source=source)
+    table.scale_damage(0.5, target=table.record(3).target)
+    assert _nonzero(rollup.totals) == _rescan(table)
+
+    # 修改目标、把伤害改成治疗、把闪避改成伤害
+    for row, field, value in ((1, 7, '新目标'), (2, 8, HEAL_FLAG),
+                              (table.filter()[-1], 8, '750003'), (5, 9, '4E20000')):
+        parts = table.raw_lines[row].split('|')
+        parts[field] = value
+        table.set_line(row, '|'.join(parts))
+    assert _nonzero(rollup.totals) == _rescan(table)
+    assert _nonzero(rollup.totals) == _nonzero(DamageRollup(table).totals)
+
+    rollup.close()
+    assert rollup not in table.observers
+
+def test_totals_follow_set_fields_and_undo(log_file):
+    from undo_journal import UndoJournal
+
+    table = CombatTable.from_file(log_file)
+    rollup = DamageRollup(table)
+    journal = UndoJournal(table)
+
+    rows = list(range(0, len(table), 7))
+    table.set_fields(rows, 9, ['4E20000'] * len(rows))
+    assert _nonzero(rollup.totals) == _rescan(table)
+    table.set_fields(rows[:10], 8, [HEAL_FLAG] * 10)
+    table.set_fields(rows[10:20], 7, ['新目标'] * 10)
+    assert _nonzero(rollup.totals) == _rescan(table)
+
+    table.scale_damage(4, target=table.record(1).target)
+    while journal.undo():
+        assert _nonzero(rollup.totals) == _rescan(table)
+    while journal.redo():
+        assert _nonzero(rollup.totals) == _rescan(table)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""EditJournal：只重新计算受影响行的校验码，其余字节原样复制；保存时保留权限、备份与失败恢复"""
+
+import os
+import stat
+
+import pytest
+
+from checksum_calculator import resign_log_line, validate_log_file
+from edit_journal import BACKUP_SUFFIX, EditJournal
+from log_index import LogIndex
+from log_samples import write_log
+
+def _with_blank_lines(log_lines):
+    """每隔若干行插入空行和只含空白的行"""
+    lines = []
+    for i, line in enumerate(log_lines):
+        lines.append(line)
+        if i % 17 == 5:
+            lines.extend(['', '  '])
+    return lines
+
+def _resigned(lines):
+    """按编辑后的行序列重新计算全部校验码，作为期望输出"""
+    result = []
+    number = 0
+    for line in lines:
+        if line.strip():
+            number = 1 if line.startswith('01|') else number + 1
+            line = resign_log_line(line, number)
+        result.append(line)
+    return result
+
+def _rows(lines):
+    """行ID（不计空行）到文件行位置的映射"""
+    return [i for i, line in enumerate(lines) if line.strip()]
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_write_without_changes_copies_file(tmp_path, log_lines):
+    path = write_log(str(tmp_path / 'test.log'), _with_blank_lines(log_lines))
+    journal = EditJournal(LogIndex.build(path))
+    stats = journal.write_to(str(tmp_path / 'out.log'))
+    assert stats['resigned'] == 0
+    assert _read(str(tmp_path / 'out.log')) == _read(path)
+
+def test_write_keeps_blank_lines_after_edited_rows(tmp_path, log_lines):
+    lines = _with_blank_lines(log_lines)
+    path = write_log(str(tmp_path / 'test.log'), lines)
+    rows = _rows(lines)
+    journal = EditJournal(LogIndex.build(path))
+
+    # 修改、删除和插入都落在空行之前的行上
+    edited = [row for row in range(len(rows)) if lines[rows[row] + 1:rows[row] + 2] == ['']]
+    replace_row, delete_row, insert_row = edited[1], edited[4], edited[8]
+    parts = lines[rows[replace_row]].split('|')
+    parts[3] = '修改后'
+    journal.replace_line(replace_row, '|'.join(parts))
+    journal.delete_line(delete_row)
+    journal.insert_lines(insert_row, [lines[rows[2]]])
+    journal.insert_lines(len(rows), [lines[rows[3]]])
+
+    expected = list(lines)
+    expected[rows[replace_row]] = '|'.join(parts)
+    expected.insert(rows[insert_row], lines[rows[2]])
+    del expected[rows[delete_row]]
+    expected.append(lines[rows[3]])
+
+    out = str(tmp_path / 'out.log')
+    stats = journal.write_to(out)
+    assert _read(out) == _read(write_log(str(tmp_path / 'expected.log'), _resigned(expected)))
+    assert stats['resigned'] > 3
+    assert validate_log_file(out, workers=1)['invalid'] == []
+
+def test_write_without_final_newline(tmp_path, log_lines):
+    lines = log_lines[:50]
+    path = write_log(str(tmp_path / 'test.log'), lines, '\n', final_newline=False)
+    journal = EditJournal(LogIndex.build(path))
+    journal.delete_line(10)
+    out = str(tmp_path / 'out.log')
+    journal.write_to(out)
+    expected = _resigned(lines[:10] + lines[11:])
+    assert _read(out) == _read(write_log(str(tmp_path / 'expected.log'), expected, '\n', final_newline=False))
+
+    # 追加的行补上缺失的换行符
+    journal.insert_lines(50, [lines[20]])
+    journal.write_to(out)
+    expected = _resigned(lines[:10] + lines[11:] + [lines[20]])
+    assert _read(out) == _read(write_log(str(tmp_path / 'expected.log'), expected, '\n'))
+
+def _first_row_of_type(index, type_code):
+    return next(row for row in range(len(index)) if index.type_codes[row] == type_code)
+
+def _edited_journal(log_file):
+    index = LogIndex.build(log_file)
+    journal = EditJournal(index)
+    row = _first_row_of_type(index, 21)
+    parts = index.line(row).split('|')
+    parts[9] = '1234'
+    journal.replace_line(row, '|'.join(parts))
+    return journal, row
+
+def test_save_resigns_only_edited_row(log_file):
+    with open(log_file, 'rb') as f:
+        original = f.read()
+    journal, row = _edited_journal(log_file)
+    stats = journal.save()
+
+    assert stats['resigned'] == 1
+    assert journal.index.line(row).split('|')[9] == '1234'
+    assert validate_log_file(log_file, workers=1)['invalid'] == []
+    with open(log_file + BACKUP_SUFFIX, 'rb') as f:
+        assert f.read() == original
+
+@pytest.mark.skipif(os.name != 'posix', reason='需要POSIX权限位')
+def test_save_keeps_file_mode(log_file):
+    os.chmod(log_file, 0o640)
+    journal, _ = _edited_journal(log_file)
+    journal.save(backup=False)
+    assert stat.S_IMODE(os.stat(log_file).st_mode) == 0o640
+
+def test_failed_save_restores_renamed_original(log_file, monkeypatch):
+    with open(log_file, 'rb') as f:
+        original = f.read()
+    journal, _ = _edited_journal(log_file)
+    real_replace = os.replace
+
+    def no_link(src, dst):
+        raise OSError('不支持硬链接')
+
+    def failing_replace(src, dst):
+        if src.endswith('.tmp'):
+            raise OSError('替换失败')
+        real_replace(src, dst)
+
+    # 硬链接失败时原文件被重命名为备份，随后替换失败
+    monkeypatch.setattr(os, 'link', no_link)
+    monkeypatch.setattr(os, 'replace', failing_replace)
+    with pytest.raises(OSError):
+        journal.save()
+    monkeypatch.undo()
+
+    with open(log_file, 'rb') as f:
+        assert f.read() == original
+    assert not [name for name in os.listdir(os.path.dirname(log_file)) if name.endswith('.tmp')]
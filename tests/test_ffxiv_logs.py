@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""ffxiv_logs命令行：规则检查、批量编辑和单个文件失败时的处理"""
+
+import json
+import os
+
+import pytest
+
+import ffxiv_logs
+from checksum_calculator import validate_log_file
+from combat_table import CombatTable
+
+def _write_rules(tmp_path, rules):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps(rules, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+def test_types_string_is_one_type_code(tmp_path):
+    rules = ffxiv_logs.load_rules(_write_rules(tmp_path, {'filter': {'types': '21'}, 'multiplier': 2}))
+    assert rules[0]['types'] == {'21'}
+    rules = ffxiv_logs.load_rules(_write_rules(tmp_path, {'filter': {'types': [21, '22']}}))
+    assert rules[0]['types'] == {'21', '22'}
+
+def test_invalid_types_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ffxiv_logs.load_rules(_write_rules(tmp_path, {'filter': {'types': {'21': True}}}))
+
+def test_edit_resigns_changed_lines(log_file, tmp_path):
+    rules = _write_rules(tmp_path, {'multiplier': 2})
+    output_dir = str(tmp_path / 'out')
+    assert ffxiv_logs.main(['edit', '-r', rules, '-o', output_dir, '-j', '1', log_file]) == 0
+    output = os.path.join(output_dir, os.path.basename(log_file))
+    assert validate_log_file(output, workers=1)['invalid'] == []
+    assert CombatTable.from_file(output).raw_lines != CombatTable.from_file(log_file).raw_lines
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_bad_file_does_not_abort_batch(log_file, tmp_path, capsys, jobs):
+    bad = tmp_path / 'bad.log'
+    bad.write_bytes(b'21|\xff\xfe|broken\n')
+    rules = _write_rules(tmp_path, {'multiplier': 2})
+    output_dir = tmp_path / 'out'
+
+    status = ffxiv_logs.main(['edit', '-r', rules, '-o', str(output_dir), '-j', jobs, str(bad), log_file])
+    out = capsys.readouterr().out
+    assert status == 1
+    assert f"✗ {bad}" in out
+    assert f"✓ {log_file}" in out
+    # 失败的文件不留下不完整的输出
+    assert sorted(os.listdir(output_dir)) == [os.path.basename(log_file)]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""倒排索引与CombatTable.filter的一致性"""
+
+import itertools
+import random
+
+from combat_table import CombatTable
+from filter_index import InvertedIndex
+from log_samples import build_log_lines, with_line_numbers
+
+def _criteria(table):
+    """所有来源/技能/目标取值（含不限制和不存在的名称）的组合"""
+    values = table.unique_values()
+    return itertools.product([None, '不存在'] + values['sources'],
+                             [None] + values['abilities'],
+                             [None, '不存在'] + values['targets'])
+
+def _assert_equivalent(table, index):
+    for source, ability, target in _criteria(table):
+        expected = table.filter(source=source, ability=ability, target=target)
+        assert index.lookup(source=source, ability=ability, target=target) == expected
+
+        available = index.available_values(source, ability, target)
+        assert available['sources'] == table.unique_values(table.filter(ability=ability, target=target))['sources']
+        assert available['targets'] == table.unique_values(table.filter(source=source, ability=ability))['targets']
+
+    for flags in set(table.flags) | {0x12345}:
+        assert index.lookup(flags=flags) == [row for row in range(len(table)) if table.flags[row] == flags]
+
+def test_lookup_matches_filter(log_file):
+    table = CombatTable.from_file(log_file)
+    _assert_equivalent(table, InvertedIndex(table))
+
+def test_lookup_matches_filter_after_edits(log_file):
+    table = CombatTable.from_file(log_file)
+    index = InvertedIndex(table)
+    rng = random.Random(5)
+
+    # 重命名来源/目标（包括改为新名称和改为已有名称）、修改标志
+    for _ in range(60):
+        row = rng.randrange(len(table))
+        parts = table.raw_lines[row].split('|')
+        field = rng.choice((3, 5, 7, 8))
+        if field == 8:
+            parts[8] = rng.choice(('750003', '10004', '1', '3'))
+        else:
+            parts[field] = rng.choice(('改名', '木人', '光之战士', parts[field] + '2'))
+        table.set_line(row, '|'.join(parts))
+    table.scale_damage(2, source='冒险者')
+    for line, line_number in with_line_numbers(build_log_lines(seed=13, zones=1, fight_events=30)):
+        table.append(line, line_number)
+
+    _assert_equivalent(table, index)
+    assert all(posting for lists in index.postings.values() for posting in lists.values())
+
+    index.close()
+    assert index not in table.observers
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""行类型分派与EventStore"""
+
+from checksum_calculator import parse_log_line
+from combat_table import CombatTable
+from line_decoders import EventStore, decode_line, line_type
+
+def test_line_type_requires_separator():
+    assert line_type('26|2025-07-26T20:00:00|31') == '26'
+    assert line_type(' 21|x') == '21'
+    assert line_type('260') == ''
+    assert line_type('') == ''
+    assert decode_line('260') is None
+    assert decode_line('21') is None
+
+def test_event_store_skips_lines_without_separator():
+    store = EventStore()
+    assert store.append('260', 1) is None
+    assert store.append('2', 2) is None
+    assert len(store) == 0
+    # 没有|的首行仍开始新的区段
+    assert store.combat.segment_count == 1
+
+def test_event_store_matches_combat_table(log_file):
+    store = EventStore.from_file(log_file)
+    table = CombatTable.from_file(log_file)
+    assert [line for line in store.combat.raw_lines if line.startswith('21|')] == table.raw_lines
+    assert store.combat.segment_count == table.segment_count
+    assert store.counts()['26'] > 0
+
+    row = 0
+    record = store.tables['26'].record(row)
+    assert record.type_code == '26'
+    assert record.line == store.tables['26'].raw_lines[row]
+
+def test_decoded_fields_match_parse_log_line(log_file):
+    table = CombatTable.from_file(log_file)
+    for line in table.raw_lines[:200]:
+        record = decode_line(line)
+        parsed = parse_log_line(line)
+        assert (record.source, record.ability, record.target, record.damage, record.checksum) == \
+            (parsed['source'], parsed['ability'], parsed['target'], parsed['damage'], parsed['checksum'])
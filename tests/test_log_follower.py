@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""LogFollower：分多次追加（含不完整的行和01|区域切换）、截断和替换文件"""
+
+import os
+
+from combat_table import CombatTable
+from log_follower import LogFollower
+from log_samples import build_log_lines, with_line_numbers, write_log
+
+def _expected(lines):
+    return CombatTable.from_lines(with_line_numbers(lines))
+
+def _assert_table(table, lines):
+    expected = _expected(lines)
+    assert table.raw_lines == expected.raw_lines
+    assert table.line_numbers == expected.line_numbers
+    assert table.segment_count == expected.segment_count
+
+def _poll(follower):
+    """模拟监视线程发现变化后界面线程处理一帧"""
+    follower._changed.set()
+    return follower.poll()
+
+def _make_follower(path, appends, resets):
+    return LogFollower(None, path, use_cache=False, use_inotify=False,
+                       on_append=lambda parsed, first, count: appends.append((first, count)),
+                       on_reset=resets.append)
+
+def test_appends_across_polls_and_zone_reset(tmp_path, log_lines):
+    zone_starts = [i for i, line in enumerate(log_lines) if line.startswith('01|')]
+    assert len(zone_starts) >= 2
+    second_zone = zone_starts[1]
+    path = write_log(str(tmp_path / 'live.log'), log_lines[:second_zone - 20])
+
+    appends, resets = [], []
+    follower = _make_follower(path, appends, resets)
+    _assert_table(follower.table, log_lines[:second_zone - 20])
+    assert _poll(follower) == 0
+
+    # 第一次追加到01|行之前，最后一行只写了一半
+    before_zone = '\r\n'.join(log_lines[second_zone - 20:second_zone - 1]) + '\r\n'
+    partial = log_lines[second_zone - 1]
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(before_zone + partial[:len(partial) // 2])
+    count = _poll(follower)
+    _assert_table(follower.table, log_lines[:second_zone - 1])
+    assert count == len(_expected(log_lines[:second_zone - 1])) - len(_expected(log_lines[:second_zone - 20]))
+
+    # 第二次补全该行并写入01|切换行和新区域的前几十行，行号应重新从1开始
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(partial[len(partial) // 2:] + '\r\n')
+        f.write(''.join(line + '\r\n' for line in log_lines[second_zone:second_zone + 40]))
+    rows_before = len(follower.table)
+    assert _poll(follower) > 0
+    _assert_table(follower.table, log_lines[:second_zone + 40])
+    new_numbers = follower.table.line_numbers[rows_before:]
+    assert min(new_numbers) <= 41 < max(follower.table.line_numbers[:rows_before])
+
+    # 第三次写完剩余内容
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(''.join(line + '\r\n' for line in log_lines[second_zone + 40:]))
+    _poll(follower)
+    _assert_table(follower.table, log_lines)
+
+    # 每次通知的起始行ID接着上一次，行数之和等于追加的表行数
+    next_row = len(_expected(log_lines[:second_zone - 20]))
+    for first, count in appends:
+        assert first == next_row
+        next_row += count
+    assert next_row == len(follower.table)
+    assert follower.appended_rows == len(follower.table) - len(_expected(log_lines[:second_zone - 20]))
+    assert not resets
+
+def test_truncate_and_replace_reparse(tmp_path, log_lines):
+    path = write_log(str(tmp_path / 'live.log'), log_lines)
+    appends, resets = [], []
+    follower = _make_follower(path, appends, resets)
+    _assert_table(follower.table, log_lines)
+
+    # 原地截断为较短的内容
+    short = log_lines[:len(log_lines) // 3]
+    write_log(path, short)
+    assert _poll(follower) == 0
+    assert len(resets) == 1 and resets[0] is follower.parsed
+    _assert_table(follower.table, short)
+
+    # 换成另一份更长的日志（新文件移动到原路径，大小未变小，由inode变化发现）
+    other = build_log_lines(seed=11)
+    replacement = write_log(str(tmp_path / 'next.log'), other)
+    os.replace(replacement, path)
+    assert _poll(follower) == 0
+    assert len(resets) == 2 and resets[1] is follower.parsed
+    _assert_table(follower.table, other)
+    assert follower.appended_rows == 0
+
+    # 替换后继续跟随新文件
+    more = build_log_lines(seed=12, zones=1)
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(''.join(line + '\r\n' for line in more))
+    assert _poll(follower) > 0
+    _assert_table(follower.table, other + more)
+    assert appends == [(len(_expected(other)), len(follower.table) - len(_expected(other)))]
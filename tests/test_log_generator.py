@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""合成日志生成器"""
+
+import log_generator
+from checksum_calculator import iter_log_file_with_line_numbers, validate_log_file
+from log_generator import generate_log, parse_count
+
+def test_generated_log_validates(tmp_path, monkeypatch):
+    # 让写入批次跨越区域边界
+    monkeypatch.setattr(log_generator, 'WRITE_BATCH_LINES', 700)
+    path = str(tmp_path / 'generated.log')
+    stats = generate_log(path, 3000, seed=7, fight_events=300, fights_per_zone=2)
+
+    assert validate_log_file(path, workers=1) == {'total': 3000, 'invalid': []}
+    rows = list(iter_log_file_with_line_numbers(path))
+    zone_rows = [line_number for line, line_number, _ in rows if line.startswith('01|')]
+    assert stats['lines'] == len(rows) == 3000
+    assert stats['zones'] == len(zone_rows) > 1 and set(zone_rows) == {1}
+    assert stats['fights'] == sum(1 for line, _, _ in rows if line.split('|')[3:4] == ['40000001'])
+    assert sum(stats['types'].values()) == 3000
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert stats['bytes'] == len(data) and data.count(b'\r\n') == 3000
+
+def test_generation_is_deterministic(tmp_path):
+    paths = [tmp_path / name for name in ('a.log', 'b.log', 'c.log')]
+    for path, seed in zip(paths, (1, 1, 2)):
+        generate_log(str(path), 500, seed=seed, newline='\n')
+    data = [path.read_bytes() for path in paths]
+    assert data[0] == data[1] != data[2]
+
+def test_parse_count():
+    assert parse_count('10k') == 10000
+    assert parse_count('2.5M') == 2500000
+    assert parse_count(' 123 ') == 123
+
+def test_main(tmp_path, capsys):
+    path = str(tmp_path / 'cli.log')
+    assert log_generator.main([path, '1k', '--seed', '3', '--lf']) == 0
+    assert '1000 行' in capsys.readouterr().out
+    assert validate_log_file(path, workers=1)['total'] == 1000
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""日志行偏移索引"""
+
+import os
+
+import pytest
+
+from checksum_calculator import iter_log_file_with_line_numbers
+from log_index import LogIndex, UNKNOWN_TYPE
+from log_samples import write_log
+
+def _scan(path):
+    return [(offset, int(line.split('|', 1)[0]), line_number, line)
+            for line, line_number, offset in iter_log_file_with_line_numbers(path)]
+
+def test_index_matches_line_scan(tmp_path, log_lines):
+    lines = list(log_lines)
+    lines[10:10] = ['', '  ']
+    path = write_log(str(tmp_path / 'test.log'), lines)
+    expected = _scan(path)
+
+    with LogIndex.build(path) as index:
+        assert len(index) == len(expected)
+        assert list(index.offsets) == [row[0] for row in expected]
+        assert list(index.type_codes) == [row[1] for row in expected]
+        assert list(index.line_numbers) == [row[2] for row in expected]
+        assert [index.line(row) for row in range(len(index))] == [row[3] for row in expected]
+
+        zone_rows = [row for row, item in enumerate(expected) if item[1] == 1]
+        assert len(zone_rows) == 3 and index.segment_starts() == zone_rows
+        assert all(index.line_numbers[row] == 1 for row in zone_rows)
+        assert list(index.rows_of_type(21)) == [row for row, item in enumerate(expected) if item[1] == 21]
+        assert index.row_for_line_number(1, 5) == zone_rows[1] + 4
+        with pytest.raises(IndexError):
+            index.row_for_line_number(0, zone_rows[1] + 1)
+
+def test_unknown_type_code(tmp_path, log_lines):
+    path = write_log(str(tmp_path / 'test.log'), log_lines[:3] + ['not a log line', '12345|x'])
+    with LogIndex.build(path) as index:
+        assert list(index.type_codes[-2:]) == [UNKNOWN_TYPE, UNKNOWN_TYPE]
+        assert index.segment_starts() == [0]
+
+def test_sidecar_is_reused(tmp_path, log_file, monkeypatch):
+    first = LogIndex.open(log_file)
+    assert os.path.exists(LogIndex.sidecar_path(log_file))
+
+    def fail(cls, file_path):
+        raise AssertionError('索引文件有效时不应重新扫描')
+    monkeypatch.setattr(LogIndex, 'build', classmethod(fail))
+    second = LogIndex.open(log_file)
+    for name in ('offsets', 'type_codes', 'line_numbers'):
+        assert getattr(second, name) == getattr(first, name)
+    assert second.line(len(second) - 1) == first.line(len(first) - 1)
+    first.close()
+    second.close()
+
+def test_sidecar_invalidated_when_log_changes(tmp_path, log_lines):
+    path = write_log(str(tmp_path / 'test.log'), log_lines[:100])
+    LogIndex.open(path).close()
+
+    write_log(path, log_lines[:150])
+    assert LogIndex.load_sidecar(path) is None
+    with LogIndex.open(path) as index:
+        assert len(index) == 150
+    with LogIndex.load_sidecar(path) as index:
+        assert len(index) == 150
+
+    # 大小不变但修改时间不同
+    write_log(path, log_lines[1:151])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    assert LogIndex.load_sidecar(path) is None
+    with LogIndex.open(path) as index:
+        assert index.line(0) == log_lines[1]
+
+def test_corrupt_sidecar_is_ignored(tmp_path, log_file):
+    LogIndex.open(log_file).close()
+    sidecar = LogIndex.sidecar_path(log_file)
+    with open(sidecar, 'r+b') as f:
+        f.truncate(os.path.getsize(sidecar) - 1)
+    assert LogIndex.load_sidecar(log_file) is None
+    with LogIndex.open(log_file) as index:
+        assert len(index) == len(_scan(log_file))
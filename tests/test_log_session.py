@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""LogSession区段划分、按需打开和保存"""
+
+from checksum_calculator import ABILITY_LINE_PREFIXES, resign_log_line, validate_log_file
+from combat_table import CombatTable, parse_timestamp_ns
+from log_index import LogIndex
+from log_samples import COMMENCE, VICTORY, build_log_lines, with_line_numbers, write_log
+from log_session import KIND_BETWEEN, KIND_FIGHT, KIND_ZONE, LogSession, find_segments
+
+def _largest_fight(session):
+    return max((segment for segment in session.segments if segment.kind == KIND_FIGHT),
+               key=lambda segment: segment.end_row - segment.start_row)
+
+def _resigned(lines):
+    return [resign_log_line(line, line_number) for line, line_number in with_line_numbers(lines)]
+
+def _assert_contiguous(segments, index):
+    assert segments[0].start_row == 0 and segments[-1].end_row == len(index)
+    for segment, following in zip(segments, segments[1:]):
+        assert segment.end_row == following.start_row
+    assert all(segment.start_row < segment.end_row for segment in segments)
+
+def test_every_row_belongs_to_a_segment(log_file):
+    with LogIndex.build(log_file) as index:
+        segments = find_segments(index)
+        _assert_contiguous(segments, index)
+
+        # 每个区域：开怪前、战斗1、战斗之间、战斗2、战斗之后
+        assert [segment.kind for segment in segments] == [KIND_BETWEEN, KIND_FIGHT, KIND_BETWEEN, KIND_FIGHT,
+                                                          KIND_BETWEEN] * 3
+        for segment in segments:
+            first, last = index.line(segment.start_row), index.line(segment.end_row - 1)
+            if segment.kind == KIND_FIGHT:
+                assert first.startswith('33|') and first.split('|')[3] == COMMENCE
+                assert last.startswith('33|') and segment.outcome is not None
+            else:
+                commands = [index.line(row).split('|')[3] for row in range(segment.start_row, segment.end_row)
+                            if index.type_codes[row] == 33]
+                assert COMMENCE not in commands
+        assert segments[0].title == '利姆萨·罗敏萨上层甲板 开怪前'
+        assert segments[2].title == '利姆萨·罗敏萨上层甲板 #1 之后'
+        assert segments[1].title == '利姆萨·罗敏萨上层甲板 #1 胜利'
+        assert segments[1].duration_seconds > 0
+
+def test_segments_for_unfinished_and_fightless_zones(tmp_path, log_lines):
+    fightless = build_log_lines(seed=2, zones=1, fights_per_zone=0)
+    # 第一场战斗删去结束标记，随后直接重新开始
+    zone = build_log_lines(seed=4, zones=1, fights_per_zone=2)
+    victory = next(i for i, line in enumerate(zone) if line.startswith('33|') and line.split('|')[3] == VICTORY)
+    del zone[victory]
+    # 文件以一场没有结束标记的战斗结尾
+    unfinished = [line for line in build_log_lines(seed=5, zones=1, fights_per_zone=1)
+                  if not (line.startswith('33|') and line.split('|')[3] != COMMENCE)]
+    path = write_log(str(tmp_path / 'test.log'), fightless + _resigned(zone) + _resigned(unfinished))
+
+    with LogIndex.build(path) as index:
+        segments = find_segments(index, file_id=3)
+        _assert_contiguous(segments, index)
+        assert all(segment.file_id == 3 for segment in segments)
+        assert segments[0].kind == KIND_ZONE and segments[0].end_row == len(fightless)
+        kinds = [(segment.kind, segment.number, segment.outcome) for segment in segments[1:]]
+        assert kinds[:4] == [(KIND_BETWEEN, 0, None), (KIND_FIGHT, 1, None), (KIND_FIGHT, 2, 'wipe'),
+                             (KIND_BETWEEN, 2, None)]
+        assert kinds[4:] == [(KIND_BETWEEN, 0, None), (KIND_FIGHT, 1, None)]
+
+def test_segments_hold_all_ability_rows(log_file, log_lines):
+    with LogSession(max_open_segments=2, use_sidecar=False) as session:
+        segments = session.add_file(log_file)
+        lines = [line for segment in segments for line in session.open_segment(segment).table.raw_lines]
+        assert len(session.open_views) <= 2
+    expected = CombatTable(ABILITY_LINE_PREFIXES)
+    for line, line_number in with_line_numbers(log_lines):
+        expected.append(line, line_number)
+    assert lines == expected.raw_lines
+
+def test_reopened_segment_keeps_staged_edits(log_file):
+    with LogSession(max_open_segments=1, use_sidecar=False) as session:
+        session.add_file(log_file)
+        segment = _largest_fight(session)
+        view = session.open_segment(segment)
+        view.table.scale_damage(2)
+        staged = list(view.table.raw_lines)
+        session.close_segment(segment)
+        assert session.has_changes(0)
+
+        # 重新打开时应看到已写入编辑记录的修改，并在其基础上继续修改
+        view = session.open_segment(segment)
+        assert view.table.raw_lines == staged
+        view.table.scale_damage(3)
+        expected = list(view.table.raw_lines)
+        session.save_file(0, backup=False)
+        assert not session.has_changes(0)
+
+        session.close_segment(segment)
+        assert session.open_segment(segment).table.raw_lines == expected
+    assert validate_log_file(log_file, workers=1)['invalid'] == []
+
+def test_time_shift_survives_close_and_reopen(log_file):
+    shift = 90 * 1000000000
+    with LogSession(max_open_segments=1, use_sidecar=False) as session:
+        session.add_file(log_file)
+        segment = _largest_fight(session)
+        view = session.open_segment(segment)
+        before = list(view.table.timestamps)
+        assert view.table.shift_time(shift)['changed']
+        assert view.modified
+
+        # 打开其他区段使其被换出（有修改的区段先写入编辑记录）
+        session.close_segment(segment)
+        session.open_segment(session.segments[0])
+        assert session.has_changes(0)
+        view = session.open_segment(segment)
+        assert list(view.table.timestamps) == [ns + shift for ns in before]
+
+        session.save_file(0, backup=False)
+        session.close_segment(segment)
+        view = session.open_segment(segment)
+        assert [parse_timestamp_ns(view.table.record(row).timestamp) for row in range(len(view.table))] == \
+            [ns + shift for ns in before]
+    assert validate_log_file(log_file, workers=1)['invalid'] == []
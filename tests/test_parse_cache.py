@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""ParsedLog解析缓存：命中、追加、失效和不完整的最后一行"""
+
+import os
+
+import pytest
+
+from combat_table import CombatTable
+from parse_cache import ParsedLog, cache_path, STATUS_HIT, STATUS_APPEND, STATUS_MISS
+
+_TABLE_COLUMNS = ('raw_lines', 'line_numbers', 'segment_ids', 'timestamps', 'damage', 'source_codes')
+
+def _assert_same_table(parsed, log_file):
+    expected = CombatTable.from_file(log_file)
+    for name in _TABLE_COLUMNS:
+        assert getattr(parsed.table, name) == getattr(expected, name), name
+    assert parsed.table.segment_count == expected.segment_count
+    assert parsed.table.sources.values == expected.sources.values
+
+@pytest.fixture
+def split_log(log_file, tmp_path):
+    """日志前半部分写入新文件（切在行中间），返回(路径, 完整内容, 切分位置)"""
+    with open(log_file, 'rb') as f:
+        data = f.read()
+    path = str(tmp_path / 'growing.log')
+    cut = len(data) // 2 + 17
+    with open(path, 'wb') as f:
+        f.write(data[:cut])
+    return path, data, cut
+
+def test_reopen_hits_cache(log_file):
+    parsed, status = ParsedLog.open(log_file)
+    assert status == STATUS_MISS
+    assert os.path.exists(cache_path(log_file))
+    _assert_same_table(parsed, log_file)
+
+    reopened, status = ParsedLog.open(log_file)
+    assert status == STATUS_HIT
+    _assert_same_table(reopened, log_file)
+    assert reopened.row_starts == parsed.row_starts and reopened.row_ends == parsed.row_ends
+
+def test_appended_log_parses_only_tail(split_log):
+    path, data, cut = split_log
+    parsed, status = ParsedLog.open(path)
+    assert status == STATUS_MISS
+    # 切在行中间时最后一行不完整，已解析但不写入缓存
+    assert parsed.partial
+
+    with open(path, 'ab') as f:
+        f.write(data[cut:])
+    appended, status = ParsedLog.open(path)
+    assert status == STATUS_APPEND
+    _assert_same_table(appended, path)
+    assert ParsedLog.open(path)[1] == STATUS_HIT
+
+def test_extend_continues_line_numbers(split_log):
+    path, data, cut = split_log
+    parsed, _ = ParsedLog.open(path, use_cache=False, include_partial=False)
+    before = len(parsed.table)
+    with open(path, 'ab') as f:
+        f.write(data[cut:])
+    assert parsed.extend() == len(parsed.table) - before > 0
+    _assert_same_table(parsed, path)
+
+def test_changed_log_invalidates_cache(log_file):
+    ParsedLog.open(log_file)
+    with open(log_file, 'r+b') as f:
+        f.seek(10)
+        byte = f.read(1)
+        f.seek(10)
+        f.write(b'1' if byte != b'1' else b'2')
+    parsed, status = ParsedLog.open(log_file)
+    assert status == STATUS_MISS
+    _assert_same_table(parsed, log_file)
+
+def test_corrupt_cache_is_ignored(log_file):
+    ParsedLog.open(log_file)
+    with open(cache_path(log_file), 'r+b') as f:
+        f.truncate(os.path.getsize(cache_path(log_file)) // 2)
+    parsed, status = ParsedLog.open(log_file)
+    assert status == STATUS_MISS
+    _assert_same_table(parsed, log_file)
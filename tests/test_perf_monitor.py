@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""性能监控：计时、计数和热点函数包装"""
+
+import json
+
+import perf_monitor
+from perf_monitor import PerfMonitor
+
+def test_timed_records_calls_and_items():
+    monitor = PerfMonitor()
+    with monitor.timed('parse') as timing:
+        timing['items'] = 120
+    with monitor.timed('parse'):
+        pass
+    timer = monitor.timers['parse']
+    assert timer['calls'] == 2 and timer['items'] == 120
+    assert timer['total'] >= timer['max'] >= 0
+
+    monitor.count('cache_hit')
+    monitor.count('cache_hit', 4)
+    report = monitor.report()
+    assert report['counters'] == {'cache_hit': 5}
+    assert report['timers']['parse']['calls'] == 2
+
+    monitor.reset()
+    assert monitor.timers == {} and monitor.counters == {}
+
+def test_timed_records_when_block_raises():
+    monitor = PerfMonitor()
+    try:
+        with monitor.timed('save'):
+            raise OSError
+    except OSError:
+        pass
+    assert monitor.timers['save']['calls'] == 1
+
+def test_instrument_counts_items_from_result():
+    monitor = PerfMonitor()
+
+    @monitor.instrument('filter', items=len)
+    def pick(n):
+        return list(range(n))
+
+    assert pick(3) == [0, 1, 2] and pick(5) == [0, 1, 2, 3, 4]
+    assert monitor.timers['filter']['calls'] == 2
+    assert monitor.timers['filter']['items'] == 8
+    assert pick.__name__ == 'pick'
+
+def test_detail_functions_only_wrapped_when_enabled(monkeypatch):
+    monitor = PerfMonitor()
+
+    def checksum(value):
+        return value
+
+    monkeypatch.setattr(perf_monitor, 'DETAIL_ENABLED', False)
+    assert monitor.instrument('checksum', detail=True)(checksum) is checksum
+    checksum(1)
+    assert 'checksum' not in monitor.timers
+
+    monkeypatch.setattr(perf_monitor, 'DETAIL_ENABLED', True)
+    wrapped = monitor.instrument('checksum', detail=True)(checksum)
+    assert wrapped is not checksum and wrapped(1) == 1
+    assert monitor.timers['checksum']['calls'] == 1
+
+def test_report_json(tmp_path):
+    monitor = PerfMonitor()
+    monitor.record('load', 0.5, 1000)
+    monitor.record('load', 1.5, 3000)
+    path = tmp_path / 'report.json'
+    monitor.write_report(str(path), {'cprofile': []})
+    report = json.loads(path.read_text(encoding='utf-8'))
+    assert report['timers']['load'] == {'calls': 2, 'total_seconds': 2.0, 'max_seconds': 1.5,
+                                        'items': 4000, 'items_per_second': 2000.0}
+    assert report['capture'] == {'cprofile': []}
+
+def test_capture_reports_profile_and_memory():
+    monitor = PerfMonitor()
+    monitor.start_capture()
+    assert monitor.capturing
+    sum(range(1000))
+    result = monitor.stop_capture()
+    assert not monitor.capturing
+    assert result['cprofile'] and result['tracemalloc']['peak_bytes'] >= 0
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""启动导入耗时分析"""
+
+import profile_imports
+
+def test_default_modules_exist_and_import():
+    modules = profile_imports.default_modules()
+    assert modules
+    report = profile_imports.profile_imports(modules)
+    imported = {entry['module'] for entry in report['entries']}
+    assert set(modules) <= imported
+    assert report['forbidden'] == []
+
+def test_main_without_arguments(capsys):
+    assert profile_imports.main(['--top', '3']) == 0
+    assert '导入耗时检查通过' in capsys.readouterr().out
+
+def test_parse_importtime_depth():
+    output = ('import time: self [us] | cumulative | imported package\n'
+              'import time:       120 |        120 |   _json\n'
+              'import time:       300 |        420 | json\n')
+    entries = profile_imports.parse_importtime(output)
+    assert [(entry['module'], entry['depth']) for entry in entries] == [('_json', 1), ('json', 0)]
+    assert profile_imports.summarize(entries)['total_us'] == 420
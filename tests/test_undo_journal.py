@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""UndoJournal撤销/重做及崩溃恢复"""
+
+from combat_table import CombatTable
+from undo_journal import UndoJournal
+
+def _busiest_sources(table, count):
+    """按行数排序的前几个来源名称"""
+    return sorted(table.sources.values, key=lambda name: -len(table.filter(source=name)))[:count]
+
+def test_undo_redo_restores_lines(log_file):
+    table = CombatTable.from_file(log_file)
+    original = list(table.raw_lines)
+    journal = UndoJournal(table)
+    source, = _busiest_sources(table, 1)
+    table.scale_damage(2, source=source)
+    scaled = list(table.raw_lines)
+    assert scaled != original
+
+    assert journal.undo()
+    assert table.raw_lines == original
+    assert journal.redo()
+    assert table.raw_lines == scaled
+    assert not journal.redo()
+
+def test_recover_replays_edits_after_undo(log_file):
+    table = CombatTable.from_file(log_file)
+    journal = UndoJournal(table)
+    journal.open_file(log_file)
+    first, second = _busiest_sources(table, 2)
+    table.scale_damage(2, source=first)
+    table.scale_damage(3, source=first)
+    journal.undo()
+    table.scale_damage(5, source=second)
+    # 撤销后没有实际修改的操作不产生新组
+    table.scale_damage(1, source=second)
+    journal.close_file()
+
+    recovered_table = CombatTable.from_file(log_file)
+    recovered = UndoJournal.recover(recovered_table, log_file)
+    try:
+        assert recovered is not None
+        assert recovered_table.raw_lines == table.raw_lines
+        assert list(recovered.group_ends) == list(journal.group_ends)
+        assert recovered.position == journal.position == 2
+
+        # 恢复后的记录可以继续撤销到原始内容
+        while recovered.undo():
+            pass
+        assert recovered_table.raw_lines == CombatTable.from_file(log_file).raw_lines
+    finally:
+        recovered.close_file(remove=True)
+
+def test_recover_ignores_unfinished_group(log_file):
+    table = CombatTable.from_file(log_file)
+    journal = UndoJournal(table)
+    journal.open_file(log_file)
+    source, = _busiest_sources(table, 1)
+    table.scale_damage(2, source=source)
+    expected = list(table.raw_lines)
+    with journal.batch():
+        table.scale_damage(3, source=source)
+        # 模拟组结束前崩溃：修改项已写入，组结束标记未写入
+        journal._file.flush()
+        recovered_table = CombatTable.from_file(log_file)
+        recovered = UndoJournal.recover(recovered_table, log_file)
+    journal.close_file()
+    try:
+        assert recovered_table.raw_lines == expected
+        assert recovered.position == 1
+    finally:
+        recovered.close_file(remove=True)
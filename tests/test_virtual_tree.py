@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""虚拟列表的行控件复用和按行ID记录的选择（不依赖Tk显示）"""
+
+from combat_table import CombatTable, decode_damage_value
+from virtual_tree import TableRowSource, VirtualWindow
+
+class _RowSource:
+    """行ID为序号乘10的数据源，记录请求次数"""
+
+    def __init__(self, count):
+        self.count = count
+        self.requests = []
+
+    def row_count(self):
+        return self.count
+
+    def get_rows(self, start, count):
+        self.requests.append((start, count))
+        return [(index * 10, (index,)) for index in range(start, min(start + count, self.count))]
+
+ITEMS = ['I001', 'I002', 'I003', 'I004']
+
+def test_layout_recycles_items_for_window():
+    source = _RowSource(100)
+    window = VirtualWindow(source, prefetch=5)
+    assert window.layout(ITEMS) == [(item, index * 10, (index,)) for index, item in enumerate(ITEMS)]
+
+    window.first = 50
+    layout = window.layout(ITEMS)
+    assert [item for item, _, _ in layout] == ITEMS
+    assert [row for _, row, _ in layout] == [500, 510, 520, 530]
+    assert window.item_rows == {'I001': 500, 'I002': 510, 'I003': 520, 'I004': 530}
+
+    # 窗口在预取范围内移动时不再请求数据源
+    requests = len(source.requests)
+    window.first = 46
+    window.layout(ITEMS)
+    window.first = 55
+    window.layout(ITEMS)
+    assert len(source.requests) == requests
+
+    window.first = 1000
+    assert [row for _, row, _ in window.layout(ITEMS)] == [960, 970, 980, 990]
+    assert window.scroll_fraction(len(ITEMS)) == (0.96, 1.0)
+
+def test_layout_with_fewer_rows_than_items():
+    source = _RowSource(2)
+    window = VirtualWindow(source)
+    window.first = 5
+    assert [(item, row) for item, row, _ in window.layout(ITEMS)] == [('I001', 0), ('I002', 10)]
+    assert window.first == 0 and window.item_rows == {'I001': 0, 'I002': 10}
+
+    source.count = 0
+    window.invalidate()
+    assert window.layout(ITEMS) == [] and window.scroll_fraction(len(ITEMS)) == (0.0, 1.0)
+
+def test_selection_follows_row_ids_across_scrolling():
+    window = VirtualWindow(_RowSource(100), prefetch=2)
+    window.layout(ITEMS)
+    assert window.sync_selection(['I002', 'I004'])
+    assert window.selected == {10, 30}
+    assert not window.sync_selection(['I002', 'I004'])
+
+    # 滚动后同一控件显示其他行，窗口外的选择保持不变
+    window.first = 2
+    window.layout(ITEMS)
+    assert window.selected_items() == ['I002']
+    assert window.sync_selection(['I003'])
+    assert window.selected == {10, 40}
+
+    window.first = 40
+    window.layout(ITEMS)
+    assert window.selected_items() == [] and not window.sync_selection([])
+    window.selected = {410, 420}
+    assert window.selected_items() == ['I002', 'I003']
+
+    window.invalidate(reset=True)
+    assert window.first == 0 and window.selected == set()
+
+def test_table_row_source(log_file):
+    table = CombatTable.from_file(log_file)
+    source = TableRowSource(table)
+    assert source.row_count() == len(table)
+    row_id, values = source.get_rows(3, 1)[0]
+    assert row_id == 3
+    assert values[0] == table.line_numbers[3] and values[-1] == decode_damage_value(table.damage[3])
+
+    source.set_rows([5, 9, 12])
+    assert source.row_count() == 3
+    assert [row for row, _ in source.get_rows(1, 10)] == [9, 12]
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFXIV日志撤销/重做记录模块
+以(行ID, 字段, 旧值, 新值)的形式只追加记录CombatTable的修改，存放在紧凑数组中，
+撤销/重做只回放被修改的字段；记录可同步追加到日志旁的.journal文件，崩溃后可快速重放
+"""
+
+import array
+import os
+import struct
+from contextlib import contextmanager
+from typing import Optional, Sequence
+
+from combat_table import CombatTable, StringPool
+
+# 记录文件后缀和头部格式：标识、日志文件大小、日志修改时间（纳秒）、战斗表行数
+JOURNAL_SUFFIX = '.journal'
+_JOURNAL_MAGIC = b'FFXJRN01'
+_JOURNAL_HEADER = struct.Struct('<8sQQI')
+
+# 记录类型：修改项、组结束、撤销、重做
+_RECORD_EDIT = 1
+_RECORD_COMMIT = 2
+_RECORD_UNDO = 3
+_RECORD_REDO = 4
+_RECORD_KIND = struct.Struct('<B')
+# 修改项：行ID、字段位置、旧值字节数、新值字节数
+_EDIT_ENTRY = struct.Struct('<IBII')
+
+# 字段位置为此值时表示整行替换（set_line）
+WHOLE_LINE = 0xFF
+
+def journal_path(log_path: str) -> str:
+    """返回日志文件对应的撤销记录文件路径"""
+    return log_path + JOURNAL_SUFFIX
+
+def _log_stat(log_path: str):
+    st = os.stat(log_path)
+    return st.st_size, st.st_mtime_ns
+
+class UndoJournal:
+    """
+    CombatTable的撤销/重做记录
+
+    每次rewrite_field或set_line调用（例如一次批量倍率修改）为一组，撤销和重做以组为单位；
+    batch()内的多次修改合并为一组。撤销后再做新的修改会丢弃可重做的部分。
+    """
+
+    def __init__(self, table: CombatTable):
+        self.table = table
+        self.rows = array.array('I')
+        self.fields = array.array('B')
+        self.old_codes = array.array('I')
+        self.new_codes = array.array('I')
+        self.values = StringPool()
+        # 每组结束时的修改项数量
+        self.group_ends = array.array('I')
+        # 已生效的组数，小于len(group_ends)时可以重做
+        self.position = 0
+        self._batch_depth = 0
+        self._file = None
+        self.path = None
+        table.journal = self
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def can_undo(self) -> bool:
+        return self.position > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self.position < len(self.group_ends)
+
+    def _drop_redo(self) -> None:
+        """丢弃可重做的部分（撤销后做了新的修改）"""
+        if self.position < len(self.group_ends):
+            keep = self.group_ends[self.position - 1] if self.position else 0
+            for column in (self.rows, self.fields, self.old_codes, self.new_codes):
+                del column[keep:]
+            del self.group_ends[self.position:]
+
+    def _push(self, row: int, field: int, old: str, new: str) -> None:
+        """追加一个修改项（先丢弃可重做的部分）"""
+        self._drop_redo()
+        self.rows.append(row)
+        self.fields.append(field)
+        self.old_codes.append(self.values.intern(old))
+        self.new_codes.append(self.values.intern(new))
+
+    def record(self, rows: Sequence[int], field_index: int, old_values: Sequence[str],
+               new_values: Sequence[str]) -> None:
+        """记录若干行同一字段的修改（由CombatTable调用）"""
+        if not 0 <= field_index < WHOLE_LINE:
+            raise ValueError(f"无效的字段位置: {field_index}")
+        self._record(rows, field_index, old_values, new_values)
+
+    def record_lines(self, rows: Sequence[int], old_lines: Sequence[str], new_lines: Sequence[str]) -> None:
+        """记录整行替换（由CombatTable.set_line调用）"""
+        self._record(rows, WHOLE_LINE, old_lines, new_lines)
+
+    def _record(self, rows, field_index, old_values, new_values) -> None:
+        if len(rows):
+            self._drop_redo()
+        start = len(self.rows)
+        for row, old, new in zip(rows, old_values, new_values):
+            self._push(row, field_index, old, new)
+        if self._file is not None:
+            self._write_edits(start, len(self.rows))
+        if self._batch_depth == 0:
+            self._commit()
+
+    def _commit(self) -> None:
+        """结束当前组"""
+        if self.position < len(self.group_ends):
+            # 撤销之后没有新的修改项
+            return
+        end = len(self.rows)
+        if end == (self.group_ends[self.position - 1] if self.position else 0):
+            return
+        self.group_ends.append(end)
+        self.position = len(self.group_ends)
+        self._write_marker(_RECORD_COMMIT)
+
+    @contextmanager
+    def batch(self):
+        """将块内的多次修改合并为一个撤销步骤"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._commit()
+
+    def _group_range(self, group: int):
+        return (self.group_ends[group - 1] if group else 0), self.group_ends[group]
+
+    def _apply(self, start: int, end: int, undo: bool) -> None:
+        """将[start, end)的修改项写回战斗表：撤销时倒序写入旧值，重做时顺序写入新值"""
+        table = self.table
+        lookup = self.values.values
+        codes = self.old_codes if undo else self.new_codes
+        order = range(end - 1, start - 1, -1) if undo else range(start, end)
+        journal, table.journal = table.journal, None
+        try:
+            run_field = None
+            run_rows, run_values = [], []
+            # 相邻的同一字段修改合并成一次批量重新签名
+            for i in order:
+                field = self.fields[i]
+                if field != run_field and run_rows:
+                    self._flush(run_field, run_rows, run_values)
+                    run_rows, run_values = [], []
+                run_field = field
+                run_rows.append(self.rows[i])
+                run_values.append(lookup[codes[i]])
+            if run_rows:
+                self._flush(run_field, run_rows, run_values)
+        finally:
+            table.journal = journal
+
+    def _flush(self, field: int, rows, values) -> None:
+        if field == WHOLE_LINE:
+            for row, line in zip(rows, values):
+                self.table.set_line(row, line)
+        else:
+            self.table.set_fields(rows, field, values)
+
+    def undo(self) -> bool:
+        """撤销最近一组修改，没有可撤销的修改时返回False"""
+        if not self.can_undo:
+            return False
+        self.position -= 1
+        self._apply(*self._group_range(self.position), undo=True)
+        self._write_marker(_RECORD_UNDO)
+        return True
+
+    def redo(self) -> bool:
+        """重做最近撤销的一组修改，没有可重做的修改时返回False"""
+        if not self.can_redo:
+            return False
+        self._apply(*self._group_range(self.position), undo=False)
+        self.position += 1
+        self._write_marker(_RECORD_REDO)
+        return True
+
+    def changed_rows(self) -> set:
+        """当前已生效的修改涉及的行ID"""
+        end = self.group_ends[self.position - 1] if self.position else 0
+        return set(self.rows[:end])
+
+    def clear(self) -> None:
+        """清空记录（例如保存日志之后），并截断记录文件"""
+        for column in (self.rows, self.fields, self.old_codes, self.new_codes, self.group_ends):
+            del column[:]
+        self.values = StringPool()
+        self.position = 0
+        if self._file is not None:
+            self._file.seek(_JOURNAL_HEADER.size)
+            self._file.truncate()
+            self._file.flush()
+
+    def open_file(self, log_path: str) -> None:
+        """
+        开始把修改追加到日志旁的记录文件（覆盖已有的记录文件）
+
+        Args:
+            log_path: 战斗表对应的日志文件（记录文件头保存其大小和修改时间）
+        """
+        self.close_file()
+        size, mtime_ns = _log_stat(log_path)
+        self.path = journal_path(log_path)
+        self._file = open(self.path, 'wb')
+        self._file.write(_JOURNAL_HEADER.pack(_JOURNAL_MAGIC, size, mtime_ns, len(self.table)))
+        self._file.flush()
+
+    def close_file(self, remove: bool = False) -> None:
+        """关闭记录文件，remove为True时同时删除（例如修改已保存到日志）"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if remove and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _write_edits(self, start: int, end: int) -> None:
+        lookup = self.values.values
+        chunks = []
+        for i in range(start, end):
+            old = lookup[self.old_codes[i]].encode('utf-8')
+            new = lookup[self.new_codes[i]].encode('utf-8')
+            chunks.append(_RECORD_KIND.pack(_RECORD_EDIT))
+            chunks.append(_EDIT_ENTRY.pack(self.rows[i], self.fields[i], len(old), len(new)))
+            chunks.append(old)
+            chunks.append(new)
+        self._file.write(b''.join(chunks))
+
+    def _write_marker(self, kind: int) -> None:
+        if self._file is not None:
+            self._file.write(_RECORD_KIND.pack(kind))
+            self._file.flush()
+
+    @classmethod
+    def recover(cls, table: CombatTable, log_path: str) -> Optional['UndoJournal']:
+        """
+        重放日志旁的记录文件，恢复上次未保存的修改
+
+        记录文件必须对应未改动的日志（大小、修改时间和战斗表行数一致），
+        末尾未结束的组（崩溃时写了一半）会被忽略。恢复后继续向该文件追加记录。
+
+        Args:
+            table: 由该日志新建的战斗表
+            log_path: 日志文件路径
+
+        Returns:
+            UndoJournal，没有可用的记录文件时返回None
+        """
+        path = journal_path(log_path)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            size, mtime_ns = _log_stat(log_path)
+        except OSError:
+            return None
+        if len(data) < _JOURNAL_HEADER.size:
+            return None
+        magic, saved_size, saved_mtime, rows = _JOURNAL_HEADER.unpack_from(data)
+        if magic != _JOURNAL_MAGIC or (saved_size, saved_mtime, rows) != (size, mtime_ns, len(table)):
+            return None
+
+        journal = cls(table)
+        pos = _JOURNAL_HEADER.size
+        valid_end = pos
+        # 当前组已读出、尚未遇到组结束标记的修改项
+        group = []
+        try:
+            while pos < len(data):
+                kind = data[pos]
+                pos += 1
+                if kind == _RECORD_EDIT:
+                    row, field, old_len, new_len = _EDIT_ENTRY.unpack_from(data, pos)
+                    pos += _EDIT_ENTRY.size
+                    old = data[pos:pos + old_len].decode('utf-8')
+                    pos += old_len
+                    new = data[pos:pos + new_len].decode('utf-8')
+                    pos += new_len
+                    if pos > len(data) or row >= len(table):
+                        break
+                    group.append((row, field, old, new))
+                    continue
+                if kind == _RECORD_COMMIT:
+                    # 与实时修改相同：先丢弃可重做的部分，再追加本组并写回战斗表
+                    journal._drop_redo()
+                    start = len(journal.rows)
+                    for entry in group:
+                        journal._push(*entry)
+                    journal._apply(start, len(journal.rows), undo=False)
+                    journal._commit()
+                elif kind == _RECORD_UNDO:
+                    journal.undo()
+                elif kind == _RECORD_REDO:
+                    journal.redo()
+                else:
+                    break
+                group = []
+                valid_end = pos
+        except (struct.error, UnicodeDecodeError):
+            pass
+
+        journal.path = path
+        journal._file = open(path, 'r+b')
+        journal._file.truncate(valid_end)
+        journal._file.seek(valid_end)
+        return journal
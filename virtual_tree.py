@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+虚拟列表模块
+Treeview只保留一屏的行控件，滚动时按需向数据源请求可见窗口内的行并复用控件
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from typing import List, Optional, Sequence, Tuple, Callable, Dict
+
+from combat_table import CombatTable, decode_damage_value
+from perf_monitor import instrument
+
+# 默认每屏行数与预取的额外行数
+DEFAULT_VISIBLE_ROWS = 30
+DEFAULT_PREFETCH_ROWS = 100
+
+class TableRowSource:
+    """将CombatTable的一组行ID作为虚拟列表的数据源"""
+
+    # get_rows返回的各列顺序
+    COLUMNS = ('line_number', 'timestamp', 'source', 'ability', 'target', 'flags', 'damage')
+
+    def __init__(self, table: CombatTable, rows: Optional[Sequence[int]] = None):
+        self.table = table
+        self.rows = rows
+
+    def set_rows(self, rows: Optional[Sequence[int]]) -> None:
+        """更换显示的行ID（例如筛选条件变化），None表示全部行"""
+        self.rows = rows
+
+    def row_count(self) -> int:
+        """返回行数"""
+        return len(self.table) if self.rows is None else len(self.rows)
+
+    def get_rows(self, start: int, count: int) -> List[Tuple[int, Tuple]]:
+        """
+        返回[start, start + count)范围内的行
+
+        Returns:
+            (行ID, 各列显示值) 元组的列表
+        """
+        table = self.table
+        stop = min(start + count, self.row_count())
+        row_ids = range(start, stop) if self.rows is None else self.rows[start:stop]
+        result = []
+        for row in row_ids:
+            record = table.record(row)
+            result.append((row, (table.line_numbers[row], record.timestamp, record.source,
+                                 record.ability, record.target, record.flags,
+                                 decode_damage_value(table.damage[row]))))
+        return result
+
+class VirtualWindow:
+    """
+    虚拟列表的窗口状态（与Tk无关）
+
+    记录可见窗口在数据源中的位置、预取缓存、复用行控件与行ID的对应关系，
+    以及按行ID记录的选择集合。
+    """
+
+    def __init__(self, row_source, prefetch: int = DEFAULT_PREFETCH_ROWS):
+        self.row_source = row_source
+        self.prefetch = prefetch
+        self.first = 0
+        self.selected = set()
+        self.item_rows = {}
+        self._cache_start = 0
+        self._cache = []
+
+    def invalidate(self, reset: bool = False) -> None:
+        """
+        丢弃预取缓存
+
+        Args:
+            reset: 是否回到顶部并清空选择
+        """
+        if reset:
+            self.first = 0
+            self.selected.clear()
+        self._cache = []
+
+    def rows(self, start: int, count: int) -> List[Tuple[int, Tuple]]:
+        """从预取缓存中取出窗口内的行，缓存未命中时连同预取范围一起请求"""
+        cache_end = self._cache_start + len(self._cache)
+        if start < self._cache_start or start + count > cache_end:
+            fetch_start = max(start - self.prefetch, 0)
+            self._cache = self.row_source.get_rows(fetch_start, count + self.prefetch * 2)
+            self._cache_start = fetch_start
+        offset = start - self._cache_start
+        return self._cache[offset:offset + count]
+
+    def layout(self, items: Sequence) -> List[Tuple[object, int, Tuple]]:
+        """
+        把可见窗口的行依次分配给复用的行控件
+
+        Args:
+            items: 复用的行控件，数量即一屏的行数
+
+        Returns:
+            (行控件, 行ID, 显示值) 元组的列表；数据不足一屏时多余的控件不在其中
+        """
+        total = self.row_source.row_count()
+        self.first = max(min(self.first, total - len(items)), 0)
+        rows = self.rows(self.first, len(items))
+        layout = [(item, row_id, values) for item, (row_id, values) in zip(items, rows)]
+        self.item_rows = {item: row_id for item, row_id, _ in layout}
+        return layout
+
+    def selected_items(self) -> List:
+        """返回当前显示选中行的行控件"""
+        return [item for item, row_id in self.item_rows.items() if row_id in self.selected]
+
+    def sync_selection(self, items: Sequence) -> bool:
+        """
+        将可见窗口内控件的选择同步到按行ID记录的选择集合，窗口外的选择保持不变
+
+        Args:
+            items: 当前选中的行控件
+
+        Returns:
+            选择集合是否发生变化
+        """
+        visible = set(self.item_rows.values())
+        chosen = {self.item_rows[item] for item in items if item in self.item_rows}
+        selected = (self.selected - visible) | chosen
+        changed = selected != self.selected
+        self.selected = selected
+        return changed
+
+    def scroll_fraction(self, count: int) -> Tuple[float, float]:
+        """返回滚动条的(起点, 终点)比例"""
+        total = self.row_source.row_count()
+        if total <= 0:
+            return 0.0, 1.0
+        return self.first / total, min((self.first + count) / total, 1.0)
+
+class VirtualTreeview(ttk.Frame):
+    """只渲染可见行的Treeview（选择状态按行ID记录，与控件无关）"""
+
+    def __init__(self, master, row_source, columns: Sequence[str],
+                 headings: Optional[Dict[str, str]] = None,
+                 visible_rows: int = DEFAULT_VISIBLE_ROWS,
+                 prefetch: int = DEFAULT_PREFETCH_ROWS,
+                 on_select: Optional[Callable[[List[int]], None]] = None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_source = row_source
+        self.on_select = on_select
+        self.window = VirtualWindow(row_source, prefetch)
+
+        self.tree = ttk.Treeview(self, columns=tuple(columns), show='headings',
+                                 height=visible_rows, selectmode='extended')
+        for column in columns:
+            self.tree.heading(column, text=(headings or {}).get(column, column))
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        # 复用的行控件，数量等于一屏的行数
+        self._items = [self.tree.insert('', 'end') for _ in range(visible_rows)]
+
+        self.tree.bind('<<TreeviewSelect>>', self._on_tree_select)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll_rows(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_rows(3))
+        self.tree.bind('<Prior>', lambda event: self._scroll_key(-self.visible_rows))
+        self.tree.bind('<Next>', lambda event: self._scroll_key(self.visible_rows))
+        self.tree.bind('<Up>', self._on_arrow)
+        self.tree.bind('<Down>', self._on_arrow)
+        self.tree.bind('<Configure>', self._on_configure)
+
+        self.refresh()
+
+    @property
+    def visible_rows(self) -> int:
+        """一屏的行数"""
+        return len(self._items)
+
+    @instrument('refresh_tree')
+    def refresh(self, reset: bool = False) -> None:
+        """
+        数据源内容变化后重新绘制
+
+        Args:
+            reset: 是否回到顶部并清空选择（例如筛选条件变化）
+        """
+        self.window.invalidate(reset)
+        self._redraw()
+
+    def _redraw(self) -> None:
+        """将可见窗口的行写入复用的行控件"""
+        layout = self.window.layout(self._items)
+        attached = set(self.tree.get_children(''))
+        for index, (item, _, values) in enumerate(layout):
+            self.tree.item(item, values=values)
+            if item not in attached:
+                self.tree.move(item, '', index)
+        for item in self._items[len(layout):]:
+            if item in attached:
+                self.tree.detach(item)
+
+        self.tree.selection_set(self.window.selected_items())
+        self.scrollbar.set(*self.window.scroll_fraction(self.visible_rows))
+
+    def scroll_to(self, first: int) -> None:
+        """滚动到指定位置（数据源中的序号）"""
+        if first != self.window.first:
+            self.window.first = first
+            self._redraw()
+
+    def scroll_rows(self, delta: int) -> None:
+        """按行数滚动"""
+        self.scroll_to(max(self.window.first + delta, 0))
+
+    def see(self, index: int) -> None:
+        """确保数据源中的第index行可见"""
+        first = self.window.first
+        if index < first:
+            self.scroll_to(index)
+        elif index >= first + self.visible_rows:
+            self.scroll_to(index - self.visible_rows + 1)
+
+    def selected_rows(self) -> List[int]:
+        """返回所有选中行的行ID（包括不在可见窗口内的行）"""
+        return sorted(self.window.selected)
+
+    def select_rows(self, rows: Sequence[int]) -> None:
+        """设置选中的行ID"""
+        self.window.selected = set(rows)
+        self._redraw()
+
+    def _on_scrollbar(self, *args) -> None:
+        """处理滚动条命令：moveto fraction 或 scroll n units/pages"""
+        total = self.row_source.row_count()
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * total))
+        elif args[0] == 'scroll':
+            step = self.visible_rows if args[2] == 'pages' else 1
+            self.scroll_rows(int(args[1]) * step)
+
+    def _on_mousewheel(self, event) -> str:
+        """Windows/macOS鼠标滚轮"""
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_rows(-delta * 3)
+        return 'break'
+
+    def _scroll_key(self, delta: int) -> str:
+        """翻页键"""
+        self.scroll_rows(delta)
+        return 'break'
+
+    def _on_arrow(self, event) -> Optional[str]:
+        """方向键移动到可见窗口边缘时滚动一行"""
+        focus = self.tree.focus()
+        if not focus or focus not in self.window.item_rows:
+            return None
+        index = self._items.index(focus)
+        if event.keysym == 'Up' and index == 0 and self.window.first > 0:
+            self.scroll_rows(-1)
+            return 'break'
+        if event.keysym == 'Down' and index == len(self.window.item_rows) - 1:
+            self.scroll_rows(1)
+            return 'break'
+        return None
+
+    def _on_configure(self, event) -> None:
+        """窗口大小变化时调整复用行控件的数量"""
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        wanted = max((event.height - row_height) // row_height, 1)
+        if wanted == self.visible_rows:
+            return
+        while len(self._items) < wanted:
+            self._items.append(self.tree.insert('', 'end'))
+        while len(self._items) > wanted:
+            self.tree.delete(self._items.pop())
+        self.tree.configure(height=wanted)
+        self._redraw()
+
+    def _on_tree_select(self, event) -> None:
+        """同步可见窗口内的选择到按行ID记录的选择集合"""
+        if self.window.sync_selection(self.tree.selection()) and self.on_select:
+            self.on_select(self.selected_rows())